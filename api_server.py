@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 本地只读 HTTP/JSON 接口
+
+在内存中保存最近一次扫描结果（快照），按计划在后台重新扫描，
+以分页、可过滤、可排序的 JSON 提供给其他工具，支持 ETag / If-None-Match。
+
+    GET /health
+    GET /summary
+    GET /apps?offset=0&limit=50&sort=score&order=desc&status=safe&platform=linux&q=chrome&min_size=1048576
+    GET /apps/<key>
+    GET /leftovers?offset=0&limit=50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from metrics_exporter import reclaimable_bytes
+from scoring import STATUS_BANDS, status_band
+from snapshot import Snapshot, default_snapshot_path, json_default, refresh_snapshot, take_snapshot
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+# 列表接口只返回这些字段，详情接口返回完整记录
+SUMMARY_FIELDS = ('key', 'name', 'version', 'publisher', 'platform', 'install_location', 'size',
+                  'size_incomplete', 'reclaimable_size', 'leftover_size', 'score', 'status',
+                  'days_since_last_use', 'last_access_time', 'users')
+
+# 排序字段 -> 取值函数
+SORT_KEYS: Dict[str, Callable[[Dict], object]] = {
+    'score': lambda app: app.get('score', 0) or 0,
+    'size': lambda app: app.get('size', 0) or 0,
+    'reclaimable': reclaimable_bytes,
+    'days': lambda app: app.get('days_since_last_use', 0) or 0,
+    'name': lambda app: str(app.get('name', '')).casefold(),
+}
+
+
+class ApiError(Exception):
+    """请求参数错误，返回给客户端的状态码和消息"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ScanCache:
+    """内存中的最近一次扫描结果
+
+    (快照, 按键索引的应用, generation) 作为一个整体在锁内替换，请求用 current() 一次取得，
+    ETag 和响应内容来自同一份快照；每次替换后 generation 递增，用于生成 ETag。
+    其他进程（例如导出器 --scan）更新了快照文件时，refresh_from_disk 只需一次 stat 即可发现。
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, scanner_factory: Optional[Callable] = None):
+        self.snapshot_path = snapshot_path or default_snapshot_path()
+        self.scanner_factory = scanner_factory
+        self._current: Tuple[Optional[Snapshot], Dict[str, Dict], int] = (None, {}, 0)
+        self._lock = threading.Lock()
+        self.refreshing = False
+        self._scanner = None
+        # 扫描器是否已完成过一次完整扫描（之前没有各来源的记录，不能只重新枚举部分来源）
+        self._scanned = False
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._scan_lock = threading.Lock()
+
+    def current(self) -> Tuple[Optional[Snapshot], Dict[str, Dict], int]:
+        """返回 (快照, 按键索引的应用, generation)，三者总是同一次替换的结果"""
+        with self._lock:
+            return self._current
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self.current()[0]
+
+    def _install(self, snapshot: Snapshot):
+        apps_by_key = {app.get('key'): app for app in snapshot.apps}
+        with self._lock:
+            self._current = (snapshot, apps_by_key, self._current[2] + 1)
+
+    def refresh_from_disk(self) -> bool:
+        """快照文件有变化时重新读取，返回是否更新"""
+        try:
+            st = os.stat(self.snapshot_path)
+        except OSError:
+            return False
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        if fingerprint == self._fingerprint:
+            return False
+        snapshot = Snapshot.load(self.snapshot_path)
+        if snapshot is None:
+            return False
+        self._fingerprint = fingerprint
+        self._install(snapshot)
+        return True
+
+    def start_scanner(self):
+        """创建扫描器并记录包数据库的当前指纹，此后 sources_changed 就能发现安装和卸载"""
+        if self._scanner is None:
+            # 复用同一个扫描器，保留已加载的使用记录和上一轮各来源的记录
+            self._scanner = self.scanner_factory()
+            detector = self._scanner.change_detector
+            detector.record(detector.fingerprints())
+
+    def rescan(self, full: bool = False):
+        """重新扫描并替换快照；已有扫描在进行时直接返回
+
+        第一次（或 full 为 True 时）完整扫描；之后只重新枚举包数据库指纹有变化的来源，
+        没有变化时不更新快照。
+        """
+        if not self._scan_lock.acquire(blocking=False):
+            return
+        self.refreshing = True
+        try:
+            self.start_scanner()
+            if full or not self._scanned:
+                snapshot, _ = take_snapshot(self._scanner, self.snapshot_path)
+                self._scanned = True
+            else:
+                refreshed = refresh_snapshot(self._scanner, self.snapshot_path)
+                if refreshed is None:
+                    return
+                snapshot, _ = refreshed
+            # 写入的快照序列化后再读回，与从文件加载的记录格式一致（日期为字符串）
+            self._fingerprint = None
+            if not self.refresh_from_disk():
+                self._install(Snapshot(json.loads(json.dumps(snapshot.data, default=json_default))))
+        except Exception as e:
+            print(f"Error refreshing scan results: {e}")
+        finally:
+            self.refreshing = False
+            self._scan_lock.release()
+
+    def sources_changed(self) -> bool:
+        """包数据库指纹是否变化（只需几次 stat）；还没有扫描器时返回 False"""
+        return self._scanner is not None and bool(self._scanner.change_detector.changed_sources())
+
+    @staticmethod
+    def etag(snapshot: Optional[Snapshot], generation: int, request_key: str) -> str:
+        """同一份快照上的同一个请求得到相同的 ETag；snapshot 和 generation 需来自同一次 current()"""
+        created = snapshot.created if snapshot else 0
+        digest = hashlib.sha1(f"{created}:{generation}:{request_key}".encode('utf-8')).hexdigest()
+        return f'"{digest[:20]}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match 使用弱比较：忽略 W/ 前缀，* 匹配任何现有表示"""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int, minimum: int = 0,
+               maximum: Optional[int] = None) -> int:
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise ApiError(400, f"参数 {name} 必须是整数")
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ApiError(400, f"参数 {name} 超出范围")
+    return value
+
+
+def _paginate(items: List, params: Dict[str, List[str]]) -> Dict:
+    offset = _int_param(params, 'offset', 0)
+    limit = _int_param(params, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+    return {'total': len(items), 'offset': offset, 'limit': limit, 'items': items[offset:offset + limit]}
+
+
+def query_apps(apps: List[Dict], params: Dict[str, List[str]]) -> Dict:
+    """按查询参数过滤、排序并分页"""
+    statuses = set(params.get('status', []))
+    unknown = statuses - set(STATUS_BANDS.values())
+    if unknown:
+        raise ApiError(400, f"未知状态: {', '.join(sorted(unknown))}")
+    platforms = set(params.get('platform', []))
+    query = params.get('q', [''])[0].casefold()
+    min_size = _int_param(params, 'min_size', 0)
+
+    selected = [app for app in apps
+                if (not statuses or status_band(app.get('status')) in statuses)
+                and (not platforms or app.get('platform') in platforms)
+                and (not query or query in str(app.get('name', '')).casefold())
+                and (app.get('size', 0) or 0) >= min_size]
+
+    sort = params.get('sort', ['score'])[0]
+    if sort not in SORT_KEYS:
+        raise ApiError(400, f"不支持的排序字段: {sort}（可用: {', '.join(SORT_KEYS)}）")
+    order = params.get('order', ['asc' if sort == 'name' else 'desc'])[0]
+    if order not in ('asc', 'desc'):
+        raise ApiError(400, "order 只能是 asc 或 desc")
+    key_func = SORT_KEYS[sort]
+    # 名称作为次要键，保证分页顺序稳定
+    selected.sort(key=lambda app: str(app.get('name', '')).casefold())
+    selected.sort(key=key_func, reverse=order == 'desc')
+
+    page = _paginate(selected, params)
+    page['items'] = [{field: app.get(field) for field in SUMMARY_FIELDS if field in app} for app in page['items']]
+    return page
+
+
+def summarize(snapshot: Snapshot) -> Dict:
+    bands = {band: {'apps': 0, 'reclaimable_bytes': 0} for band in list(STATUS_BANDS.values()) + ['unknown']}
+    for app in snapshot.apps:
+        band = bands[status_band(app.get('status'))]
+        band['apps'] += 1
+        band['reclaimable_bytes'] += reclaimable_bytes(app)
+    orphans = snapshot.data.get('orphaned_leftovers') or []
+    return {
+        'created': snapshot.created,
+        'platform': snapshot.data.get('platform'),
+        'scan_duration': snapshot.data.get('scan_duration'),
+        'apps': len(snapshot.apps),
+        'by_status': bands,
+        'orphaned_leftovers': len(orphans),
+        'orphaned_leftover_bytes': sum(item.get('size', 0) for item in orphans),
+    }
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """只读请求处理；cache 由 make_server 绑定到服务器对象上"""
+
+    server_version = "AppGraveyardAPI/1.0"
+
+    def do_GET(self):
+        cache: ScanCache = self.server.cache
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == '/health':
+                self._send_json(200, {'status': 'ok', 'has_snapshot': cache.snapshot is not None,
+                                      'refreshing': cache.refreshing})
+                return
+            # ETag 和响应内容都来自这一次取得的快照，期间替换快照也不会错配
+            snapshot, apps_by_key, generation = cache.current()
+            if snapshot is None:
+                raise ApiError(503, "尚未完成第一次扫描")
+
+            # 在处理请求前比较 ETag，未变化时不需要过滤和序列化
+            etag = cache.etag(snapshot, generation, self.path)
+            if etag_matches(etag, self.headers.get('If-None-Match', '')):
+                self._send_not_modified(etag)
+                return
+
+            if url.path == '/summary':
+                body = summarize(snapshot)
+            elif url.path == '/apps':
+                body = query_apps(snapshot.apps, params)
+            elif url.path.startswith('/apps/'):
+                app = apps_by_key.get(unquote(url.path[len('/apps/'):]))
+                if app is None:
+                    raise ApiError(404, "找不到该应用")
+                body = app
+            elif url.path == '/leftovers':
+                body = _paginate(snapshot.data.get('orphaned_leftovers') or [], params)
+            else:
+                raise ApiError(404, "未知路径")
+            self._send_json(200, body, etag)
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+
+    def _send_json(self, status: int, body, etag: Optional[str] = None):
+        payload = json.dumps(body, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_not_modified(self, etag: str):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # 默认会把每个请求写到 stderr
+        pass
+
+
+def make_server(cache: ScanCache, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """创建服务器（port 为 0 时由系统分配端口，便于测试）"""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.cache = cache
+    return server
+
+
+def refresh_loop(cache: ScanCache, interval: float, stop_event: threading.Event):
+    """定期完整扫描；两次扫描之间只检查包数据库指纹和快照文件是否被其他进程更新，
+    安装或卸载了应用时只重新枚举变化的来源"""
+    next_scan = time.monotonic() + interval
+    while not stop_event.wait(min(60.0, interval)):
+        if time.monotonic() >= next_scan:
+            cache.rescan(full=True)
+            next_scan = time.monotonic() + interval
+        elif cache.sources_changed():
+            # 只重新枚举变化的来源；完整扫描仍按间隔进行
+            cache.rescan()
+        else:
+            cache.refresh_from_disk()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AppGraveyard 本地只读 HTTP/JSON 接口")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址（默认只接受本机连接）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--snapshot", help="快照文件路径（默认在 AppGraveyard 数据目录中）")
+    parser.add_argument("--interval", type=float, default=3600, help="重新扫描的间隔（秒）")
+    parser.add_argument("--background", action="store_true", help="扫描时使用低影响后台模式")
+    args = parser.parse_args()
+
+    def scanner_factory():
+        from cross_platform_scanner import AppScanner
+        return AppScanner(background=args.background)
+
+    cache = ScanCache(args.snapshot, scanner_factory)
+    # 启动时就记录指纹：沿用磁盘上的快照时，两次完整扫描之间的安装和卸载也能及时发现
+    cache.start_scanner()
+    stop_event = threading.Event()
+    if not cache.refresh_from_disk():
+        # 没有快照时先在后台扫描一次，期间接口返回 503
+        threading.Thread(target=cache.rescan, daemon=True).start()
+    threading.Thread(target=refresh_loop, args=(cache, args.interval, stop_event), daemon=True).start()
+
+    server = make_server(cache, args.host, args.port)
+    print(f"AppGraveyard 接口已启动: http://{args.host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
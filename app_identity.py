@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, List, Optional
+
+# 合并重复记录时，若保留的记录缺少这些描述性字段，从重复记录中补全
+FILL_FIELDS = ('publisher', 'version', 'install_date', 'display_icon', 'uninstall_string')
+
+
+def normalize_install_path(path: Optional[str], platform: str) -> str:
+    """规范化安装目录：去掉引号和末尾分隔符；Windows 路径统一分隔符并忽略大小写"""
+    path = (path or '').strip().strip('"').strip()
+    if platform == 'windows':
+        path = path.replace('/', '\\').rstrip('\\').lower()
+    else:
+        path = path.rstrip('/')
+    return path
+
+
+def identity_key(app: Dict) -> str:
+    """应用的稳定标识，同一个安装从不同来源读到时相同
+
+    - 注册表项：根键（HKEY_USERS 下含 SID）+ 卸载子键名（通常是 MSI 产品 GUID）+ 安装目录。
+      32/64 位视图指向同一个键时（32 位系统、基准夹具）会合并；
+      同名的 x86/x64 版本、机器级和用户级安装各自保留。
+    - Linux 软件包：包名（dpkg 的多架构包名中带架构）
+    - 其他：安装目录，没有时用 bundle id，再没有时用名称
+    """
+    platform = app.get('platform', 'windows')
+    location = normalize_install_path(app.get('install_location'), platform)
+    registry_path = app.get('registry_path')
+    if registry_path:
+        parts = registry_path.split('\\')
+        hive = '\\'.join(parts[:2]) if parts[0].upper() == 'HKEY_USERS' else parts[0]
+        return f"registry:{hive.upper()}:{parts[-1].upper()}:{location}"
+    if platform == 'linux':
+        return f"linux:package:{app.get('name', '')}"
+    if location:
+        return f"{platform}:path:{location}"
+    if app.get('bundle_id'):
+        return f"{platform}:bundle:{app['bundle_id']}"
+    return f"{platform}:name:{app.get('name', '').strip().lower()}"
+
+
+def add_source(record: Dict, source: Optional[str]):
+    """在记录的 sources 中加入一个来源（不重复）"""
+    sources = record.setdefault('sources', [])
+    if source and source not in sources:
+        sources.append(source)
+
+
+def merge_duplicates(apps: Iterable[Dict]) -> List[Dict]:
+    """按 identity_key 合并重复记录，O(n)
+
+    保留每个标识第一次出现的记录（输入顺序固定时结果也固定），
+    它的 sources 列出所有读到这个应用的来源（各记录的 'source'），
+    缺少的描述性字段从后面的重复记录补全。
+    """
+    index: Dict[str, Dict] = {}
+    result = []
+    for app in apps:
+        key = identity_key(app)
+        existing = index.get(key)
+        if existing is None:
+            index[key] = app
+            app['identity'] = key
+            # 每次合并都重新计算，沿用上一轮的记录时不会留下已消失的来源
+            app['sources'] = []
+            add_source(app, app.get('source'))
+            result.append(app)
+            continue
+        add_source(existing, app.get('source'))
+        for field in FILL_FIELDS:
+            if not existing.get(field) and app.get(field):
+                existing[field] = app[field]
+    return result
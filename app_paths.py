@@ -0,0 +1,21 @@
+import os
+import sys
+
+APP_DIR_NAME = "AppGraveyard"
+
+
+def app_data_dir() -> str:
+    """返回（并在需要时创建）AppGraveyard 的本地数据目录"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        path = os.path.join(base, APP_DIR_NAME)
+    elif sys.platform == "darwin":
+        path = os.path.join(os.path.expanduser("~/Library/Application Support"), APP_DIR_NAME)
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        path = os.path.join(base, APP_DIR_NAME.lower())
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError as e:
+        print(f"Error creating data directory {path}: {e}")
+    return path
@@ -5,17 +5,42 @@ AppGraveyard CLI - 命令行版本用于测试
 
 import sys
 import os
-from cross_platform_scanner import CrossPlatformScanner
+import argparse
+from cross_platform_scanner import AppScanner
+from instrumentation import telemetry
+from profiling import add_profile_arguments, profiler_from_args
 from scoring import AppScorer
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="AppGraveyard 命令行版本")
+    parser.add_argument("--background", action="store_true",
+                        help="低影响后台扫描：降低 CPU/I/O 优先级并限制遍历速度")
+    parser.add_argument("--all-users", action="store_true",
+                        help="管理员模式：扫描本机所有用户的配置文件（需要管理员/root 权限）")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="查找不同应用安装目录之间内容相同的文件")
+    parser.add_argument("--stats", action="store_true",
+                        help="记录各阶段耗时和计数器，结束时打印汇总")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="把计时区间、计数器和错误以 JSON 行写入 FILE（同时启用 --stats）")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
 def main():
     """主函数 - 命令行版本"""
+    args = parse_args()
+    if args.stats or args.trace:
+        telemetry.enable(args.trace)
+    profiler = profiler_from_args(args)
     print("AppGraveyard 🪦 - 正在扫描已安装的程序...")
     
     try:
         # 扫描已安装的程序
-        scanner = CrossPlatformScanner()
-        apps = scanner.scan_installed_programs()
+        scanner = AppScanner(background=args.background, all_users=args.all_users,
+                             find_duplicates=args.duplicates)
+        with profiler.stage('scan'):
+            apps = scanner.scan_installed_programs()
         print(f"找到 {len(apps)} 个已安装的程序")
         
         if not apps:
@@ -28,16 +53,17 @@ def main():
         scorer = AppScorer()
         enhanced_apps = []
         
-        for app in apps[:20]:  # 限制显示数量
-            # 获取最后访问时间
-            last_access = scanner.get_last_access_time(app)
-            app['last_access_time'] = last_access
-            
-            # 计算分数和状态
-            score_info = scorer.calculate_score(app)
-            app.update(score_info)
-            
-            enhanced_apps.append(app)
+        with profiler.stage('last_access_and_score'):
+            for app in apps[:20]:  # 限制显示数量
+                # 获取最后访问时间
+                last_access = scanner.get_last_access_time(app)
+                app['last_access_time'] = last_access
+                
+                # 计算分数和状态
+                score_info = scorer.calculate_score(app)
+                app.update(score_info)
+                
+                enhanced_apps.append(app)
         
         print(f"\n处理完成，显示前 {len(enhanced_apps)} 个应用:")
         print("-" * 80)
@@ -58,6 +84,8 @@ def main():
                 size_str = f"{size_bytes//(1024**2)}MB"
             else:
                 size_str = f"{size_bytes//(1024**3)}GB"
+            if app.get('size_incomplete'):
+                size_str = f"≥{size_str}"
             
             days = app.get('days_since_last_use', 'N/A')
             if days != 'N/A':
@@ -68,10 +96,45 @@ def main():
             status = app.get('status', '未知')
             print(f"{name:<30} {size_str:<10} {days_str:<15} {status:<15}")
         
+        if args.duplicates:
+            with profiler.stage('duplicates'):
+                scanner.finish_incomplete_walks(apps)
+                groups = scanner.find_duplicate_files(apps)
+            savable = sum(group['savable_bytes'] for group in groups)
+            print(f"\n跨应用重复文件: {len(groups)} 组，可节省 {savable / (1024 ** 2):.1f}MB")
+            for group in groups[:10]:
+                print(f"  {group['savable_bytes'] / (1024 ** 2):.1f}MB  {group['count']} 份 × "
+                      f"{group['size'] / 1024:.0f}KB  应用: {', '.join(group['apps'])}")
+                print(f"      {group['files'][0]['path']}")
+        
+        # 管理员模式：按用户汇总
+        if scanner.multi_user is not None:
+            print("\n按用户汇总:")
+            print(f"{'用户':<20} {'自行安装':<10} {'应用数据':<12} {'残留':<12}")
+            for user, report in sorted(scanner.multi_user.user_reports.items()):
+                leftover_str = f"{report['leftover_size'] / (1024 ** 2):.1f}MB"
+                orphan_str = f"{report['orphan_size'] / (1024 ** 2):.1f}MB"
+                print(f"{user:<20} {report['app_count']:<10} {leftover_str:<12} {orphan_str:<12}")
+        
+        # 找不到对应已安装应用的用户数据目录
+        orphans = scanner.orphaned_leftovers
+        if orphans:
+            print(f"\n可能的残留目录（共 {len(orphans)} 个，显示最大的 10 个）:")
+            for leftover in orphans[:10]:
+                size_mb = leftover.get('size', 0) / (1024 ** 2)
+                prefix = "≥" if leftover.get('incomplete') else ""
+                owner = f"  [{leftover['user']}]" if 'user' in leftover else ""
+                print(f"  {prefix}{size_mb:.1f}MB  {leftover['path']}{owner}")
+        
     except Exception as e:
         print(f"错误: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        profiler.finish()
+        if telemetry.enabled:
+            telemetry.print_summary()
+            telemetry.disable()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
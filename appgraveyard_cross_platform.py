@@ -6,6 +6,7 @@ Find the apps you buried but never use.
 
 import sys
 import os
+import argparse
 import tkinter as tk
 
 # 检测操作系统并导入相应的扫描器
@@ -19,11 +20,24 @@ else:
     print(f"Unsupported platform: {sys.platform}")
     sys.exit(1)
 
+from profiling import add_profile_arguments, profiler_from_args
 from scoring import AppScorer
 from ui_fixed import AppGraveyardUI
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="AppGraveyard - Find the apps you buried but never use.")
+    parser.add_argument("--background", action="store_true",
+                        help="低影响后台扫描：降低 CPU/I/O 优先级并限制遍历速度")
+    parser.add_argument("--all-users", action="store_true",
+                        help="管理员模式：扫描本机所有用户的配置文件（需要管理员/root 权限）")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
+    profiler = profiler_from_args(args)
     platform_name = {
         'win32': 'Windows',
         'darwin': 'macOS', 
@@ -34,8 +48,9 @@ def main():
     
     try:
         # 扫描已安装的程序
-        scanner = AppScanner()
-        apps = scanner.scan_installed_programs()
+        scanner = AppScanner(background=args.background, all_users=args.all_users)
+        with profiler.stage('scan'):
+            apps = scanner.scan_installed_programs()
         print(f"找到 {len(apps)} 个已安装的程序")
         
         # 调试：打印前几个程序的详细信息
@@ -50,22 +65,26 @@ def main():
         scorer = AppScorer()
         enhanced_apps = []
         
-        for app in apps:
-            # 获取最后访问时间
-            last_access = scanner.get_last_access_time(app)
-            app['last_access_time'] = last_access
-            
-            # 计算分数和状态
-            score_info = scorer.calculate_score(app)
-            app.update(score_info)
-            
-            enhanced_apps.append(app)
+        with profiler.stage('last_access_and_score'):
+            for app in apps:
+                # 获取最后访问时间
+                last_access = scanner.get_last_access_time(app)
+                app['last_access_time'] = last_access
+                
+                # 计算分数和状态
+                score_info = scorer.calculate_score(app)
+                app.update(score_info)
+                
+                enhanced_apps.append(app)
         
         print(f"处理完成，准备显示界面...")
         
-        # 启动UI
-        ui = AppGraveyardUI(enhanced_apps)
-        ui.run()
+        # 启动UI（大小统计未完成的应用会在界面中后台补全）
+        with profiler.stage('ui_startup'):
+            ui = AppGraveyardUI(enhanced_apps, scanner=scanner)
+        # 界面事件循环（包括后台补全大小、重新扫描）单独作为一个阶段
+        with profiler.stage('ui'):
+            ui.run()
         
     except Exception as e:
         print(f"错误: {e}")
@@ -76,6 +95,8 @@ def main():
         root.withdraw()  # 隐藏主窗口
         tk.messagebox.showerror("AppGraveyard 错误", f"发生错误:\n{e}\n\n请查看控制台获取详细错误信息。")
         root.destroy()
+    finally:
+        profiler.finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
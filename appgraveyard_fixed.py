@@ -6,18 +6,29 @@ Find the apps you buried but never use.
 
 import sys
 import os
+import argparse
 import tkinter as tk
 from scanner_fixed import AppScanner
 from scoring import AppScorer
 from ui_fixed import AppGraveyardUI
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="AppGraveyard - Find the apps you buried but never use.")
+    parser.add_argument("--background", action="store_true",
+                        help="低影响后台扫描：降低 CPU/I/O 优先级并限制遍历速度")
+    parser.add_argument("--all-users", action="store_true",
+                        help="管理员模式：扫描本机所有用户的配置文件（需要管理员/root 权限）")
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
     print("AppGraveyard 🪦 - 正在扫描已安装的程序...")
     
     try:
         # 扫描已安装的程序
-        scanner = AppScanner()
+        scanner = AppScanner(background=args.background, all_users=args.all_users)
         apps = scanner.scan_installed_programs()
         print(f"找到 {len(apps)} 个已安装的程序")
         
@@ -45,8 +56,8 @@ def main():
         
         print(f"处理完成，准备显示界面...")
         
-        # 启动UI
-        ui = AppGraveyardUI(enhanced_apps)
+        # 启动UI（大小统计未完成的应用会在界面中后台补全）
+        ui = AppGraveyardUI(enhanced_apps, scanner=scanner)
         ui.run()
         
     except Exception as e:
@@ -0,0 +1,322 @@
+"""
+基准测试用的合成夹具
+
+生成可复现的安装目录树、dpkg 数据库、macOS .app 包、用户数据目录
+和一个内存中的假注册表，供 benchmark.py 计时各扫描阶段。
+"""
+
+import json
+import os
+import plistlib
+import random
+import stat
+import sys
+from typing import Dict, List
+
+FIXTURE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# 各规模下的夹具参数
+SCALES = {
+    'small': {
+        'deep_depth': 6, 'deep_width': 3, 'deep_files_per_dir': 4,
+        'tiny_files': 20000, 'huge_file_size': 256 * 1024 ** 2,
+        'packages': 200, 'files_per_package': 40,
+        'bundles': 20, 'registry_apps': 200, 'leftover_dirs': 50,
+    },
+    'medium': {
+        'deep_depth': 8, 'deep_width': 3, 'deep_files_per_dir': 8,
+        'tiny_files': 200000, 'huge_file_size': 2 * 1024 ** 3,
+        'packages': 1000, 'files_per_package': 80,
+        'bundles': 100, 'registry_apps': 1000, 'leftover_dirs': 200,
+    },
+    'large': {
+        'deep_depth': 10, 'deep_width': 3, 'deep_files_per_dir': 10,
+        'tiny_files': 2000000, 'huge_file_size': 16 * 1024 ** 3,
+        'packages': 3000, 'files_per_package': 120,
+        'bundles': 300, 'registry_apps': 3000, 'leftover_dirs': 1000,
+    },
+}
+
+# 每个目录最多放这么多个小文件
+TINY_FILES_PER_DIR = 1000
+
+PUBLISHERS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne', 'Tyrell']
+
+# 假 dpkg：按 "dpkg -l" 的格式输出夹具中的 status 文件
+FAKE_DPKG_SCRIPT = """#!{python}
+import sys
+print("Desired=Unknown/Install/Remove/Purge/Hold")
+print("| Status=Not/Inst/Conf-files/Unpacked/halF-conf/Half-inst/trig-aWait/Trig-pend")
+print("|/ Err?=(none)/Reinst-required (Status,Err: uppercase=bad)")
+print("||/ Name           Version      Architecture Description")
+print("+++-==============-============-============-=================================")
+package = version = None
+with open({status!r}) as f:
+    for line in f:
+        if line.startswith("Package: "):
+            package = line.split(": ", 1)[1].strip()
+        elif line.startswith("Version: "):
+            version = line.split(": ", 1)[1].strip()
+        elif not line.strip() and package:
+            print(f"ii  {{package}}  {{version}}  amd64  synthetic package")
+            package = version = None
+"""
+
+
+def _write_file(path: str, size: int, rng: random.Random):
+    with open(path, 'wb') as f:
+        if size:
+            f.write(rng.randbytes(size) if hasattr(rng, 'randbytes') else os.urandom(size))
+
+
+def _make_deep_tree(root: str, depth: int, width: int, files_per_dir: int, rng: random.Random) -> int:
+    """又深又宽的目录树，返回文件数"""
+    count = 0
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        for i in range(files_per_dir):
+            _write_file(os.path.join(path, f"file{i}.dat"), rng.randint(0, 8192), rng)
+            count += 1
+        if level < depth:
+            for i in range(width):
+                stack.append((os.path.join(path, f"d{i}"), level + 1))
+    return count
+
+
+def _make_tiny_files(root: str, count: int) -> int:
+    """大量空文件（只考验目录遍历和 stat，不占空间）"""
+    for start in range(0, count, TINY_FILES_PER_DIR):
+        directory = os.path.join(root, f"chunk{start // TINY_FILES_PER_DIR:05d}")
+        os.makedirs(directory, exist_ok=True)
+        for i in range(start, min(count, start + TINY_FILES_PER_DIR)):
+            open(os.path.join(directory, f"t{i}"), 'wb').close()
+    return count
+
+
+def _make_huge_file(root: str, size: int) -> int:
+    """一个大文件；用稀疏文件生成，不实际占满磁盘"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "huge.bin"), 'wb') as f:
+        f.truncate(size)
+    return 1
+
+
+def _make_dpkg(root: str, bin_dir: str, packages: int, files_per_package: int,
+               rng: random.Random) -> str:
+    """status 文件、每个包的 .list 清单、清单中列出的文件，以及假 dpkg 命令"""
+    info_dir = os.path.join(root, "info")
+    files_root = os.path.join(root, "files")
+    os.makedirs(info_dir, exist_ok=True)
+    status_path = os.path.join(root, "status")
+    with open(status_path, 'w') as status:
+        for i in range(packages):
+            name = f"synthpkg{i:05d}"
+            status.write(f"Package: {name}\nStatus: install ok installed\nVersion: 1.{i % 17}.{i % 5}\n\n")
+            package_dir = os.path.join(files_root, name)
+            bin_path = os.path.join(files_root, "bin", name)
+            os.makedirs(package_dir, exist_ok=True)
+            os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+            listed = [files_root, package_dir, bin_path]
+            _write_file(bin_path, 64, rng)
+            os.chmod(bin_path, 0o755)
+            for j in range(files_per_package):
+                file_path = os.path.join(package_dir, f"f{j}")
+                _write_file(file_path, rng.randint(0, 2048), rng)
+                listed.append(file_path)
+            with open(os.path.join(info_dir, f"{name}.list"), 'w') as f:
+                f.write("\n".join(listed) + "\n")
+
+    os.makedirs(bin_dir, exist_ok=True)
+    script_path = os.path.join(bin_dir, "dpkg")
+    with open(script_path, 'w') as f:
+        f.write(FAKE_DPKG_SCRIPT.format(python=sys.executable, status=status_path))
+    os.chmod(script_path, os.stat(script_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return info_dir
+
+
+def _make_bundles(root: str, count: int, rng: random.Random) -> List[str]:
+    """带 Info.plist 和可执行文件的 .app 包"""
+    bundles = []
+    for i in range(count):
+        name = f"Synth App {i:04d}"
+        bundle = os.path.join(root, f"{name}.app")
+        contents = os.path.join(bundle, "Contents")
+        os.makedirs(os.path.join(contents, "MacOS"), exist_ok=True)
+        os.makedirs(os.path.join(contents, "Resources"), exist_ok=True)
+        with open(os.path.join(contents, "Info.plist"), 'wb') as f:
+            plistlib.dump({'CFBundleName': name, 'CFBundleShortVersionString': f"{i % 9}.0",
+                           'CFBundleIdentifier': f"com.synth.app{i:04d}"}, f)
+        executable = os.path.join(contents, "MacOS", f"app{i:04d}")
+        _write_file(executable, 4096, rng)
+        os.chmod(executable, 0o755)
+        for j in range(20):
+            _write_file(os.path.join(contents, "Resources", f"res{j}.bin"), rng.randint(0, 16384), rng)
+        bundles.append(bundle)
+    return bundles
+
+
+def _make_registry_apps(root: str, count: int, rng: random.Random) -> List[Dict]:
+    """注册表卸载项及其（小型）安装目录"""
+    entries = []
+    for i in range(count):
+        publisher = PUBLISHERS[i % len(PUBLISHERS)]
+        name = f"{publisher} Tool {i:05d}"
+        location = os.path.join(root, f"app{i:05d}")
+        os.makedirs(location, exist_ok=True)
+        exe_path = os.path.join(location, f"{name.replace(' ', '')}.exe")
+        _write_file(exe_path, 2048, rng)
+        for j in range(5):
+            _write_file(os.path.join(location, f"lib{j}.dll"), rng.randint(0, 32768), rng)
+        entry = {
+            'DisplayName': name,
+            'Publisher': publisher,
+            'DisplayVersion': f"{i % 7}.{i % 3}",
+            'InstallLocation': location,
+            'UninstallString': f'"{exe_path}" /uninstall',
+            'DisplayIcon': f"{exe_path},0",
+            'InstallDate': f"20{10 + i % 14:02d}0{1 + i % 9}1{i % 9}",
+        }
+        # 约一半的程序在注册表里带有 EstimatedSize（KB），只作为遍历不到文件时的后备值
+        if i % 2:
+            entry['EstimatedSize'] = rng.randint(100, 500000)
+        entries.append(entry)
+    return entries
+
+
+def _make_leftovers(home: str, count: int, names: List[str], rng: random.Random):
+    """用户数据和缓存目录：一部分对应夹具中的应用，其余是残留"""
+    for i in range(count):
+        root = os.path.join(home, ".cache" if i % 2 else ".config")
+        name = names[i] if i < len(names) and i % 3 else f"orphan{i:04d}"
+        directory = os.path.join(root, name)
+        os.makedirs(directory, exist_ok=True)
+        for j in range(5):
+            _write_file(os.path.join(directory, f"c{j}"), rng.randint(0, 8192), rng)
+
+
+def build_fixtures(root: str, scale: str = 'small', seed: int = 0) -> Dict:
+    """在 root 下生成（或复用已生成的）夹具，返回清单"""
+    params = dict(SCALES[scale])
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == FIXTURE_VERSION and manifest.get('scale') == scale \
+                and manifest.get('seed') == seed:
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    print(f"正在生成 {scale} 规模的基准夹具: {root}")
+    rng = random.Random(seed)
+    programs = os.path.join(root, "programs")
+    home = os.path.join(root, "home")
+    bin_dir = os.path.join(root, "bin")
+    os.makedirs(home, exist_ok=True)
+
+    trees = {
+        'deep': os.path.join(programs, "DeepApp"),
+        'tiny': os.path.join(programs, "TinyFilesApp"),
+        'huge': os.path.join(programs, "HugeFileApp"),
+    }
+    file_counts = {
+        'deep': _make_deep_tree(trees['deep'], params['deep_depth'], params['deep_width'],
+                                params['deep_files_per_dir'], rng),
+        'tiny': _make_tiny_files(trees['tiny'], params['tiny_files']),
+        'huge': _make_huge_file(trees['huge'], params['huge_file_size']),
+    }
+    dpkg_info = _make_dpkg(os.path.join(root, "dpkg"), bin_dir, params['packages'],
+                           params['files_per_package'], rng)
+    bundles = _make_bundles(os.path.join(home, "Applications"), params['bundles'], rng)
+    registry = _make_registry_apps(os.path.join(programs, "registry"), params['registry_apps'], rng)
+    _make_leftovers(home, params['leftover_dirs'],
+                    [f"synthpkg{i:05d}" for i in range(params['packages'])], rng)
+
+    manifest = {
+        'version': FIXTURE_VERSION, 'scale': scale, 'seed': seed, 'params': params,
+        'root': root, 'home': home, 'bin_dir': bin_dir, 'dpkg_info_dir': dpkg_info,
+        'trees': trees, 'file_counts': file_counts, 'bundles': bundles, 'registry': registry,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+class FakeKey:
+    """假注册表中的一个键"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.subkeys: Dict[str, 'FakeKey'] = {}
+        self.values: Dict[str, object] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def Close(self):
+        pass
+
+    def child(self, name: str) -> 'FakeKey':
+        return self.subkeys.setdefault(name.lower(), FakeKey(name))
+
+
+class FakeWinreg:
+    """实现扫描器用到的 winreg 接口子集，数据来自夹具清单
+
+    32 位和 64 位视图返回同一份数据（与真实系统上两个视图都能看到的程序一样，会被扫描器去重）。
+    """
+
+    KEY_READ = 0x20019
+    KEY_WOW64_64KEY = 0x0100
+    KEY_WOW64_32KEY = 0x0200
+    REG_SZ = 1
+    REG_DWORD = 4
+
+    def __init__(self, registry_entries: List[Dict]):
+        self.HKEY_LOCAL_MACHINE = FakeKey("HKEY_LOCAL_MACHINE")
+        self.HKEY_CURRENT_USER = FakeKey("HKEY_CURRENT_USER")
+        self.HKEY_USERS = FakeKey("HKEY_USERS")
+        uninstall_keys = []
+        for hive in (self.HKEY_LOCAL_MACHINE, self.HKEY_CURRENT_USER):
+            key = hive
+            for part in r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall".split("\\"):
+                key = key.child(part)
+            uninstall_keys.append(key)
+        # 所有程序都装在机器级别，当前用户下的卸载项为空
+        uninstall = uninstall_keys[0]
+        for i, entry in enumerate(registry_entries):
+            uninstall.child(f"{{SYNTH-{i:05d}}}").values.update(entry)
+
+    def OpenKey(self, key: FakeKey, sub_key: str, reserved: int = 0, access: int = 0) -> FakeKey:
+        for part in filter(None, sub_key.split("\\")):
+            child = key.subkeys.get(part.lower())
+            if child is None:
+                raise FileNotFoundError(2, "The system cannot find the file specified", sub_key)
+            key = child
+        return key
+
+    def EnumKey(self, key: FakeKey, index: int) -> str:
+        names = list(key.subkeys.values())
+        if index >= len(names):
+            raise OSError(259, "No more data is available")
+        return names[index].name
+
+    def QueryValueEx(self, key: FakeKey, value_name: str):
+        if value_name not in key.values:
+            raise FileNotFoundError(2, "The system cannot find the file specified", value_name)
+        value = key.values[value_name]
+        return value, self.REG_DWORD if isinstance(value, int) else self.REG_SZ
+
+    def QueryInfoKey(self, key: FakeKey):
+        # (子键数, 值数, 最后写入时间)；夹具不会变化，时间固定为 0
+        return len(key.subkeys), len(key.values), 0
+
+    def CloseKey(self, key: FakeKey):
+        pass
+
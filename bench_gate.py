@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 性能回归检查
+
+多次运行 benchmark.py 中的扫描基准，用中位数和 MAD（中位数绝对偏差）
+与提交在仓库中的 bench_baseline.json 比较；任一阶段出现显著变慢时以非零状态退出。
+不同平台的耗时没有可比性，基线按 sys.platform 分别保存；当前平台没有基线时跳过比较。
+在用 PyInstaller（appgraveyard.spec / build.bat）打包之前运行。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+import bench_fixtures
+from benchmark import STAGES, BenchmarkSuite, default_fixture_dir
+
+BASELINE_VERSION = 2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_RUNS = 5
+
+# MAD 乘以该系数后是正态分布下标准差的一致估计
+MAD_SCALE = 1.4826
+
+# 判定为回归需要同时满足：变慢超过 REGRESSION_RATIO，
+# 超过双方合并离散度的 NOISE_FACTOR 倍，且绝对差值超过 MIN_DELTA 秒
+REGRESSION_RATIO = 0.10
+NOISE_FACTOR = 3.0
+MIN_DELTA = 0.005
+
+
+def robust_stats(samples: List[float]) -> Dict:
+    """样本的中位数和（按正态分布换算的）MAD"""
+    median = statistics.median(samples)
+    mad = statistics.median(abs(sample - median) for sample in samples) * MAD_SCALE
+    return {'median': median, 'mad': mad, 'samples': samples}
+
+
+def collect(manifest: Dict, runs: int, stages: Optional[List[str]] = None, warmup: int = 1) -> Dict[str, Dict]:
+    """运行基准 warmup + runs 次，返回 阶段名 -> 耗时统计；预热轮次填充页缓存，不计入统计"""
+    samples: Dict[str, List[float]] = {}
+    for i in range(warmup + runs):
+        results = BenchmarkSuite(manifest).run(stages)
+        if i < warmup:
+            continue
+        for stage, result in results.items():
+            samples.setdefault(stage, []).append(result['seconds'])
+    return {stage: robust_stats(values) for stage, values in samples.items()}
+
+
+def compare_stage(baseline: Optional[Dict], current: Dict, ratio: float = REGRESSION_RATIO,
+                  noise_factor: float = NOISE_FACTOR, min_delta: float = MIN_DELTA) -> str:
+    """比较单个阶段，返回 'regression' / 'improvement' / 'unchanged' / 'new'"""
+    if baseline is None:
+        return 'new'
+    delta = current['median'] - baseline['median']
+    noise = noise_factor * (baseline['mad'] ** 2 + current['mad'] ** 2) ** 0.5
+    threshold = max(ratio * baseline['median'], noise, min_delta)
+    if delta > threshold:
+        return 'regression'
+    if -delta > threshold:
+        return 'improvement'
+    return 'unchanged'
+
+
+STATUS_LABELS = {
+    'regression': '变慢 ✗',
+    'improvement': '变快',
+    'unchanged': '持平',
+    'new': '新阶段',
+    'missing': '未运行',
+}
+
+
+def print_comparison(baseline_stages: Dict[str, Dict], current_stages: Dict[str, Dict],
+                     statuses: Dict[str, str]):
+    """打印对比表格"""
+    print(f"\n{'阶段':<26} {'基线中位数':>12} {'±MAD':>8} {'当前中位数':>12} {'±MAD':>8} {'变化':>8}  状态")
+    print("-" * 92)
+    for stage, status in statuses.items():
+        base = baseline_stages.get(stage)
+        current = current_stages.get(stage)
+        base_text = f"{base['median']:>12.4f} {base['mad']:>8.4f}" if base else f"{'-':>12} {'-':>8}"
+        current_text = f"{current['median']:>12.4f} {current['mad']:>8.4f}" if current else f"{'-':>12} {'-':>8}"
+        if base and current and base['median'] > 0:
+            change = f"{(current['median'] / base['median'] - 1) * 100:+.1f}%"
+        else:
+            change = '-'
+        print(f"{stage:<26} {base_text} {current_text} {change:>8}  {STATUS_LABELS[status]}")
+
+
+def load_baselines(path: str) -> Dict[str, Dict]:
+    """读取基线文件，返回 平台 -> 基线；文件不存在时为空"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get('version') != BASELINE_VERSION:
+        raise ValueError(f"基线文件版本不匹配（需要 {BASELINE_VERSION}）: {path}")
+    return data['platforms']
+
+
+def save_baseline(path: str, baselines: Dict[str, Dict], scale: str, runs: int, stages: Dict[str, Dict]):
+    """写入当前平台的基线，保留其他平台的基线"""
+    baselines = dict(baselines)
+    baselines[sys.platform] = {
+        'scale': scale,
+        'runs': runs,
+        'stages': stages,
+    }
+    data = {'version': BASELINE_VERSION, 'platforms': baselines}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AppGraveyard 性能回归检查")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线 JSON 文件")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线，不做比较")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="每个阶段的测量次数")
+    parser.add_argument("--warmup", type=int, default=1, help="不计入统计的预热轮数")
+    parser.add_argument("--scale", choices=list(bench_fixtures.SCALES), help="夹具规模，默认与基线相同")
+    parser.add_argument("--fixtures", help="夹具目录，默认位于系统临时目录")
+    parser.add_argument("--stages", help="只检查这些阶段（逗号分隔）: " + ", ".join(STAGES))
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO, help="判定为变慢的最小相对增幅")
+    args = parser.parse_args()
+
+    try:
+        baselines = load_baselines(args.baseline)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading benchmark baseline {args.baseline}: {e}")
+        sys.exit(2)
+    baseline = None if args.update_baseline else baselines.get(sys.platform)
+    if baseline is None and not args.update_baseline:
+        print(f"没有 {sys.platform} 平台的基线，跳过性能回归检查"
+              f"（在该平台上用 --update-baseline 生成: {args.baseline}）")
+        return
+
+    scale = args.scale or (baseline['scale'] if baseline else 'small')
+    stages = args.stages.split(",") if args.stages else None
+    manifest = bench_fixtures.build_fixtures(args.fixtures or default_fixture_dir(scale), scale)
+    current = collect(manifest, args.runs, stages, args.warmup)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, baselines, scale, args.runs, current)
+        print(f"已更新 {sys.platform} 平台的基线: {args.baseline}")
+        print_comparison({}, current, {stage: 'new' for stage in current})
+        return
+
+    baseline_stages = baseline['stages']
+    statuses = {}
+    for stage in stages or list(STAGES):
+        if stage in current:
+            statuses[stage] = compare_stage(baseline_stages.get(stage), current[stage], args.ratio)
+        elif stage in baseline_stages:
+            statuses[stage] = 'missing'
+    print_comparison(baseline_stages, current, statuses)
+
+    regressions = [stage for stage, status in statuses.items() if status == 'regression']
+    if regressions:
+        print(f"\n性能回归: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n没有发现性能回归")
+
+
+if __name__ == "__main__":
+    main()
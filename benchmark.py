@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 扫描性能基准测试
+
+在 bench_fixtures 生成的合成夹具上分别计时各扫描阶段，
+报告耗时、每秒处理的文件/应用数、读写系统调用数和峰值内存。
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bench_fixtures
+import cross_platform_scanner
+import path_trie
+from cross_platform_scanner import AppScanner
+from scoring import AppScorer
+
+# 阶段名 -> 说明；按此顺序执行
+STAGES = {
+    'registry_enumeration': '枚举注册表卸载项（假注册表）',
+    'scan_installed_programs': '完整扫描（夹具中的 dpkg / 注册表 / 用户目录）',
+    'estimate_size_deep': '遍历深而宽的目录树',
+    'estimate_size_tiny': '遍历大量小文件',
+    'estimate_size_huge': '遍历单个超大文件',
+    'estimate_size_bundles': '遍历 .app 包',
+    'get_last_access_time': '查找可执行文件并读取最后使用时间',
+    'calculate_score': '计算坟墓分数',
+    'populate_tree': '填充界面列表',
+}
+
+
+def _syscall_counts() -> Optional[Tuple[int, int]]:
+    """当前进程累计的 (读, 写) 系统调用次数；不支持时返回 None"""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['syscr']), int(counters['syscw'])
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        io = psutil.Process().io_counters()
+        return io.read_count, io.write_count
+    except Exception:
+        return None
+
+
+def _peak_rss() -> Optional[int]:
+    """进程到目前为止的峰值常驻内存（字节）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 上单位是 KB，macOS 上是字节
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except Exception:
+        return None
+
+
+def measure(function: Callable[[], Tuple[int, str]]) -> Dict:
+    """执行 function 并记录耗时和资源用量；function 返回 (处理的条目数, 单位)"""
+    syscalls_before = _syscall_counts()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    items, unit = function()
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    syscalls_after = _syscall_counts()
+
+    result = {
+        'seconds': seconds,
+        'cpu_seconds': cpu_seconds,
+        'items': items,
+        'unit': unit,
+        'items_per_sec': items / seconds if seconds > 0 else 0.0,
+        'read_syscalls': None,
+        'write_syscalls': None,
+        'peak_rss': _peak_rss(),
+    }
+    if syscalls_before and syscalls_after:
+        result['read_syscalls'] = syscalls_after[0] - syscalls_before[0]
+        result['write_syscalls'] = syscalls_after[1] - syscalls_before[1]
+    return result
+
+
+@contextmanager
+def fixture_environment(manifest: Dict):
+    """让扫描器只看到夹具：替换主目录、数据目录、dpkg 和注册表"""
+    home = manifest['home']
+    overrides = {
+        'HOME': home,
+        'USERPROFILE': home,
+        'XDG_DATA_HOME': os.path.join(home, ".local", "share"),
+        'XDG_CACHE_HOME': os.path.join(home, ".cache"),
+        'XDG_CONFIG_HOME': os.path.join(home, ".config"),
+        'LOCALAPPDATA': os.path.join(home, "AppData", "Local"),
+        'PATH': manifest['bin_dir'] + os.pathsep + os.environ.get('PATH', ''),
+    }
+    saved_env = {key: os.environ.get(key) for key in overrides}
+    saved_dpkg = path_trie.DPKG_INFO_DIR
+    saved_winreg = getattr(cross_platform_scanner, 'winreg', None)
+    saved_plistlib = getattr(cross_platform_scanner, 'plistlib', None)
+
+    os.environ.update(overrides)
+    path_trie.DPKG_INFO_DIR = manifest['dpkg_info_dir']
+    cross_platform_scanner.winreg = bench_fixtures.FakeWinreg(manifest['registry'])
+    # 非 macOS 平台上扫描器没有导入 plistlib，读取夹具中的 .app 包时需要
+    if saved_plistlib is None:
+        import plistlib
+        cross_platform_scanner.plistlib = plistlib
+    try:
+        yield
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        path_trie.DPKG_INFO_DIR = saved_dpkg
+        if saved_winreg is None:
+            del cross_platform_scanner.winreg
+        else:
+            cross_platform_scanner.winreg = saved_winreg
+        if saved_plistlib is None:
+            del cross_platform_scanner.plistlib
+
+
+class BenchmarkSuite:
+    """在一份夹具上依次执行各阶段
+
+    后面的阶段需要前面阶段产生的应用列表时（例如只运行 calculate_score），
+    会先不计时地准备好输入。
+    """
+
+    def __init__(self, manifest: Dict):
+        self.manifest = manifest
+        self._apps: Optional[List[Dict]] = None
+
+    def _unbounded_scanner(self) -> AppScanner:
+        """不受单次遍历预算限制的扫描器，用于测量完整遍历的吞吐量"""
+        scanner = AppScanner()
+        scanner.walker.max_entries = 0
+        scanner.walker.time_budget = 0
+        return scanner
+
+    def _fixture_apps(self) -> List[Dict]:
+        """夹具中的全部应用：注册表程序、dpkg 包和 .app 包"""
+        if self._apps is None:
+            scanner = AppScanner()
+            apps = scanner._scan_windows_programs()
+            if sys.platform != "win32":
+                apps.extend(scanner.scan_installed_programs())
+            for bundle in self.manifest['bundles']:
+                app_info = scanner._get_macos_app_info(bundle)
+                if app_info:
+                    apps.append(app_info)
+            scanner._measure_pending_sizes(apps)
+            self._apps = apps
+            self._scanner = scanner
+        return self._apps
+
+    def stage_registry_enumeration(self) -> Tuple[int, str]:
+        apps = AppScanner()._scan_windows_programs()
+        return len(apps), 'apps'
+
+    def stage_scan_installed_programs(self) -> Tuple[int, str]:
+        apps = AppScanner().scan_installed_programs()
+        return len(apps), 'apps'
+
+    def _walk_tree(self, path: str) -> Tuple[int, str]:
+        scanner = self._unbounded_scanner()
+        app_info = {'name': os.path.basename(path), 'install_location': path}
+        scanner._estimate_size_from_install_location(path, app_info)
+        return app_info.get('file_count', 0), 'files'
+
+    def stage_estimate_size_deep(self) -> Tuple[int, str]:
+        return self._walk_tree(self.manifest['trees']['deep'])
+
+    def stage_estimate_size_tiny(self) -> Tuple[int, str]:
+        return self._walk_tree(self.manifest['trees']['tiny'])
+
+    def stage_estimate_size_huge(self) -> Tuple[int, str]:
+        return self._walk_tree(self.manifest['trees']['huge'])
+
+    def stage_estimate_size_bundles(self) -> Tuple[int, str]:
+        scanner = self._unbounded_scanner()
+        files = 0
+        for bundle in self.manifest['bundles']:
+            app_info = {'name': os.path.basename(bundle), 'install_location': bundle}
+            scanner._estimate_size_from_install_location(bundle, app_info)
+            files += app_info.get('file_count', 0)
+        return files, 'files'
+
+    def stage_get_last_access_time(self) -> Tuple[int, str]:
+        apps = self._fixture_apps()
+        for app in apps:
+            app['last_access_time'] = self._scanner.get_last_access_time(app)
+        return len(apps), 'apps'
+
+    def stage_calculate_score(self) -> Tuple[int, str]:
+        apps = self._fixture_apps()
+        scorer = AppScorer()
+        for app in apps:
+            app.update(scorer.calculate_score(app))
+        return len(apps), 'apps'
+
+    def stage_populate_tree(self) -> Tuple[int, str]:
+        apps = self._fixture_apps()
+        if 'score' not in apps[0]:
+            scorer = AppScorer()
+            for app in apps:
+                app.update(scorer.calculate_score(app))
+        ui = self._ui
+        ui.apps_data = apps
+        ui.populate_tree()
+        ui.root.update_idletasks()
+        return len(apps), 'apps'
+
+    def _prepare_ui(self) -> bool:
+        """创建隐藏的界面；没有图形环境时返回 False"""
+        try:
+            import tkinter as tk
+            from ui_fixed import AppGraveyardUI
+        except ImportError as e:
+            print(f"跳过 populate_tree：无法导入界面（{e}）")
+            return False
+        try:
+            self._ui = AppGraveyardUI([])
+            self._ui.root.withdraw()
+            return True
+        except tk.TclError as e:
+            print(f"跳过 populate_tree：无法创建界面（{e}）")
+            return False
+
+    def run(self, stages: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """执行选定的阶段（默认全部），返回 阶段名 -> 指标"""
+        results = {}
+        with fixture_environment(self.manifest):
+            for stage in stages or list(STAGES):
+                if stage == 'populate_tree' and not self._prepare_ui():
+                    continue
+                try:
+                    results[stage] = measure(getattr(self, f"stage_{stage}"))
+                finally:
+                    if stage == 'populate_tree':
+                        self._ui.root.destroy()
+        return results
+
+
+def _format_count(value: Optional[float]) -> str:
+    if value is None:
+        return '-'
+    if value >= 1e6:
+        return f"{value / 1e6:.1f}M"
+    if value >= 1e3:
+        return f"{value / 1e3:.1f}K"
+    return f"{value:.0f}"
+
+
+def print_report(results: Dict[str, Dict]):
+    """打印结果表格"""
+    print(f"\n{'阶段':<26} {'耗时(s)':>9} {'CPU(s)':>8} {'条目':>8} {'每秒':>9} {'读调用':>8} {'写调用':>8} {'峰值内存':>9}")
+    print("-" * 96)
+    for stage, result in results.items():
+        peak = f"{result['peak_rss'] / 1024 ** 2:.0f}MB" if result['peak_rss'] else '-'
+        print(f"{stage:<26} {result['seconds']:>9.3f} {result['cpu_seconds']:>8.3f} "
+              f"{_format_count(result['items']):>8} {_format_count(result['items_per_sec']) + '/' + result['unit'][0]:>9} "
+              f"{_format_count(result['read_syscalls']):>8} {_format_count(result['write_syscalls']):>8} {peak:>9}")
+
+
+def default_fixture_dir(scale: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"appgraveyard-bench-{scale}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AppGraveyard 扫描性能基准测试")
+    parser.add_argument("--scale", choices=list(bench_fixtures.SCALES), default='small',
+                        help="夹具规模（large 会生成数百万个文件）")
+    parser.add_argument("--fixtures", help="夹具目录，默认位于系统临时目录；已生成时直接复用")
+    parser.add_argument("--seed", type=int, default=0, help="生成夹具的随机种子")
+    parser.add_argument("--stages", help="只运行这些阶段（逗号分隔）: " + ", ".join(STAGES))
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    stages = args.stages.split(",") if args.stages else None
+    for stage in stages or []:
+        if stage not in STAGES:
+            parser.error(f"未知阶段: {stage}")
+
+    fixture_dir = args.fixtures or default_fixture_dir(args.scale)
+    manifest = bench_fixtures.build_fixtures(fixture_dir, args.scale, args.seed)
+    results = BenchmarkSuite(manifest).run(stages)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'scale': args.scale, 'platform': sys.platform, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
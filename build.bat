@@ -4,6 +4,14 @@ echo Building AppGraveyard...
 REM 安装依赖
 pip install -r requirements.txt
 
+REM 性能回归检查，变慢时停止打包（没有 win32 基线时跳过检查）
+python bench_gate.py
+if errorlevel 1 (
+    echo Benchmark regression detected, build aborted.
+    pause
+    exit /b 1
+)
+
 REM 使用 PyInstaller 打包
 pyinstaller --onefile --windowed --name AppGraveyard appgraveyard_fixed.py
 
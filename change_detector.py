@@ -0,0 +1,121 @@
+import os
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 注册表中的卸载信息位置
+UNINSTALL_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"
+
+# 注册表来源名 -> (根键, 注册表视图, 记录中的完整路径, 显示名)；按枚举（和去重优先级）顺序排列
+REGISTRY_SOURCES: Dict[str, Tuple[str, Optional[str], str, str]] = {
+    'hklm64': ('HKEY_LOCAL_MACHINE', 'KEY_WOW64_64KEY',
+               r"HKEY_LOCAL_MACHINE\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall", "HKLM 64位"),
+    'hklm32': ('HKEY_LOCAL_MACHINE', 'KEY_WOW64_32KEY',
+               r"HKEY_LOCAL_MACHINE\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall", "HKLM 32位"),
+    'hkcu': ('HKEY_CURRENT_USER', None,
+             r"HKEY_CURRENT_USER\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall", "HKCU"),
+}
+
+# Linux 包数据库；dpkg 和 rpm 只会用到其中一个，作为同一个来源
+DPKG_STATUS = "/var/lib/dpkg/status"
+RPM_DB_DIRS = ["/var/lib/rpm", "/usr/lib/sysimage/rpm"]
+
+Fingerprint = Optional[Tuple]
+
+
+def open_uninstall_key(registry, source: str):
+    """打开某个注册表来源的卸载键；registry 为 winreg 模块（基准测试中可以替换）"""
+    hive, view, _, _ = REGISTRY_SOURCES[source]
+    access = registry.KEY_READ | (getattr(registry, view) if view else 0)
+    return registry.OpenKey(getattr(registry, hive), UNINSTALL_KEY, 0, access)
+
+
+def application_dirs() -> Dict[str, str]:
+    """macOS 应用程序文件夹：来源名 -> 路径"""
+    return {
+        'applications': "/Applications",
+        'user_applications': os.path.expanduser("~/Applications"),
+    }
+
+
+def _stat_fingerprint(path: str) -> Fingerprint:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _dir_entries_fingerprint(path: str) -> Fingerprint:
+    """目录中各文件的修改时间和大小（rpm 数据库由多个文件组成，sqlite 的 -wal 文件也会变化）"""
+    try:
+        with os.scandir(path) as entries:
+            return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                                for entry in entries if entry.is_file()))
+    except OSError:
+        return None
+
+
+def _linux_packages_fingerprint() -> Fingerprint:
+    return (_stat_fingerprint(DPKG_STATUS),) + tuple(_dir_entries_fingerprint(path) for path in RPM_DB_DIRS)
+
+
+class ChangeDetector:
+    """在枚举应用之前检查包数据库的 "指纹"，判断哪些来源可能变化了
+
+    - Windows：每个卸载键的 LastWriteTime 和子键数（安装/卸载程序会增删子键）
+    - macOS：应用程序文件夹的修改时间（增删或替换 .app 会改变目录）
+    - Linux：dpkg status 文件和 rpm 数据库文件的修改时间、大小
+
+    一次检查只需几次 stat（或 RegQueryInfoKey），远比重新枚举便宜。
+    注意只改写卸载项中某个值（不增删子键）的升级不会改变父键的 LastWriteTime。
+    """
+
+    def __init__(self, registry=None):
+        # registry 为 winreg 模块；为 None 时不检查注册表来源
+        self.registry = registry
+        self.recorded: Dict[str, Fingerprint] = {}
+
+    def sources(self) -> Dict[str, Callable[[], Fingerprint]]:
+        """当前平台的来源名 -> 指纹函数"""
+        if sys.platform == "win32":
+            if self.registry is None:
+                return {}
+            return {source: lambda source=source: self._registry_fingerprint(source)
+                    for source in REGISTRY_SOURCES}
+        if sys.platform == "darwin":
+            return {source: lambda path=path: _stat_fingerprint(path)
+                    for source, path in application_dirs().items()}
+        return {'packages': _linux_packages_fingerprint}
+
+    def _registry_fingerprint(self, source: str) -> Fingerprint:
+        try:
+            key = open_uninstall_key(self.registry, source)
+        except OSError:
+            return None
+        try:
+            subkeys, _, last_write = self.registry.QueryInfoKey(key)
+            return (subkeys, last_write)
+        except OSError:
+            return None
+        finally:
+            self.registry.CloseKey(key)
+
+    def fingerprints(self) -> Dict[str, Fingerprint]:
+        """读取所有来源的当前指纹"""
+        return {source: fingerprint() for source, fingerprint in self.sources().items()}
+
+    def changed_sources(self, current: Optional[Dict[str, Fingerprint]] = None) -> List[str]:
+        """与上次记录相比指纹不同（或从未记录）的来源"""
+        if current is None:
+            current = self.fingerprints()
+        return [source for source, fingerprint in current.items()
+                if source not in self.recorded or self.recorded[source] != fingerprint]
+
+    def record(self, current: Dict[str, Fingerprint], sources: Optional[Iterable[str]] = None):
+        """记录已重新枚举的来源的指纹
+
+        current 应在枚举开始之前读取：枚举期间发生的变化会在下次检查时被发现。
+        """
+        for source in (current if sources is None else sources):
+            if source in current:
+                self.recorded[source] = current[source]
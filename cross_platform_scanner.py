@@ -2,6 +2,11 @@ import os
 import sys
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from usage_tracker import app_key
+from instrumentation import telemetry
+from scanner_base import ScannerBase
+from app_identity import merge_duplicates
+from change_detector import REGISTRY_SOURCES, ChangeDetector, application_dirs, open_uninstall_key
 
 # Platform-specific imports
 if sys.platform == "win32":
@@ -13,95 +18,100 @@ elif sys.platform == "darwin":  # macOS
 else:  # Linux and others
     import subprocess
 
-class AppScanner:
+class AppScanner(ScannerBase):
     """跨平台扫描已安装程序的类"""
     
-    def __init__(self):
-        self.installed_apps = []
+    def __init__(self, parallel: bool = True, background: bool = False, all_users: bool = False,
+                 find_duplicates: bool = False):
+        super().__init__(parallel, background, all_users, find_duplicates)
+        # 包数据库指纹；没有变化的来源沿用上一轮枚举的记录
+        self.change_detector = ChangeDetector(winreg if sys.platform == "win32" else None)
     
-    def scan_installed_programs(self) -> List[Dict]:
-        """根据平台扫描已安装的程序"""
-        if sys.platform == "win32":
-            return self._scan_windows_programs()
-        elif sys.platform == "darwin":
-            return self._scan_macos_applications()
-        else:
-            return self._scan_linux_packages()
+    def scan_installed_programs(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """根据平台扫描已安装的程序
+        
+        sources 为需要重新枚举的来源（见 ChangeDetector.sources），默认全部；
+        其余来源直接沿用上一轮的记录和大小统计，独占空间按本轮的全部应用重新结算。
+        """
+        self._start_reclaim_tracking(sources)
+        self.usage_log.load()
+        # 指纹在枚举之前读取，枚举期间的变化留到下次检查
+        fingerprints = self.change_detector.fingerprints()
+        with telemetry.span('enumeration', platform=sys.platform) as span:
+            if sys.platform == "win32":
+                apps = self._scan_windows_programs(sources)
+            elif sys.platform == "darwin":
+                apps = self._scan_macos_applications(sources)
+            else:
+                apps = self._scan_linux_packages()
+                # 软件包不遍历目录；上一轮管理员模式下各用户应用的遍历进度在这里去掉
+                self._retire_walks(apps)
+            span.set(apps=len(apps))
+        self.change_detector.record(fingerprints, sources)
+        return self._finish_scan(apps)
     
-    def _scan_windows_programs(self) -> List[Dict]:
-        """扫描Windows已安装程序"""
-        apps = []
+    def _scan_windows_programs(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """扫描Windows已安装程序；sources 为需要重新读取的注册表来源，默认全部"""
+        for source in (REGISTRY_SOURCES if sources is None else sources):
+            if source in REGISTRY_SOURCES:
+                self._source_apps[source] = self._scan_uninstall_source(source)
+        apps = [app for source in REGISTRY_SOURCES for app in self._source_apps.get(source, [])]
         
-        # 扫描机器级别的安装 (HKLM) - 64位
-        try:
-            hklm_key_64 = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-                                    0, winreg.KEY_READ | winreg.KEY_WOW64_64KEY)
-            apps.extend(self._scan_registry_key(hklm_key_64))
-            winreg.CloseKey(hklm_key_64)
-            print(f"从 HKLM 64位 找到 {len(apps)} 个程序")
-        except Exception as e:
-            print(f"Error scanning HKLM 64位: {e}")
+        # 按稳定的应用标识合并同一个安装在多个来源中的记录（同名的不同安装各自保留）
+        apps_list = merge_duplicates(apps)
+        print(f"去重后总共有 {len(apps_list)} 个程序")
         
-        # 扫描机器级别的安装 (HKLM) - 32位
-        try:
-            hklm_key_32 = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-                                    0, winreg.KEY_READ | winreg.KEY_WOW64_32KEY)
-            apps_32 = self._scan_registry_key(hklm_key_32)
-            apps.extend(apps_32)
-            winreg.CloseKey(hklm_key_32)
-            print(f"从 HKLM 32位 找到 {len(apps_32)} 个程序")
-        except Exception as e:
-            print(f"Error scanning HKLM 32位: {e}")
+        # 统计需要遍历安装目录的程序大小（过滤时要用到大小）
+        self._retire_walks(apps_list)
+        self._measure_pending_sizes(apps_list)
         
-        # 扫描用户级别的安装 (HKCU)
+        # 过滤无效条目（但保留更多有效程序）
+        return self._filter_valid_apps(apps_list)
+    
+    def _scan_uninstall_source(self, source: str) -> List[Dict]:
+        """读取一个注册表来源（HKLM 64位/32位视图或 HKCU）中的卸载项"""
+        _, _, key_path, label = REGISTRY_SOURCES[source]
         try:
-            hkcu_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER,
-                                    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall")
-            apps_hkcu = self._scan_registry_key(hkcu_key)
-            apps.extend(apps_hkcu)
-            winreg.CloseKey(hkcu_key)
-            print(f"从 HKCU 找到 {len(apps_hkcu)} 个程序")
+            registry_key = open_uninstall_key(winreg, source)
+            try:
+                apps = self._scan_registry_key(registry_key, key_path)
+            finally:
+                winreg.CloseKey(registry_key)
+            for app in apps:
+                app['source'] = source
+            print(f"从 {label} 找到 {len(apps)} 个程序")
+            return apps
         except Exception as e:
-            print(f"Error scanning HKCU: {e}")
-        
-        # 去重（基于名称）
-        unique_apps = {}
-        for app in apps:
-            if app.get('name') and app['name'] not in unique_apps:
-                unique_apps[app['name']] = app
-        
-        apps_list = list(unique_apps.values())
-        print(f"去重后总共有 {len(apps_list)} 个程序")
-        
-        # 过滤无效条目（但保留更多有效程序）
-        valid_apps = [app for app in apps_list if self._is_valid_app(app)]
-        print(f"过滤后剩下 {len(valid_apps)} 个有效程序")
-        
-        return valid_apps
+            print(f"Error scanning {label}: {e}")
+            telemetry.error('registry_enumeration', e)
+            return []
     
-    def _scan_registry_key(self, registry_key) -> List[Dict]:
-        """扫描单个注册表键"""
+    def _scan_registry_key(self, registry_key, key_path: str) -> List[Dict]:
+        """扫描单个注册表键；key_path 为该键的完整路径，用于记录每个程序的注册表路径"""
         apps = []
         i = 0
-        while True:
-            try:
-                subkey_name = winreg.EnumKey(registry_key, i)
-                subkey_path = f"{registry_key.name}\\{subkey_name}"
-                
-                with winreg.OpenKey(registry_key, subkey_name) as subkey:
-                    app_info = self._get_app_info_from_registry(subkey, subkey_path)
-                    if app_info:
-                        apps.append(app_info)
-                i += 1
-            except OSError:
-                # 没有更多的子键了
-                break
-            except Exception as e:
-                print(f"Error enumerating key at index {i}: {e}")
-                i += 1
-                continue
+        with telemetry.span('registry_enumeration', label=key_path) as span:
+            while True:
+                try:
+                    subkey_name = winreg.EnumKey(registry_key, i)
+                    subkey_path = f"{key_path}\\{subkey_name}"
+                    
+                    with winreg.OpenKey(registry_key, subkey_name) as subkey:
+                        app_info = self._get_app_info_from_registry(subkey, subkey_path)
+                        if app_info:
+                            apps.append(app_info)
+                    i += 1
+                except OSError:
+                    # 没有更多的子键了
+                    break
+                except Exception as e:
+                    print(f"Error enumerating key at index {i}: {e}")
+                    telemetry.error('registry_enumeration', e)
+                    i += 1
+                    continue
+            span.set(subkeys=i, apps=len(apps))
+        telemetry.count('registry.subkeys', i)
+        telemetry.count('registry.apps', len(apps))
         return apps
     
     def _get_app_info_from_registry(self, subkey, subkey_path: str) -> Optional[Dict]:
@@ -184,37 +194,47 @@ class AppScanner:
             except (FileNotFoundError, ValueError):
                 app_info['install_date'] = None
             
-            # 获取大小
+            # 获取大小：注册表中的 EstimatedSize 只作为没有安装目录或遍历不到文件时的后备值
             try:
                 estimated_size = int(winreg.QueryValueEx(subkey, "EstimatedSize")[0])
                 # 注册表中的大小通常是以KB为单位
                 app_info['size'] = estimated_size * 1024  # 转换为字节
+                app_info['estimated_size'] = app_info['size']
             except (FileNotFoundError, ValueError):
-                app_info['size'] = self._estimate_size_from_install_location(app_info['install_location'])
+                pass
+            if app_info['install_location']:
+                # 有安装目录时总是遍历，可回收空间和重复文件检测都依赖遍历结果；
+                # 遍历推迟到去重之后，按存储设备并行执行
+                self._pending_size_walks.append(app_info)
             
             return app_info
             
         except Exception as e:
             print(f"Error reading registry entry {subkey_path}: {e}")
+            telemetry.error('registry_enumeration', e)
             return None
     
-    def _scan_macos_applications(self) -> List[Dict]:
-        """扫描macOS应用程序"""
-        apps = []
-        applications_dirs = [
-            "/Applications",
-            os.path.expanduser("~/Applications")
-        ]
-        
-        for app_dir in applications_dirs:
+    def _scan_macos_applications(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """扫描macOS应用程序；sources 为需要重新读取的应用程序文件夹，默认全部"""
+        applications_dirs = application_dirs()
+        for source in (applications_dirs if sources is None else sources):
+            app_dir = applications_dirs.get(source)
+            if app_dir is None:
+                continue
+            dir_apps = []
             if os.path.exists(app_dir):
                 for item in os.listdir(app_dir):
                     if item.endswith(".app"):
                         app_path = os.path.join(app_dir, item)
                         app_info = self._get_macos_app_info(app_path)
                         if app_info:
-                            apps.append(app_info)
+                            app_info['source'] = source
+                            dir_apps.append(app_info)
+            self._source_apps[source] = dir_apps
         
+        apps = [app for source in applications_dirs for app in self._source_apps.get(source, [])]
+        self._retire_walks(apps)
+        self._measure_pending_sizes(apps)
         return apps
     
     def _get_macos_app_info(self, app_path: str) -> Optional[Dict]:
@@ -236,13 +256,10 @@ class AppScanner:
                 except Exception:
                     pass
             
-            # 计算大小
-            size = self._estimate_size_from_install_location(app_path)
-            
-            return {
+            app_info = {
                 'name': app_name,
                 'install_location': app_path,
-                'size': size,
+                'size': 0,
                 'install_date': None,
                 'uninstall_string': f"rm -rf '{app_path}'",
                 'display_icon': '',
@@ -251,8 +268,14 @@ class AppScanner:
                 'bundle_id': bundle_id,
                 'platform': 'macos'
             }
+            
+            # 大小在扫描完所有应用后按存储设备并行统计
+            self._pending_size_walks.append(app_info)
+            
+            return app_info
         except Exception as e:
             print(f"Error reading macOS app {app_path}: {e}")
+            telemetry.error('enumeration', e)
             return None
     
     def _scan_linux_packages(self) -> List[Dict]:
@@ -274,6 +297,7 @@ class AppScanner:
                     break
             except Exception as e:
                 print(f"Error running {cmd}: {e}")
+                telemetry.error('enumeration', e)
                 continue
         
         return apps
@@ -297,7 +321,8 @@ class AppScanner:
                         'display_icon': '',
                         'publisher': '',
                         'version': version,
-                        'platform': 'linux'
+                        'platform': 'linux',
+                        'source': 'dpkg'
                     })
         return apps
     
@@ -324,85 +349,25 @@ class AppScanner:
                         'display_icon': '',
                         'publisher': '',
                         'version': version,
-                        'platform': 'linux'
+                        'platform': 'linux',
+                        'source': 'rpm'
                     })
         return apps
     
-    def _estimate_size_from_install_location(self, install_location: str) -> int:
-        """根据安装位置估算程序大小"""
-        if not install_location or not os.path.exists(install_location):
-            return 0
-        
-        try:
-            total_size = 0
-            file_count = 0
-            for dirpath, dirnames, filenames in os.walk(install_location):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    try:
-                        total_size += os.path.getsize(filepath)
-                        file_count += 1
-                        # 限制文件数量以提高性能
-                        if file_count > 1000:
-                            break
-                    except (OSError, FileNotFoundError):
-                        continue
-                if file_count > 1000:
-                    break
-            return total_size
-        except Exception as e:
-            print(f"Error estimating size for {install_location}: {e}")
-            return 0
-    
-    def _is_valid_app(self, app: Dict) -> bool:
-        """检查应用是否有效（排除系统组件等）"""
-        if not app.get('name') or not app['name'].strip():
-            return False
-        
-        app_name = app['name'].strip()
-        
-        # 排除一些常见的系统组件（但更宽松）
-        system_components = [
-            'Microsoft Visual C++',
-            'Windows Driver Package',
-            'Hotfix',
-            'Update for Microsoft',
-            'Security Update for Microsoft',
-            'Service Pack',
-            'Definition Update',
-            'Language Pack',
-            'Windows Setup',
-            'Microsoft .NET Framework',
-            'Microsoft ASP.NET',
-            'Microsoft SQL Server',
-            'Microsoft Silverlight',
-            'Microsoft OneDrive',
-            'Microsoft Edge',
-            'Windows App Runtime'
-        ]
-        
-        app_name_lower = app_name.lower()
-        for component in system_components:
-            if component.lower() in app_name_lower:
-                return False
-        
-        # 必须有卸载字符串或者有效的安装位置
-        has_uninstall = bool(app.get('uninstall_string') and app['uninstall_string'].strip())
-        has_install_loc = bool(app.get('install_location') and app['install_location'].strip() and os.path.exists(app.get('install_location', '')))
-        
-        if not has_uninstall and not has_install_loc:
-            return False
-        
-        # 排除非常小的程序（小于1KB）
-        if app.get('size', 0) < 1024:
-            return False
-        
-        return True
-    
     def get_last_access_time(self, app: Dict) -> Optional[datetime]:
         """获取应用的最后访问时间"""
+        # 优先级0: 使用记录守护进程采样到的最后运行时间
+        last_seen = self.usage_log.last_used(app_key(app))
+        if last_seen:
+            telemetry.count('usage_log.hits')
+            return datetime.fromtimestamp(last_seen)
+        telemetry.count('usage_log.misses')
+        
         # 优先级1: 检查可执行文件的最后访问时间
-        executable_paths = self._find_executables(app)
+        with telemetry.span('executable_discovery', label=app.get('name')) as span:
+            executable_paths = self._find_executables(app)
+            span.set(found=len(executable_paths))
+        telemetry.count('executables.found', len(executable_paths))
         if executable_paths:
             latest_access = None
             for exe_path in executable_paths[:3]:  # 限制检查数量以提高性能
@@ -470,15 +435,11 @@ class AppScanner:
                             break
                     
                     if not executables:
-                        for root, dirs, files in os.walk(install_location):
-                            for file in files:
-                                if file.lower().endswith('.exe'):
-                                    executables.append(os.path.join(root, file))
-                                    break
-                            if executables:
-                                break
+                        executables.extend(self.walker.find_files(
+                            install_location, lambda name: name.lower().endswith('.exe')))
                 except Exception as e:
                     print(f"Error finding executables in {install_location}: {e}")
+                    telemetry.error('executable_discovery', e)
         
         elif platform == 'macos':
             # macOS: look for the main executable in Contents/MacOS
@@ -493,8 +454,9 @@ class AppScanner:
                             break
         
         elif platform == 'linux':
-            # Linux: this is more complex, but we can check common locations
-            # For now, just return empty list as Linux apps are handled differently
-            pass
+            # Linux: 包文件清单中 bin 目录下的文件（构建路径索引时记录）
+            for exe_path in app.get('executables', []):
+                if os.path.isfile(exe_path) and os.access(exe_path, os.X_OK):
+                    executables.append(exe_path)
         
         return executables
\ No newline at end of file
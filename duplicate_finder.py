@@ -0,0 +1,114 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 参与比较的最小文件大小；更小的文件即使重复，能省下的空间也不值得读盘
+DEFAULT_MIN_SIZE = 64 * 1024
+
+# 预筛选时读取的首尾块大小，以及完整哈希时每次读取的大小
+PARTIAL_BLOCK_SIZE = 64 * 1024
+FULL_READ_SIZE = 1024 * 1024
+
+DEFAULT_WORKERS = 8
+
+
+def _partial_hash(path: str, size: int) -> Optional[bytes]:
+    """只读首尾两个块的哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            digest.update(f.read(PARTIAL_BLOCK_SIZE))
+            if size > PARTIAL_BLOCK_SIZE:
+                f.seek(max(PARTIAL_BLOCK_SIZE, size - PARTIAL_BLOCK_SIZE))
+                digest.update(f.read(PARTIAL_BLOCK_SIZE))
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def _full_hash(path: str) -> Optional[bytes]:
+    """整个文件的哈希"""
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(FULL_READ_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.digest()
+
+
+class DuplicateFinder:
+    """在已扫描的安装目录之间查找内容相同的文件
+
+    分三步逐步缩小范围：先按大小分桶（直接使用大小遍历时收集的 stat 数据，
+    不再访问磁盘），再对大小相同的文件只哈希首尾两块，最后只对仍然冲突的
+    文件计算完整哈希。哈希在线程池中进行。同一 inode 的硬链接本来就只占一份空间，
+    不算作重复。cross_app_only 为 True 时只报告跨应用的重复组。
+    """
+
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE, max_workers: int = DEFAULT_WORKERS,
+                 cross_app_only: bool = True):
+        self.min_size = min_size
+        self.max_workers = max_workers
+        self.cross_app_only = cross_app_only
+
+    def _hash_groups(self, pool: ThreadPoolExecutor, groups: List[List[Tuple]], hash_func) -> List[List[Tuple]]:
+        """对每组文件按 hash_func(文件) 再细分，只保留仍有多个文件的子组"""
+        files = [item for group in groups for item in group]
+        digests = pool.map(hash_func, files)
+        refined: Dict[tuple, List[Tuple]] = {}
+        for item, digest in zip(files, digests):
+            if digest is not None:
+                refined.setdefault((item[0], digest), []).append(item)
+        return [group for group in refined.values() if len(group) > 1]
+
+    def find(self, sources: Iterable[Tuple[Dict, List[Tuple[int, int, str]]]]) -> List[Dict]:
+        """sources 为 (应用, [(大小, inode 键, 路径), ...])，返回按可节省空间排序的重复组"""
+        by_size: Dict[int, List[Tuple]] = {}
+        seen_inodes = set()
+        for app, files in sources:
+            for size, inode_key, path in files:
+                if size < self.min_size:
+                    continue
+                if inode_key:
+                    if inode_key in seen_inodes:
+                        continue
+                    seen_inodes.add(inode_key)
+                by_size.setdefault(size, []).append((size, path, app))
+
+        candidates = [group for group in by_size.values() if len(group) > 1]
+        if self.cross_app_only:
+            # 大小相同的文件全部来自同一个应用时不可能构成跨应用重复，不必读盘
+            candidates = [group for group in candidates if len({id(app) for _, _, app in group}) > 1]
+        if not candidates:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            candidates = self._hash_groups(pool, candidates, lambda item: _partial_hash(item[1], item[0]))
+            # 不超过两个块的文件已被首尾块完整覆盖，无需再读一遍
+            small = [group for group in candidates if group[0][0] <= 2 * PARTIAL_BLOCK_SIZE]
+            large = [group for group in candidates if group[0][0] > 2 * PARTIAL_BLOCK_SIZE]
+            confirmed = small + self._hash_groups(pool, large, lambda item: _full_hash(item[1]))
+
+        report = []
+        for group in confirmed:
+            size = group[0][0]
+            apps = []
+            for _, _, app in group:
+                if not any(existing is app for existing in apps):
+                    apps.append(app)
+            if self.cross_app_only and len(apps) < 2:
+                continue
+            report.append({
+                'size': size,
+                'count': len(group),
+                'savable_bytes': size * (len(group) - 1),
+                'files': [{'path': path, 'app': app.get('name', '')} for _, path, app in group],
+                'apps': [app.get('name', '') for app in apps],
+            })
+        report.sort(key=lambda item: item['savable_bytes'], reverse=True)
+        return report
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+应用排除规则
+
+决定哪些卸载项不算作 "应用"（系统组件、更新补丁、运行库等）。默认规则写在代码中，
+可以用 JSON 规则文件整体替换任意一类规则，按机器集群分发而不需要改代码：
+
+    {
+        "name_patterns": ["Microsoft Visual C++", {"id": "kb", "pattern": "\\\\(KB\\\\d+\\\\)", "regex": true}],
+        "publishers": ["Contoso IT"],
+        "path_prefixes": ["C:\\\\Windows"],
+        "min_size": 1024,
+        "require_uninstall_or_location": true
+    }
+
+名称和发布者规则不区分大小写，默认按子串匹配；regex 为 true 时按正则表达式匹配。
+文件中没有出现的键沿用默认规则。规则文件默认位于 AppGraveyard 数据目录中，
+也可以用环境变量 APPGRAVEYARD_EXCLUSION_RULES 指定。
+
+    python exclusion_rules.py --dump-defaults rules.json   # 导出默认规则作为起点
+    python exclusion_rules.py --rules rules.json           # 检查规则文件
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+from app_paths import app_data_dir
+from path_trie import PathTrie
+
+RULES_ENV = "APPGRAVEYARD_EXCLUSION_RULES"
+RULES_NAME = "exclusion_rules.json"
+
+# 单条名称/发布者规则：字符串（子串）或 {"id", "pattern", "regex"}
+RuleEntry = Union[str, Dict]
+
+# 合并后的正则和 分组名 -> 规则标识
+CompiledPatterns = Tuple[re.Pattern, Dict[str, str]]
+
+DEFAULT_RULES: Dict = {
+    # 常见的系统组件（但更宽松）
+    'name_patterns': [
+        'Microsoft Visual C++',
+        'Windows Driver Package',
+        'Hotfix',
+        'Update for Microsoft',
+        'Security Update for Microsoft',
+        'Service Pack',
+        'Definition Update',
+        'Language Pack',
+        'Windows Setup',
+        'Microsoft .NET Framework',
+        'Microsoft ASP.NET',
+        'Microsoft SQL Server',
+        'Microsoft Silverlight',
+        'Microsoft OneDrive',
+        'Microsoft Edge',
+        'Windows App Runtime',
+    ],
+    'publishers': [],
+    'path_prefixes': [],
+    # 排除非常小的程序（小于1KB）
+    'min_size': 1024,
+    # 必须有卸载字符串或者有效的安装位置
+    'require_uninstall_or_location': True,
+}
+
+
+def default_rules_path() -> str:
+    return os.environ.get(RULES_ENV) or os.path.join(app_data_dir(), RULES_NAME)
+
+
+def _compile_patterns(kind: str, entries: List[RuleEntry]) -> Optional[CompiledPatterns]:
+    """把所有规则合并成一个带命名分组的正则，一次 search 即可判断并知道是哪条规则命中"""
+    alternatives = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'pattern': entry}
+        pattern = entry['pattern']
+        rule_id = entry.get('id') or pattern
+        body = pattern if entry.get('regex') else re.escape(pattern)
+        re.compile(body)  # 单独编译一次，出错时能指出是哪条规则
+        alternatives.append((f"{kind[0]}{index}", f"{kind}:{rule_id}", body))
+    if not alternatives:
+        return None
+    pattern = re.compile("|".join(f"(?P<{group}>{body})" for group, _, body in alternatives), re.IGNORECASE)
+    return pattern, {group: rule_id for group, rule_id, _ in alternatives}
+
+
+class ExclusionRules:
+    """编译好的排除规则
+
+    名称和发布者规则各合并为一个正则，路径前缀放进 PathTrie，
+    match() 对每个应用只做一遍检查并返回命中的规则标识。
+    只有没有卸载字符串时才检查安装目录是否存在。
+    """
+
+    def __init__(self, rules: Optional[Dict] = None, source: str = '默认规则'):
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        self.source = source
+        self._names = _compile_patterns('name', self.rules['name_patterns'])
+        self._publishers = _compile_patterns('publisher', self.rules['publishers'])
+        self._paths = PathTrie()
+        for prefix in self.rules['path_prefixes']:
+            self._paths.add(prefix, f"path:{prefix}")
+        self.min_size = int(self.rules['min_size'] or 0)
+        self.require_uninstall_or_location = bool(self.rules['require_uninstall_or_location'])
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'ExclusionRules':
+        """读取规则文件；文件不存在时使用默认规则，文件无效时打印错误并使用默认规则"""
+        path = path or default_rules_path()
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rules = json.load(f)
+            unknown = set(rules) - set(DEFAULT_RULES)
+            if unknown:
+                raise ValueError(f"未知的规则类型: {', '.join(sorted(unknown))}")
+            return cls(rules, path)
+        except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+            print(f"Error loading exclusion rules {path}: {e}")
+            return cls()
+
+    @staticmethod
+    def _search(compiled: Optional[CompiledPatterns], text: str) -> Optional[str]:
+        if compiled is None or not text:
+            return None
+        pattern, rule_ids = compiled
+        match = pattern.search(text)
+        return rule_ids[match.lastgroup] if match else None
+
+    def match(self, app: Dict) -> Optional[str]:
+        """返回排除该应用的规则标识；应用有效时返回 None"""
+        name = (app.get('name') or '').strip()
+        if not name:
+            return 'no_name'
+        rule = self._search(self._names, name) or self._search(self._publishers, app.get('publisher') or '')
+        if rule:
+            return rule
+
+        install_location = (app.get('install_location') or '').strip()
+        if install_location and self.rules['path_prefixes']:
+            rule = self._paths.lookup(install_location)
+            if rule:
+                return rule
+
+        if self.require_uninstall_or_location:
+            has_uninstall = bool((app.get('uninstall_string') or '').strip())
+            if not has_uninstall and not (install_location and os.path.exists(install_location)):
+                return 'no_uninstall'
+
+        if (app.get('size', 0) or 0) < self.min_size:
+            return 'min_size'
+        return None
+
+    def describe(self) -> str:
+        return (f"{self.source}: {len(self.rules['name_patterns'])} 条名称规则，"
+                f"{len(self.rules['publishers'])} 条发布者规则，{len(self.rules['path_prefixes'])} 个路径前缀，"
+                f"大小下限 {self.min_size} 字节")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查或导出 AppGraveyard 应用排除规则")
+    parser.add_argument("--rules", help="规则文件（默认在 AppGraveyard 数据目录中）")
+    parser.add_argument("--dump-defaults", metavar="FILE", help="把默认规则写入文件（- 表示标准输出）")
+    parser.add_argument("--check", metavar="NAME", action="append", default=[],
+                        help="按名称检查某个应用是否会被排除（可重复）")
+    args = parser.parse_args()
+
+    if args.dump_defaults:
+        content = json.dumps(DEFAULT_RULES, ensure_ascii=False, indent=2) + "\n"
+        if args.dump_defaults == '-':
+            sys.stdout.write(content)
+        else:
+            with open(args.dump_defaults, 'w', encoding='utf-8') as f:
+                f.write(content)
+        return
+
+    rules = ExclusionRules.load(args.rules)
+    print(rules.describe())
+    for name in args.check:
+        # 只检查名称类规则：假设应用有卸载字符串且足够大
+        rule = rules.match({'name': name, 'uninstall_string': '-', 'size': rules.min_size})
+        print(f"{name}: {'排除（' + rule + '）' if rule else '保留'}")
+
+
+if __name__ == "__main__":
+    main()
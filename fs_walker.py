@@ -0,0 +1,446 @@
+import heapq
+import itertools
+import os
+import stat
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from instrumentation import telemetry
+from mounts import MountTable
+from throttle import ScanThrottle
+
+# 没有扩展名的文件在类型分布中的键
+NO_EXTENSION = '(无扩展名)'
+
+# 启用节流时每处理这么多条目向节流器申请一次配额
+THROTTLE_BATCH = 64
+
+
+def _inode_key(dev: int, ino: int) -> int:
+    """把 (st_dev, st_ino) 合成一个整数，比元组更省内存"""
+    return (dev << 64) | ino
+
+
+def allocated_size(st: os.stat_result) -> int:
+    """文件实际占用的磁盘空间（稀疏文件按已分配块计算）"""
+    blocks = getattr(st, 'st_blocks', None)
+    if blocks is None:
+        # Windows 没有 st_blocks，只能使用逻辑大小
+        return st.st_size
+    return blocks * 512
+
+
+class InodeRegistry:
+    """整次扫描共享的 inode 登记表，用于计算"独占可回收空间"
+
+    为了在上千万文件的规模下保持较小的内存占用，只登记两类 inode：
+    - 目录：用于发现多个应用安装目录相互嵌套（同一子树被遍历两次）；
+    - 硬链接数大于 1 的文件：可能被多个应用或扫描范围之外的路径共享。
+    普通文件（st_nlink == 1）只会出现在一个位置，直接计入遍历它的应用。
+    只重新枚举部分来源时登记表继续沿用，用 release/forget_walk 去掉变化的应用登记的内容。
+    """
+
+    def __init__(self):
+        # 多个设备上的遍历可能并发进行；itertools.count 的 next 在 CPython 中是原子的
+        self._owner_ids = itertools.count()
+        self._lock = threading.Lock()
+        # 目录 inode -> 第一个遍历它的应用
+        self._dirs: Dict[int, int] = {}
+        # 多链接文件 inode -> (占用字节, st_nlink, {(应用, 是否在共享子树中): 已见链接数})
+        self._links: Dict[int, tuple] = {}
+        # (被扣除的应用, 重复遍历的应用) -> 需要从前者独占字节中扣除的字节
+        self._overlaps: Dict[tuple, int] = {}
+
+    def new_owner(self) -> int:
+        """为一个应用分配登记用的编号"""
+        return next(self._owner_ids)
+
+    def claim_dir(self, key: int, owner: int) -> int:
+        """登记目录，返回实际拥有者（已被其他应用登记时返回对方）"""
+        # dict.setdefault 在 GIL 下是原子的，并发遍历时无需额外加锁
+        return self._dirs.setdefault(key, owner)
+
+    def add_linked_file(self, key: int, owner: int, allocated: int, nlink: int, shared: bool = False):
+        """登记一个多链接文件的一条链接；shared 表示这条链接位于与其他应用共享的子树中"""
+        with self._lock:
+            entry = self._links.get(key)
+            if entry is None:
+                entry = self._links[key] = (allocated, nlink, {})
+            seen = entry[2]
+            seen[(owner, shared)] = seen.get((owner, shared), 0) + 1
+
+    def add_overlap(self, owner: int, other: int, size: int):
+        """记录 owner 的一部分独占字节因 other 也遍历了同一子树而被共享"""
+        key = (owner, other)
+        with self._lock:
+            self._overlaps[key] = self._overlaps.get(key, 0) + size
+
+    def _forget_links(self, owners: Set[int]):
+        for key in list(self._links):
+            seen = self._links[key][2]
+            for contributor in [contributor for contributor in seen if contributor[0] in owners]:
+                del seen[contributor]
+            if not seen:
+                del self._links[key]
+
+    def forget_walk(self, owner: int):
+        """丢弃 owner 上一次遍历登记的链接和重叠，准备用同一编号重新遍历（保留它登记的目录）"""
+        with self._lock:
+            self._forget_links({owner})
+            self._overlaps = {key: size for key, size in self._overlaps.items() if key[1] != owner}
+
+    def release(self, owners: Set[int]) -> Set[int]:
+        """移除不再存在的应用登记的全部内容
+
+        返回曾遍历到这些应用所登记目录的其他应用：那部分字节原先记在对方名下，
+        需要重新遍历它们才能得到正确的独占空间。
+        """
+        with self._lock:
+            self._dirs = {key: owner for key, owner in self._dirs.items() if owner not in owners}
+            self._forget_links(owners)
+            affected = {other for owner, other in self._overlaps if owner in owners and other not in owners}
+            self._overlaps = {key: size for key, size in self._overlaps.items()
+                              if key[0] not in owners and key[1] not in owners}
+        return affected
+
+    def finalize(self, live_owners: Optional[Set[int]] = None) -> Dict[int, int]:
+        """扫描结束后计算每个应用需要额外加上（或扣除）的独占字节
+
+        live_owners 为最终保留下来的应用；被去重或过滤掉的应用
+        与其他应用之间的目录重叠不再计入。
+        """
+        adjustments: Dict[int, int] = {}
+        for size, nlink, seen in self._links.values():
+            # 只有所有链接都在同一个应用内（且不在共享子树中）时，卸载它才能真正释放空间
+            if len(seen) != 1:
+                continue
+            (owner, shared), count = next(iter(seen.items()))
+            if not shared and count >= nlink:
+                adjustments[owner] = adjustments.get(owner, 0) + size
+        for (owner, other), size in self._overlaps.items():
+            if live_owners is not None and other not in live_owners:
+                continue
+            adjustments[owner] = adjustments.get(owner, 0) - size
+        return adjustments
+
+
+class WalkState:
+    """一次可分多段执行的目录遍历的进度"""
+
+    def __init__(self, root: str, registry: Optional[InodeRegistry] = None, owner: Optional[int] = None):
+        self.root = root
+        self.registry = registry
+        self.owner = owner
+        self.tracking = registry is not None and owner is not None
+        # 待访问目录：(路径, 设备号, 所属顶层子目录名, 与之共享该子树的应用或 None,
+        # 暂停前已处理的条目名集合或 None)；根目录下的文件不属于任何子目录
+        self.stack: List[tuple] = []
+        self.visited: Set[int] = set()
+        # 大小为 N 的最小堆，堆顶是目前保留的最小文件
+        self.largest: List[tuple] = []
+        # 遍历器开启 collect_min_size 时收集的 (大小, inode 键, 路径)，供重复文件检测复用
+        self.files: List[Tuple[int, int, str]] = []
+        self.result = {
+            'size': 0,
+            'allocated_size': 0,
+            'exclusive_size': 0,
+            'file_count': 0,
+            'subdir_sizes': {},
+            'largest_files': [],
+            'size_by_type': {},
+            'skipped_mounts': [],
+            'incomplete': False,
+        }
+
+    @property
+    def incomplete(self) -> bool:
+        """是否还有未访问的目录"""
+        return bool(self.stack)
+
+
+class DirectoryWalker:
+    """统计安装目录占用空间的遍历器
+
+    所有扫描器共用这一个实现，一次遍历同时得到总大小、
+    各顶层子目录的大小（供树状图等视图使用）、最大的若干个文件
+    和按扩展名的字节分布，不需要额外的 I/O。传入 InodeRegistry 时
+    还会在同一次遍历中统计实际占用空间和独占可回收空间。
+
+    遍历默认停留在起始目录所在的文件系统上，不进入网络、FUSE 和
+    伪文件系统的挂载点，并用目录 inode 集合防止 bind mount 等造成的循环。
+    跳过的挂载点记录在结果的 skipped_mounts 中。
+
+    每次遍历受条目数和时间预算限制；超出预算时返回标记为 incomplete
+    的部分结果，进度（待访问目录栈）保存在 WalkState 中，可稍后继续。
+    传入 ScanThrottle 时按其速率和系统负载限制遍历速度（后台模式）。
+    设置 collect_min_size 时把不小于该大小的普通文件记录到 WalkState.files。
+    """
+
+    def __init__(self, max_entries: int = 5000, time_budget: float = 1.0, top_files: int = 10,
+                 one_file_system: bool = True, mount_table: Optional[MountTable] = None,
+                 throttle: Optional[ScanThrottle] = None, collect_min_size: Optional[int] = None):
+        # 每次 walk/resume 的条目数和时间预算（0 表示不限），避免单个巨大目录拖住整个扫描
+        self.max_entries = max_entries
+        self.time_budget = time_budget
+        self.top_files = top_files
+        self.one_file_system = one_file_system
+        self.mounts = mount_table or MountTable()
+        self.throttle = throttle
+        self.collect_min_size = collect_min_size
+
+    def _check_root(self, root: str, skipped: List[Dict]) -> Optional[os.stat_result]:
+        """检查起始目录；位于应跳过的文件系统上时返回 None"""
+        reason = self.mounts.skip_reason(self.mounts.fs_type(root))
+        if reason:
+            skipped.append({'path': root, 'reason': reason})
+            return None
+        try:
+            return os.stat(root)
+        except OSError:
+            return None
+
+    def _enter_directory(self, entry: os.DirEntry, dev: int, visited: Set[int],
+                         skipped: List[Dict]) -> Optional[Tuple[int, int]]:
+        """决定是否进入子目录
+
+        返回 (设备号, 目录 inode 键)，不应进入时返回 None。
+        挂载点通过挂载表判断，不需要对每个目录额外 stat；只在挂载点上比较设备号，
+        one_file_system 时跳过设备与起始目录不同的挂载点（同一设备上的 bind mount 照常进入）。
+        """
+        path = entry.path
+        if sys.platform == "win32":
+            # 目录联接和卷挂载点都是重解析点
+            attributes = getattr(entry.stat(follow_symlinks=False), 'st_file_attributes', 0)
+            if attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT:
+                skipped.append({'path': path, 'reason': '重解析点（目录联接或挂载点）'})
+                return None
+        elif self.mounts.is_mount_point(path):
+            fs_type = self.mounts.mounts[path]
+            reason = self.mounts.skip_reason(fs_type)
+            if reason is None:
+                child_dev = entry.stat(follow_symlinks=False).st_dev
+                # 启用 one_file_system 时只会进入与起始目录同一设备的目录，dev 即起始目录的设备号
+                if self.one_file_system and child_dev != dev:
+                    reason = f'其他文件系统 ({fs_type})'
+            if reason:
+                skipped.append({'path': path, 'reason': reason})
+                return None
+            dev = child_dev
+
+        inode = entry.inode()
+        key = _inode_key(dev, inode) if inode else 0
+        if key:
+            if key in visited:
+                skipped.append({'path': path, 'reason': '目录循环'})
+                return None
+            visited.add(key)
+        return dev, key
+
+    def start(self, root: str, registry: Optional[InodeRegistry] = None,
+              owner: Optional[int] = None) -> WalkState:
+        """准备一次遍历；之后用 resume 分段执行"""
+        state = WalkState(root, registry, owner)
+        if not root or not os.path.isdir(root):
+            return state
+
+        root_stat = self._check_root(root, state.result['skipped_mounts'])
+        if root_stat is None:
+            return state
+
+        root_key = _inode_key(root_stat.st_dev, root_stat.st_ino) if root_stat.st_ino else 0
+        if root_key:
+            state.visited.add(root_key)
+        # 整个安装目录已被其他应用遍历过时（例如嵌套在对方目录内），记录对方编号
+        root_shared_with = None
+        if state.tracking and root_key:
+            root_owner = registry.claim_dir(root_key, owner)
+            if root_owner != owner:
+                root_shared_with = root_owner
+        state.stack.append((root, root_stat.st_dev, None, root_shared_with, None))
+        return state
+
+    def walk(self, root: str, registry: Optional[InodeRegistry] = None,
+             owner: Optional[int] = None) -> Dict:
+        """遍历 root（受单次预算限制），返回大小统计结果"""
+        return self.resume(self.start(root, registry, owner))
+
+    def resume(self, state: WalkState, max_entries: Optional[int] = None,
+               time_budget: Optional[float] = None) -> Dict:
+        """从保存的进度继续遍历，直到完成或用完本次的条目数/时间预算
+
+        预算用完时结果中的 incomplete 为 True，进度保存在 state 中，
+        之后可以再次调用 resume 继续。
+        """
+        max_entries = self.max_entries if max_entries is None else max_entries
+        time_budget = self.time_budget if time_budget is None else time_budget
+        deadline = time.monotonic() + time_budget if time_budget else None
+
+        result = state.result
+        registry, owner, tracking = state.registry, state.owner, state.tracking
+        stack, visited, largest = state.stack, state.visited, state.largest
+        skipped = result['skipped_mounts']
+        subdir_sizes = result['subdir_sizes']
+        size_by_type = result['size_by_type']
+        # 每个共享子树中本应用看到的占用字节，最后从对方的独占字节中扣除
+        overlap_bytes: Dict[int, int] = {}
+        throttle = self.throttle
+        collect_min_size = self.collect_min_size
+        entries_this_call = 0
+        dirs_scanned = 0
+        files_before, bytes_before = result['file_count'], result['size']
+        paused = False
+
+        while stack and not paused:
+            path, dev, top, shared_with, done_names = stack.pop()
+            try:
+                entries = os.scandir(path)
+            except OSError as e:
+                telemetry.error('walk', e)
+                continue
+            dirs_scanned += 1
+
+            with entries:
+                # 本次处理过的条目名；按名称而不是按位置跳过，两段之间目录有增删时也不会漏算或重复统计
+                processed: List[str] = []
+                for entry in entries:
+                    if done_names and entry.name in done_names:
+                        # 上次暂停前已经处理过的条目
+                        continue
+
+                    entries_this_call += 1
+                    if (max_entries and entries_this_call > max_entries) or \
+                            (deadline and entries_this_call % 256 == 0 and time.monotonic() > deadline):
+                        # 预算用完：把当前目录连同已处理的条目名放回栈顶
+                        stack.append((path, dev, top, shared_with, (done_names or set()).union(processed)))
+                        paused = True
+                        break
+                    processed.append(entry.name)
+                    if throttle and entries_this_call % THROTTLE_BATCH == 0:
+                        throttle.consume(THROTTLE_BATCH)
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            entered = self._enter_directory(entry, dev, visited, skipped)
+                            if entered is None:
+                                continue
+                            child_dev, key = entered
+                            child_shared = shared_with
+                            if tracking and child_shared is None and key:
+                                dir_owner = registry.claim_dir(key, owner)
+                                if dir_owner != owner:
+                                    child_shared = dir_owner
+                            stack.append((entry.path, child_dev, top if top is not None else entry.name,
+                                          child_shared, None))
+                            continue
+                        is_symlink = entry.is_symlink()
+                        if is_symlink and entry.is_dir():
+                            # 指向目录的符号链接不跟随，避免循环和重复统计
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+
+                    size = st.st_size
+                    result['size'] += size
+                    result['file_count'] += 1
+                    if top is not None:
+                        subdir_sizes[top] = subdir_sizes.get(top, 0) + size
+
+                    if tracking and not is_symlink:
+                        allocated = allocated_size(st)
+                        result['allocated_size'] += allocated
+                        if shared_with is not None:
+                            # 其他应用也遍历了这棵子树，双方都不能独占这些字节
+                            # 即使只有硬链接文件也登记重叠，对方被移除时据此重新遍历本应用
+                            overlap_bytes[shared_with] = overlap_bytes.get(shared_with, 0) + \
+                                (allocated if st.st_nlink <= 1 else 0)
+                            if st.st_nlink > 1 and st.st_ino:
+                                registry.add_linked_file(_inode_key(st.st_dev, st.st_ino), owner,
+                                                         allocated, st.st_nlink, shared=True)
+                        elif st.st_nlink > 1 and st.st_ino:
+                            # 硬链接文件在扫描结束后统一结算
+                            registry.add_linked_file(_inode_key(st.st_dev, st.st_ino), owner,
+                                                     allocated, st.st_nlink)
+                        else:
+                            result['exclusive_size'] += allocated
+
+                    if collect_min_size is not None and size >= collect_min_size and not is_symlink:
+                        # Windows 上 scandir 的 stat 不含 inode，此时键为 0（不能据此识别硬链接）
+                        inode_key = _inode_key(st.st_dev, st.st_ino) if st.st_ino else 0
+                        state.files.append((size, inode_key, entry.path))
+
+                    extension = os.path.splitext(entry.name)[1].lower() or NO_EXTENSION
+                    size_by_type[extension] = size_by_type.get(extension, 0) + size
+
+                    if len(largest) < self.top_files:
+                        heapq.heappush(largest, (size, entry.path))
+                    elif size > largest[0][0]:
+                        heapq.heapreplace(largest, (size, entry.path))
+
+        for shared_owner, size in overlap_bytes.items():
+            registry.add_overlap(shared_owner, owner, size)
+
+        result['incomplete'] = bool(stack)
+        if telemetry.enabled:
+            # 每个计入的文件恰好 stat 一次
+            files = result['file_count'] - files_before
+            telemetry.count('walk.entries', entries_this_call)
+            telemetry.count('walk.dirs_scanned', dirs_scanned)
+            telemetry.count('walk.files', files)
+            telemetry.count('walk.stat_calls', files)
+            telemetry.count('walk.bytes', result['size'] - bytes_before)
+            if paused:
+                telemetry.count('walk.budget_pauses')
+        result['largest_files'] = [{'path': path, 'size': size}
+                                   for size, path in sorted(largest, reverse=True)]
+        return result
+
+    def find_files(self, root: str, predicate: Callable[[str], bool], limit: int = 1) -> List[str]:
+        """按与 walk 相同的挂载点规则查找文件名满足 predicate 的文件
+
+        每个目录先检查自身的文件再进入子目录，找到 limit 个或用完
+        条目数/时间预算即停止，返回已找到的部分结果。
+        """
+        found: List[str] = []
+        if not root or not os.path.isdir(root):
+            return found
+
+        skipped: List[Dict] = []
+        root_stat = self._check_root(root, skipped)
+        if root_stat is None:
+            return found
+
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        entries_seen = 0
+        visited: Set[int] = set()
+        stack = [(root, root_stat.st_dev)]
+        while stack:
+            path, dev = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        entries_seen += 1
+                        if (self.max_entries and entries_seen > self.max_entries) or \
+                                (deadline and entries_seen % 256 == 0 and time.monotonic() > deadline):
+                            return found
+                        if self.throttle and entries_seen % THROTTLE_BATCH == 0:
+                            self.throttle.consume(THROTTLE_BATCH)
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                entered = self._enter_directory(entry, dev, visited, skipped)
+                                if entered is not None:
+                                    subdirs.append((entry.path, entered[0]))
+                            elif predicate(entry.name):
+                                found.append(entry.path)
+                                if len(found) >= limit:
+                                    return found
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            # 反向压栈，使子目录按列出顺序被访问
+            stack.extend(reversed(subdirs))
+        return found
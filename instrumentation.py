@@ -0,0 +1,208 @@
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+# 每个阶段保留的最慢条目数
+SLOWEST_PER_STAGE = 5
+
+# 设置该环境变量（JSON 日志文件路径）即可在图形界面等没有命令行参数的入口启用
+TRACE_ENV = "APPGRAVEYARD_TRACE"
+
+
+class _NullSpan:
+    """未启用时返回的空计时区间，进入和退出都不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """一次计时区间；退出时把耗时和附加字段交给 Telemetry"""
+
+    __slots__ = ('telemetry', 'name', 'label', 'fields', 'start')
+
+    def __init__(self, telemetry: 'Telemetry', name: str, label: Optional[str], fields: Dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.label = label
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        if exc is not None:
+            self.telemetry.error(self.name, exc)
+        self.telemetry._finish_span(self, duration)
+        return False
+
+    def set(self, **fields):
+        """在区间结束前补充要写入日志的字段（例如找到的条目数）"""
+        self.fields.update(fields)
+
+
+class Telemetry:
+    """扫描过程的计时区间和计数器
+
+    默认关闭：span() 返回共享的空对象，count()/error() 只检查一次标志就返回，
+    因此埋点可以留在热路径上。启用后按名称汇总区间耗时，记录每个阶段最慢的条目
+    （例如最慢的应用），按阶段和异常类型统计错误，并可把每个事件以 JSON 行写入日志。
+    各方法可以在扫描线程中并发调用。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._log: Optional[TextIO] = None
+        self._owns_log = False
+        self.reset()
+
+    def reset(self):
+        """清空已收集的数据"""
+        with self._lock:
+            # 名称 -> [次数, 总耗时, 最长耗时]
+            self.spans: Dict[str, List[float]] = {}
+            self.counters: Dict[str, float] = {}
+            # 阶段 -> {异常类型 -> 次数}
+            self.errors: Dict[str, Dict[str, int]] = {}
+            # 阶段 -> 最小堆 [(耗时, 标签)]
+            self.slowest: Dict[str, List] = {}
+            self.started = time.time()
+
+    def enable(self, log_path: Optional[str] = None, log_stream: Optional[TextIO] = None):
+        """开始收集；指定 log_path 或 log_stream 时同时输出 JSON 行日志"""
+        self.close_log()
+        if log_path:
+            try:
+                self._log = open(log_path, 'a', encoding='utf-8')
+                self._owns_log = True
+            except OSError as e:
+                print(f"Error opening trace log {log_path}: {e}")
+        elif log_stream is not None:
+            self._log = log_stream
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.close_log()
+
+    def close_log(self):
+        if self._log is not None and self._owns_log:
+            self._log.close()
+        self._log = None
+        self._owns_log = False
+
+    def span(self, name: str, label: Optional[str] = None, **fields):
+        """计时区间：with telemetry.span('size_walk', label=应用名): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, label, fields)
+
+    def count(self, name: str, value: float = 1):
+        """累加计数器，例如访问的文件数、读取的字节数、缓存命中"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def error(self, stage: str, exc: BaseException):
+        """按阶段和异常类型记录一次错误"""
+        if not self.enabled:
+            return
+        kind = type(exc).__name__
+        with self._lock:
+            by_type = self.errors.setdefault(stage, {})
+            by_type[kind] = by_type.get(kind, 0) + 1
+        self.emit('error', stage=stage, type=kind, message=str(exc))
+
+    def emit(self, event: str, **fields):
+        """写入一行 JSON 日志"""
+        if self._log is None:
+            return
+        record = {'ts': round(time.time(), 6), 'event': event, 'thread': threading.current_thread().name}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                self._log.write(line + "\n")
+                self._log.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _finish_span(self, span: _Span, duration: float):
+        with self._lock:
+            totals = self.spans.get(span.name)
+            if totals is None:
+                self.spans[span.name] = [1, duration, duration]
+            else:
+                totals[0] += 1
+                totals[1] += duration
+                if duration > totals[2]:
+                    totals[2] = duration
+            if span.label is not None:
+                heap = self.slowest.setdefault(span.name, [])
+                if len(heap) < SLOWEST_PER_STAGE:
+                    heapq.heappush(heap, (duration, span.label))
+                elif duration > heap[0][0]:
+                    heapq.heapreplace(heap, (duration, span.label))
+        if self._log is not None:
+            self.emit('span', name=span.name, label=span.label, duration=round(duration, 6), **span.fields)
+
+    def summary(self) -> Dict:
+        """汇总结果（可直接序列化为 JSON）"""
+        with self._lock:
+            return {
+                'elapsed': time.time() - self.started,
+                'spans': {name: {'count': int(count), 'total': total, 'max': longest}
+                          for name, (count, total, longest) in self.spans.items()},
+                'counters': dict(self.counters),
+                'errors': {stage: dict(by_type) for stage, by_type in self.errors.items()},
+                'slowest': {stage: [{'label': label, 'duration': duration}
+                                    for duration, label in sorted(heap, reverse=True)]
+                            for stage, heap in self.slowest.items()},
+            }
+
+    def print_summary(self, stream: TextIO = sys.stdout):
+        """打印人类可读的汇总"""
+        summary = self.summary()
+        self.emit('summary', **summary)
+        print(f"\n=== 扫描统计（共 {summary['elapsed']:.2f} 秒）===", file=stream)
+        if summary['spans']:
+            print(f"{'阶段':<26} {'次数':>8} {'总耗时(s)':>10} {'最长(s)':>9}", file=stream)
+            for name, span in sorted(summary['spans'].items(), key=lambda item: item[1]['total'], reverse=True):
+                print(f"{name:<26} {span['count']:>8} {span['total']:>10.3f} {span['max']:>9.3f}", file=stream)
+        if summary['counters']:
+            print("\n计数器:", file=stream)
+            for name, value in sorted(summary['counters'].items()):
+                print(f"  {name:<32} {value:>14,.0f}", file=stream)
+        for stage, slowest in summary['slowest'].items():
+            print(f"\n最慢的 {stage}:", file=stream)
+            for item in slowest:
+                print(f"  {item['duration']:>8.3f}s  {item['label']}", file=stream)
+        if summary['errors']:
+            print("\n错误:", file=stream)
+            for stage, by_type in summary['errors'].items():
+                for kind, count in sorted(by_type.items()):
+                    print(f"  {stage:<24} {kind:<24} {count:>6}", file=stream)
+
+
+# 全局实例，各模块共用
+telemetry = Telemetry()
+
+if os.environ.get(TRACE_ENV):
+    telemetry.enable(os.environ[TRACE_ENV])
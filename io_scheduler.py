@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 每种存储设备的最大并发遍历数
+HDD_MAX_WORKERS = 2
+SSD_MAX_WORKERS = 8
+UNKNOWN_MAX_WORKERS = 4
+
+# 自适应调整的统计窗口（秒）和判定吞吐量变化的阈值
+ADJUST_INTERVAL = 0.5
+THROUGHPUT_TOLERANCE = 0.05
+
+
+def _linux_rotational(dev: int) -> Optional[bool]:
+    """根据 st_dev 在 /sys 中找到底层块设备并读取 queue/rotational"""
+    sys_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    if not os.path.exists(sys_path):
+        return None
+    sys_path = os.path.realpath(sys_path)
+
+    candidates = [sys_path]
+    # 分区的 queue 在父设备目录下
+    if os.path.exists(os.path.join(sys_path, "partition")):
+        candidates.append(os.path.dirname(sys_path))
+    # device-mapper / md 等虚拟设备：只要有一个底层设备是机械盘就按机械盘处理
+    slaves_dir = os.path.join(sys_path, "slaves")
+    if os.path.isdir(slaves_dir):
+        for slave in os.listdir(slaves_dir):
+            slave_path = os.path.realpath(os.path.join(slaves_dir, slave))
+            candidates.append(slave_path)
+            candidates.append(os.path.dirname(slave_path))
+
+    found = None
+    for candidate in candidates:
+        try:
+            with open(os.path.join(candidate, "queue", "rotational")) as f:
+                if f.read().strip() == "1":
+                    return True
+                found = False
+        except OSError:
+            continue
+    return found
+
+
+def device_for_path(path: str, dev: int) -> Tuple[str, Optional[bool]]:
+    """返回 path（设备号 dev）的 (设备标识, 是否为机械盘)；无法判断是否机械盘时为 None"""
+    if sys.platform == "win32":
+        # Windows 下按盘符区分设备，介质类型未知
+        drive = os.path.splitdrive(os.path.abspath(path))[0].upper() or str(dev)
+        return (drive, None)
+    if sys.platform.startswith("linux"):
+        return (str(dev), _linux_rotational(dev))
+    return (str(dev), None)
+
+
+class DevicePool:
+    """单个存储设备上的遍历任务池
+
+    并发度从保守值起步，按最近一个窗口内测得的吞吐量（每秒处理的条目数）
+    做爬山式调整：提升并发后吞吐量变好就继续，变差就回退。
+    机械盘最多 HDD_MAX_WORKERS 个顺序遍历者，避免磁头来回寻道。
+    """
+
+    def __init__(self, device: str, rotational: Optional[bool], max_workers: Optional[int] = None):
+        self.device = device
+        self.rotational = rotational
+        if rotational:
+            self.max_workers = HDD_MAX_WORKERS
+            self.limit = 1
+        elif rotational is None:
+            self.max_workers = UNKNOWN_MAX_WORKERS
+            self.limit = 2
+        else:
+            self.max_workers = SSD_MAX_WORKERS
+            self.limit = 2
+        if max_workers is not None:
+            self.max_workers = max(1, min(self.max_workers, max_workers))
+            self.limit = min(self.limit, self.max_workers)
+
+        self._tasks = deque()
+        self._cond = threading.Condition()
+        self._active = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+
+        # 吞吐量统计
+        self._window_start = time.monotonic()
+        self._window_units = 0
+        self._last_throughput: Optional[float] = None
+        self._direction = 1
+
+    def submit(self, task: Callable[[], int]):
+        """提交任务；任务返回本次处理的条目数，用于测量吞吐量"""
+        with self._cond:
+            self._tasks.append(task)
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while (self._tasks and self._active >= self.limit) or (not self._tasks and not self._closed):
+                    self._cond.wait()
+                if not self._tasks:
+                    return
+                task = self._tasks.popleft()
+                self._active += 1
+
+            units = 0
+            try:
+                units = task() or 0
+            except Exception as e:
+                print(f"Error in walk task on device {self.device}: {e}")
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._record(units)
+                    self._cond.notify_all()
+
+    def _record(self, units: int):
+        """累计吞吐量，每个窗口结束时调整并发度（调用时持有锁）"""
+        self._window_units += units
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < ADJUST_INTERVAL:
+            return
+
+        throughput = self._window_units / elapsed
+        if self._last_throughput is not None:
+            if throughput < self._last_throughput * (1 - THROUGHPUT_TOLERANCE):
+                # 上一次调整让情况变差了，反向调整
+                self._direction = -self._direction
+                self.limit += self._direction
+            elif throughput > self._last_throughput * (1 + THROUGHPUT_TOLERANCE):
+                self.limit += self._direction
+        else:
+            self.limit += self._direction
+        self.limit = max(1, min(self.max_workers, self.limit))
+
+        self._last_throughput = throughput
+        self._window_start = now
+        self._window_units = 0
+
+    def close(self):
+        """不再接受任务；已提交的任务执行完后线程退出"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def join(self):
+        """等待所有任务完成"""
+        self.close()
+        for thread in list(self._threads):
+            thread.join()
+
+
+class StorageAwareScheduler:
+    """按存储设备分组执行目录遍历
+
+    不同磁盘上的应用并行遍历，同一块盘上的并发度由 DevicePool 自适应控制。
+    max_workers_per_device 进一步限制每块盘的并发上限（后台模式为 1）。
+    """
+
+    def __init__(self, max_workers_per_device: Optional[int] = None):
+        self.max_workers_per_device = max_workers_per_device
+        self._pools: Dict[str, DevicePool] = {}
+        self._lock = threading.Lock()
+        # st_dev -> 设备信息的缓存，同一设备上的应用只检测一次
+        self._device_cache: Dict[int, Tuple[str, Optional[bool]]] = {}
+
+    def _device(self, path: str) -> Tuple[str, Optional[bool]]:
+        try:
+            dev = os.stat(path).st_dev
+        except OSError:
+            return ("unknown", None)
+        info = self._device_cache.get(dev)
+        if info is None:
+            info = device_for_path(path, dev)
+            self._device_cache[dev] = info
+        return info
+
+    def submit(self, path: str, task: Callable[[], int]):
+        """提交一个遍历 path 的任务"""
+        device, rotational = self._device(path)
+        with self._lock:
+            pool = self._pools.get(device)
+            if pool is None:
+                pool = DevicePool(device, rotational, self.max_workers_per_device)
+                self._pools[device] = pool
+        pool.submit(task)
+
+    def join(self):
+        """等待所有设备上的任务完成"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.join()
@@ -0,0 +1,220 @@
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from fs_walker import DirectoryWalker
+from io_scheduler import StorageAwareScheduler
+from path_trie import PathTrie
+from usage_tracker import app_key
+
+# 系统和桌面环境自身的目录，不属于任何可卸载的应用，也不报告为残留
+SYSTEM_DATA_DIRS = {
+    # Linux
+    'autostart', 'dconf', 'fontconfig', 'fonts', 'gtk-2.0', 'gtk-3.0', 'gtk-4.0', 'ibus',
+    'mime', 'pulse', 'systemd', 'user-dirs.dirs', 'user-dirs.locale', 'menus', 'icons',
+    'applications', 'recently-used.xbel', 'trash', 'keyrings', 'gvfs-metadata', 'pip',
+    'thumbnails', 'mesa_shader_cache', 'gnome-session', 'nautilus', 'tracker', 'tracker3',
+    'evolution', 'sessions', 'gstreamer-1.0', 'flatpak', 'xorg', 'session',
+    # macOS
+    'com.apple', 'cloudkit', 'familycircle', 'metadata', 'sharedimagecache',
+    # Windows
+    'microsoft', 'packages', 'temp', 'connecteddevicesplatform', 'd3dscache', 'crashdumps',
+    'history', 'virtualstore', 'programs', 'comms', 'publishers',
+    # 本程序自己的数据目录
+    'appgraveyard',
+}
+
+# 名称中去掉这些后缀再比较，例如 "Foo Setup" / "foo-bin"
+NAME_SUFFIXES = ('desktop', 'bin', 'setup', 'x64', 'x86', 'app', 'client')
+
+
+def _normalize_name(name: str) -> str:
+    """只保留小写字母和数字，用于目录名与应用名之间的模糊比较"""
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+
+def user_data_roots(home: Optional[str] = None) -> List[Tuple[str, str]]:
+    """返回 (目录, 类型) 列表：各平台存放应用用户数据和缓存的位置
+
+    home 为 None 时使用当前用户；多用户扫描时传入其他用户的主目录。
+    """
+    if home is None:
+        home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        return [
+            (os.path.join(home, "AppData", "Roaming"), '漫游数据'),
+            (os.path.join(home, "AppData", "Local"), '本地数据'),
+            (os.path.join(home, "AppData", "LocalLow"), '本地数据'),
+        ]
+    if sys.platform == "darwin":
+        library = os.path.join(home, "Library")
+        return [
+            (os.path.join(library, "Caches"), '缓存'),
+            (os.path.join(library, "Application Support"), '应用数据'),
+            (os.path.join(library, "Containers"), '沙盒容器'),
+            (os.path.join(library, "Logs"), '日志'),
+        ]
+    # XDG 环境变量只对当前用户有效
+    is_current_user = home == os.path.expanduser("~")
+    cache_home = is_current_user and os.environ.get("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+    config_home = is_current_user and os.environ.get("XDG_CONFIG_HOME") or os.path.join(home, ".config")
+    data_home = is_current_user and os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+    return [
+        (cache_home, '缓存'),
+        (config_home, '配置'),
+        (data_home, '应用数据'),
+    ]
+
+
+class LeftoverScanner:
+    """扫描用户数据/缓存目录，把它们关联到已安装的应用
+
+    按 bundle id、包名、应用名和发布者名匹配各数据根目录下的子目录，
+    Windows 上还会查看 "发布者\\应用名" 两级结构。匹配到的目录用共享的
+    DirectoryWalker 统计大小（不同磁盘并行），结果写入 app['leftovers']
+    和 app['leftover_size']；没有匹配到任何已安装应用的目录作为可能的残留返回。
+    """
+
+    def __init__(self, walker: Optional[DirectoryWalker] = None,
+                 scheduler: Optional[StorageAwareScheduler] = None):
+        self.walker = walker or DirectoryWalker()
+        self.scheduler = scheduler
+
+    def _build_name_index(self, apps: List[Dict]) -> Tuple[Dict[str, List[Dict]], Dict[str, List[Dict]]]:
+        """返回 (名称键 -> 应用列表, 发布者键 -> 应用列表)"""
+        names: Dict[str, List[Dict]] = {}
+        publishers: Dict[str, List[Dict]] = {}
+
+        def add(index: Dict[str, List[Dict]], key: str, app: Dict):
+            if len(key) >= 3:
+                bucket = index.setdefault(key, [])
+                if not any(existing is app for existing in bucket):
+                    bucket.append(app)
+
+        for app in apps:
+            name = app.get('name', '')
+            add(names, _normalize_name(name), app)
+            # 去掉版本号和常见后缀，例如 "Foo 2.1" -> "foo"
+            base = re.sub(r'[\s_-]*v?\d+(\.\d+)*$', '', name)
+            add(names, _normalize_name(base), app)
+            normalized_base = _normalize_name(base)
+            for suffix in NAME_SUFFIXES:
+                if normalized_base.endswith(suffix):
+                    add(names, normalized_base[:-len(suffix)], app)
+            bundle_id = app.get('bundle_id')
+            if bundle_id:
+                add(names, bundle_id.lower(), app)
+                add(names, _normalize_name(bundle_id), app)
+            if app.get('publisher'):
+                add(publishers, _normalize_name(app['publisher']), app)
+        return names, publishers
+
+    def _match(self, dir_name: str, names: Dict[str, List[Dict]]) -> Optional[Dict]:
+        """按目录名匹配唯一的应用；有歧义时不归属"""
+        candidates = names.get(dir_name.lower()) or names.get(_normalize_name(dir_name)) or []
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def find_candidates(self, apps: List[Dict], home: Optional[str] = None,
+                        path_trie: Optional[PathTrie] = None) -> List[Dict]:
+        """列出数据根目录下的子目录并尝试归属到应用
+
+        传入 path_trie 时先按路径归属（例如直接安装在 ~/.local/share 下的应用）。
+        """
+        names, publishers = self._build_name_index(apps)
+        apps_by_key = {app_key(app): app for app in apps} if path_trie is not None else {}
+        candidates = []
+        for root, kind in user_data_roots(home):
+            try:
+                entries = [entry for entry in os.scandir(root) if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            for entry in entries:
+                dir_name = entry.name
+                lowered = dir_name.lower().lstrip('.')
+                if lowered in SYSTEM_DATA_DIRS or lowered.startswith('com.apple.'):
+                    continue
+
+                app = apps_by_key.get(path_trie.lookup(entry.path)) if path_trie is not None else None
+                if app is None:
+                    app = self._match(dir_name, names)
+                if app is not None:
+                    candidates.append({'path': entry.path, 'kind': kind, 'app': app})
+                    continue
+
+                publisher_apps = publishers.get(_normalize_name(dir_name), [])
+                if publisher_apps:
+                    # "发布者/应用名" 结构：逐个子目录按应用名匹配
+                    publisher_names, _ = self._build_name_index(publisher_apps)
+                    try:
+                        children = [child for child in os.scandir(entry.path)
+                                    if child.is_dir(follow_symlinks=False)]
+                    except OSError:
+                        children = []
+                    matched_any = False
+                    for child in children:
+                        child_app = self._match(child.name, publisher_names)
+                        if child_app is not None:
+                            candidates.append({'path': child.path, 'kind': kind, 'app': child_app})
+                            matched_any = True
+                    if not matched_any and len(publisher_apps) == 1:
+                        candidates.append({'path': entry.path, 'kind': kind, 'app': publisher_apps[0]})
+                    continue
+
+                candidates.append({'path': entry.path, 'kind': kind, 'app': None})
+        return candidates
+
+    def _measure_one(self, candidate: Dict) -> int:
+        """统计单个候选目录的大小，返回文件数"""
+        try:
+            result = self.walker.walk(candidate['path'])
+        except Exception as e:
+            print(f"Error measuring leftover {candidate['path']}: {e}")
+            return 0
+        try:
+            mtime = os.path.getmtime(candidate['path'])
+        except OSError:
+            mtime = None
+        candidate.update({
+            'size': result['size'],
+            'file_count': result['file_count'],
+            'incomplete': result['incomplete'],
+            'last_modified': mtime,
+        })
+        return result['file_count']
+
+    def measure(self, candidates: List[Dict]):
+        """统计候选目录的大小；有 scheduler 时按存储设备并行"""
+        if self.scheduler is None:
+            for candidate in candidates:
+                self._measure_one(candidate)
+            return
+        for candidate in candidates:
+            self.scheduler.submit(candidate['path'], lambda candidate=candidate: self._measure_one(candidate))
+        self.scheduler.join()
+
+    def assign(self, apps: List[Dict], candidates: List[Dict]) -> List[Dict]:
+        """把已统计的候选目录写入所属应用，返回按大小排序的残留目录"""
+        for app in apps:
+            app['leftovers'] = []
+            app['leftover_size'] = 0
+        orphans = []
+        for candidate in candidates:
+            app = candidate.pop('app')
+            if app is None:
+                orphans.append(candidate)
+            else:
+                app['leftovers'].append(candidate)
+                app['leftover_size'] += candidate.get('size', 0)
+
+        orphans.sort(key=lambda item: item.get('size', 0), reverse=True)
+        return orphans
+
+    def scan(self, apps: List[Dict], home: Optional[str] = None,
+             path_trie: Optional[PathTrie] = None) -> List[Dict]:
+        """统计每个应用的用户数据大小，返回没有对应已安装应用的残留目录"""
+        candidates = self.find_candidates(apps, home, path_trie)
+        self.measure(candidates)
+        return self.assign(apps, candidates)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 指标导出
+
+把扫描快照转换为 OpenMetrics 文本文件，供 node_exporter 的 textfile collector 采集。
+抓取时只读取这个小文件，不会触发扫描。
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from scoring import STATUS_BANDS, status_band
+from snapshot import Snapshot, default_snapshot_path, take_snapshot
+
+DEFAULT_TOP_N = 20
+METRIC_PREFIX = "appgraveyard"
+
+def _escape(value) -> str:
+    """标签值转义：反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricWriter:
+    """按指标族收集样本并输出 OpenMetrics 文本"""
+
+    def __init__(self):
+        # 名称 -> (类型, 说明, [(标签, 值)])
+        self.families: Dict[str, Tuple[str, str, List[Tuple[Dict, float]]]] = {}
+
+    def add(self, name: str, value: float, help_text: str, labels: Optional[Dict] = None,
+            metric_type: str = 'gauge'):
+        family = self.families.setdefault(f"{METRIC_PREFIX}_{name}", (metric_type, help_text, []))
+        family[2].append((labels or {}, value))
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric_type, help_text, samples) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def reclaimable_bytes(app: Dict) -> int:
+    """卸载后可回收的空间：独占空间（没有结算时用大小）加用户数据
+
+    独占空间为 0（全部与其他应用共享）时就是 0，不能退回到大小。
+    """
+    size = app.get('size', 0) or 0
+    reclaimable = app['reclaimable_size'] if 'reclaimable_size' in app else size
+    return reclaimable + (app.get('leftover_size', 0) or 0)
+
+
+def render_snapshot(snapshot: Snapshot, top_n: int = DEFAULT_TOP_N) -> str:
+    """把快照转换为 OpenMetrics 文本"""
+    writer = MetricWriter()
+    apps = snapshot.apps
+
+    bands: Dict[str, List[int]] = {band: [0, 0] for band in list(STATUS_BANDS.values()) + ['unknown']}
+    for app in apps:
+        totals = bands[status_band(app.get('status'))]
+        totals[0] += 1
+        totals[1] += reclaimable_bytes(app)
+    for band, (count, size) in bands.items():
+        writer.add('apps', count, "按状态分组的已安装应用数", {'status': band})
+    for band, (count, size) in bands.items():
+        writer.add('reclaimable_bytes', size, "按状态分组、卸载后可回收的字节数（含用户数据）", {'status': band})
+
+    orphans = snapshot.data.get('orphaned_leftovers') or []
+    writer.add('orphaned_leftover_bytes', sum(item.get('size', 0) for item in orphans),
+               "没有对应已安装应用的用户数据目录大小")
+
+    top_apps = sorted(apps, key=lambda app: app.get('score', 0), reverse=True)[:top_n]
+    for rank, app in enumerate(top_apps, 1):
+        labels = {'app': app.get('name', ''), 'platform': app.get('platform', ''), 'rank': rank}
+        writer.add('app_score', round(app.get('score', 0), 3), f"分数最高的 {top_n} 个应用的坟墓分数", labels)
+    for rank, app in enumerate(top_apps, 1):
+        labels = {'app': app.get('name', ''), 'platform': app.get('platform', ''), 'rank': rank}
+        writer.add('app_reclaimable_bytes', reclaimable_bytes(app), f"分数最高的 {top_n} 个应用的可回收字节数", labels)
+
+    writer.add('last_scan_timestamp_seconds', round(snapshot.created, 3), "快照生成时间（Unix 时间戳）")
+    writer.add('scan_duration_seconds', round(snapshot.data.get('scan_duration', 0), 6), "整次扫描耗时")
+
+    summary = snapshot.data.get('telemetry') or {}
+    for stage, span in summary.get('spans', {}).items():
+        writer.add('scan_stage_duration_seconds', round(span['total'], 6), "各扫描阶段的累计耗时", {'stage': stage})
+    counters = summary.get('counters', {})
+    writer.add('scan_files_walked', counters.get('walk.files', 0), "统计大小时遍历的文件数")
+    writer.add('scan_bytes_walked', counters.get('walk.bytes', 0), "统计大小时累计的字节数")
+    for stage, by_type in summary.get('errors', {}).items():
+        for kind, count in by_type.items():
+            writer.add('scan_errors', count, "扫描中按阶段和异常类型统计的错误数", {'stage': stage, 'type': kind})
+    return writer.render()
+
+
+def write_textfile(path: str, content: str):
+    """原子地写入文本文件：先写同目录的临时文件再重命名，采集器不会读到写了一半的内容"""
+    # textfile collector 只读取 *.prom，临时文件用其他后缀避免被采集
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+class TextfileExporter:
+    """快照变化时重新生成指标文件
+
+    refresh() 只 stat 一次快照文件；文件未变化时不读取也不重写。
+    """
+
+    def __init__(self, textfile: str, snapshot_path: Optional[str] = None, top_n: int = DEFAULT_TOP_N):
+        self.textfile = textfile
+        self.snapshot_path = snapshot_path or default_snapshot_path()
+        self.top_n = top_n
+        self._fingerprint: Optional[Tuple[int, int]] = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """快照有更新时重写指标文件，返回是否写入"""
+        try:
+            st = os.stat(self.snapshot_path)
+        except OSError:
+            return False
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        if fingerprint == self._fingerprint and not force:
+            return False
+        snapshot = Snapshot.load(self.snapshot_path)
+        if snapshot is None:
+            return False
+        try:
+            write_textfile(self.textfile, render_snapshot(snapshot, self.top_n))
+        except OSError as e:
+            print(f"Error writing metrics textfile {self.textfile}: {e}")
+            return False
+        self._fingerprint = fingerprint
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 AppGraveyard 扫描结果导出为 OpenMetrics 文本文件")
+    parser.add_argument("textfile", help="输出文件，例如 /var/lib/node_exporter/textfile_collector/appgraveyard.prom")
+    parser.add_argument("--snapshot", help="快照文件路径（默认在 AppGraveyard 数据目录中）")
+    parser.add_argument("--scan", action="store_true", help="先完整扫描一次并更新快照")
+    parser.add_argument("--background", action="store_true", help="扫描时使用低影响后台模式")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_N, help="导出分数最高的多少个应用")
+    parser.add_argument("--interval", type=float, help="持续运行，每隔这么多秒检查快照是否更新")
+    args = parser.parse_args()
+
+    if args.scan:
+        from cross_platform_scanner import AppScanner
+        take_snapshot(AppScanner(background=args.background), args.snapshot)
+
+    exporter = TextfileExporter(args.textfile, args.snapshot, args.top)
+    if not exporter.refresh() and not args.interval:
+        print(f"没有可用的快照: {exporter.snapshot_path}（先用 --scan 扫描一次）")
+        sys.exit(1)
+    while args.interval:
+        time.sleep(args.interval)
+        exporter.refresh()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Optional
+
+# 网络文件系统：遍历可能非常慢甚至挂起
+REMOTE_FS_TYPES = {
+    'nfs', 'nfs4', 'cifs', 'smb', 'smbfs', 'smb2', 'smb3', 'afs', 'ncpfs',
+    '9p', 'ceph', 'glusterfs', 'lustre', 'davfs', 'webdav', 'sshfs', 'afpfs',
+}
+
+# 伪文件系统：不占用磁盘空间
+PSEUDO_FS_TYPES = {
+    'proc', 'sysfs', 'devtmpfs', 'devpts', 'devfs', 'cgroup', 'cgroup2',
+    'debugfs', 'tracefs', 'securityfs', 'pstore', 'bpf', 'autofs', 'mqueue',
+    'hugetlbfs', 'configfs', 'fusectl', 'binfmt_misc', 'efivarfs', 'nsfs',
+    'rpc_pipefs', 'selinuxfs',
+}
+
+# Windows GetDriveTypeW 返回值
+DRIVE_REMOTE = 4
+
+
+def _unescape_mount_path(path: str) -> str:
+    """还原 /proc/mounts 中用八进制转义的空格等字符"""
+    # 只替换 \ooo 转义；非 Latin-1 字符（例如中文目录名）原样保留
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), path)
+
+
+class MountTable:
+    """当前系统的挂载点表
+
+    Linux 读取 /proc/self/mounts，macOS 解析 mount 命令输出，
+    Windows 按盘符查询驱动器类型。只在首次使用时加载一次。
+    """
+
+    def __init__(self):
+        self._mounts: Optional[Dict[str, str]] = None
+
+    @property
+    def mounts(self) -> Dict[str, str]:
+        """挂载点路径 -> 文件系统类型"""
+        if self._mounts is None:
+            self.refresh()
+        return self._mounts
+
+    def refresh(self):
+        """重新读取挂载表"""
+        try:
+            if sys.platform == "win32":
+                self._mounts = self._read_windows_drives()
+            elif sys.platform == "darwin":
+                self._mounts = self._read_mount_command()
+            else:
+                self._mounts = self._read_proc_mounts()
+        except Exception as e:
+            print(f"Error reading mount table: {e}")
+            self._mounts = {}
+
+    def _read_proc_mounts(self) -> Dict[str, str]:
+        """解析 /proc/self/mounts"""
+        mounts = {}
+        path = "/proc/self/mounts" if os.path.exists("/proc/self/mounts") else "/proc/mounts"
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3:
+                    mounts[_unescape_mount_path(parts[1])] = parts[2]
+        return mounts
+
+    def _read_mount_command(self) -> Dict[str, str]:
+        """解析 macOS/BSD 的 mount 输出，例如 "/dev/disk1s1 on / (apfs, local, journaled)" """
+        mounts = {}
+        result = subprocess.run(["mount"], capture_output=True, text=True, timeout=10)
+        for line in result.stdout.splitlines():
+            if " on " not in line or " (" not in line:
+                continue
+            _, rest = line.split(" on ", 1)
+            mount_point, options = rest.rsplit(" (", 1)
+            fs_type = options.rstrip(")").split(",")[0].strip()
+            mounts[mount_point] = fs_type
+        return mounts
+
+    def _read_windows_drives(self) -> Dict[str, str]:
+        """Windows：把网络驱动器标记为 remote，其余按本地处理"""
+        import ctypes
+        import string
+
+        mounts = {}
+        bitmask = ctypes.windll.kernel32.GetLogicalDrives()
+        for index, letter in enumerate(string.ascii_uppercase):
+            if bitmask & (1 << index):
+                root = f"{letter}:\\"
+                drive_type = ctypes.windll.kernel32.GetDriveTypeW(root)
+                mounts[root] = 'remote' if drive_type == DRIVE_REMOTE else 'local'
+        return mounts
+
+    def fs_type(self, path: str) -> str:
+        """返回 path 所在文件系统的类型（按最长挂载点前缀匹配）"""
+        mounts = self.mounts
+        path = os.path.abspath(path)
+        if sys.platform == "win32":
+            return mounts.get(os.path.splitdrive(path)[0].upper() + "\\", '')
+
+        while True:
+            fs_type = mounts.get(path)
+            if fs_type is not None:
+                return fs_type
+            parent = os.path.dirname(path)
+            if parent == path:
+                return ''
+            path = parent
+
+    def is_mount_point(self, path: str) -> bool:
+        """path 本身是否是一个挂载点（包括同一设备上的 bind mount）"""
+        return path in self.mounts
+
+    def skip_reason(self, fs_type: str) -> Optional[str]:
+        """该类型的文件系统是否应跳过；返回原因，不跳过时返回 None"""
+        if fs_type in REMOTE_FS_TYPES or fs_type == 'remote':
+            return '网络文件系统'
+        if fs_type == 'fuse' or fs_type.startswith('fuse.'):
+            return 'FUSE 文件系统'
+        if fs_type in PSEUDO_FS_TYPES:
+            return '伪文件系统'
+        return None
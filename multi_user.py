@@ -0,0 +1,319 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app_identity import add_source, identity_key
+from instrumentation import telemetry
+from leftover_scanner import LeftoverScanner
+from path_trie import PathTrie
+
+if sys.platform == "win32":
+    import winreg
+
+# 同时扫描的用户数上限
+MAX_USER_WORKERS = 4
+
+# 普通用户的最小 UID（Linux）
+MIN_USER_UID = 1000
+
+UNINSTALL_KEY = r"Software\Microsoft\Windows\CurrentVersion\Uninstall"
+PROFILE_LIST_KEY = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList"
+
+# 加载/卸载其他用户的注册表配置单元需要启用的特权
+HIVE_PRIVILEGES = ("SeRestorePrivilege", "SeBackupPrivilege")
+
+# macOS /Users 下不是用户主目录的条目
+MACOS_NON_USER_DIRS = {'Shared', 'Guest', 'Deleted Users'}
+
+
+def list_user_profiles() -> List[Dict]:
+    """列出本机所有普通用户：[{'name', 'home', 'sid'}]，sid 只在 Windows 上有值"""
+    profiles = []
+    try:
+        if sys.platform == "win32":
+            profiles = _windows_profiles()
+        elif sys.platform == "darwin":
+            profiles = _directory_profiles("/Users", MACOS_NON_USER_DIRS)
+        else:
+            profiles = _linux_profiles()
+    except Exception as e:
+        print(f"Error listing user profiles: {e}")
+    return profiles
+
+
+def _windows_profiles() -> List[Dict]:
+    """从 ProfileList 读取每个本地/域用户的 SID 和配置文件目录"""
+    profiles = []
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_KEY) as profile_list:
+        i = 0
+        while True:
+            try:
+                sid = winreg.EnumKey(profile_list, i)
+            except OSError:
+                break
+            i += 1
+            # 只要普通用户（S-1-5-21-…），跳过 SYSTEM、LocalService 等服务账户
+            if not sid.startswith("S-1-5-21-"):
+                continue
+            try:
+                with winreg.OpenKey(profile_list, sid) as profile_key:
+                    home = os.path.expandvars(winreg.QueryValueEx(profile_key, "ProfileImagePath")[0])
+            except OSError:
+                continue
+            if os.path.isdir(home):
+                profiles.append({'name': os.path.basename(home), 'home': home, 'sid': sid})
+    return profiles
+
+
+def _linux_profiles() -> List[Dict]:
+    """passwd 中 UID >= 1000 且主目录存在的用户，再加上 root"""
+    import pwd
+
+    profiles = []
+    seen = set()
+    for entry in pwd.getpwall():
+        if (entry.pw_uid >= MIN_USER_UID or entry.pw_uid == 0) and entry.pw_dir not in seen \
+                and entry.pw_dir != '/' and os.path.isdir(entry.pw_dir) \
+                and not entry.pw_shell.endswith(('nologin', 'false')):
+            seen.add(entry.pw_dir)
+            profiles.append({'name': entry.pw_name, 'home': entry.pw_dir, 'sid': None})
+    # 目录服务（LDAP 等）中的用户可能不在本地 passwd 里
+    for profile in _directory_profiles("/home", set()):
+        if profile['home'] not in seen:
+            profiles.append(profile)
+    return profiles
+
+
+def _directory_profiles(base: str, excluded: set) -> List[Dict]:
+    """把 base 下的每个子目录当作一个用户主目录"""
+    profiles = []
+    try:
+        entries = list(os.scandir(base))
+    except OSError:
+        return profiles
+    for entry in entries:
+        if entry.name.startswith('.') or entry.name in excluded:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            profiles.append({'name': entry.name, 'home': entry.path, 'sid': None})
+    return profiles
+
+
+def _enable_hive_privileges() -> bool:
+    """在当前进程令牌中启用 HIVE_PRIVILEGES（管理员令牌中有这些特权，但默认未启用）"""
+    import ctypes
+    from ctypes import wintypes
+
+    class LUID(ctypes.Structure):
+        _fields_ = [('LowPart', wintypes.DWORD), ('HighPart', wintypes.LONG)]
+
+    class LUID_AND_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [('Luid', LUID), ('Attributes', wintypes.DWORD)]
+
+    class TOKEN_PRIVILEGES(ctypes.Structure):
+        _fields_ = [('PrivilegeCount', wintypes.DWORD),
+                    ('Privileges', LUID_AND_ATTRIBUTES * len(HIVE_PRIVILEGES))]
+
+    TOKEN_ADJUST_PRIVILEGES = 0x0020
+    TOKEN_QUERY = 0x0008
+    SE_PRIVILEGE_ENABLED = 0x00000002
+    ERROR_NOT_ALL_ASSIGNED = 1300
+
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    advapi32.OpenProcessToken.argtypes = (wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE))
+    advapi32.LookupPrivilegeValueW.argtypes = (wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.POINTER(LUID))
+    advapi32.AdjustTokenPrivileges.argtypes = (wintypes.HANDLE, wintypes.BOOL, ctypes.POINTER(TOKEN_PRIVILEGES),
+                                               wintypes.DWORD, wintypes.LPVOID, wintypes.LPVOID)
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+
+    token = wintypes.HANDLE()
+    if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(), TOKEN_ADJUST_PRIVILEGES | TOKEN_QUERY,
+                                     ctypes.byref(token)):
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        privileges = TOKEN_PRIVILEGES()
+        privileges.PrivilegeCount = len(HIVE_PRIVILEGES)
+        for i, name in enumerate(HIVE_PRIVILEGES):
+            if not advapi32.LookupPrivilegeValueW(None, name, ctypes.byref(privileges.Privileges[i].Luid)):
+                raise ctypes.WinError(ctypes.get_last_error())
+            privileges.Privileges[i].Attributes = SE_PRIVILEGE_ENABLED
+        if not advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(privileges), 0, None, None):
+            raise ctypes.WinError(ctypes.get_last_error())
+        # 令牌中没有这些特权（非管理员）时调用也会成功，只能通过最后错误码判断
+        return ctypes.get_last_error() != ERROR_NOT_ALL_ASSIGNED
+    finally:
+        kernel32.CloseHandle(token)
+
+
+def _unload_hive(mount_name: str) -> None:
+    """卸载 HKEY_USERS 下临时加载的配置单元（winreg 没有提供 UnLoadKey）"""
+    import ctypes
+    from ctypes import wintypes
+
+    advapi32 = ctypes.WinDLL('advapi32')
+    advapi32.RegUnLoadKeyW.argtypes = (wintypes.HKEY, wintypes.LPCWSTR)
+    advapi32.RegUnLoadKeyW.restype = wintypes.LONG
+    # 预定义键在 SDK 中是 (HKEY)(ULONG_PTR)(LONG)0x80000003，64 位下需要符号扩展
+    hkey_users = wintypes.HKEY(ctypes.c_long(winreg.HKEY_USERS).value)
+    result = advapi32.RegUnLoadKeyW(hkey_users, mount_name)
+    if result != 0:
+        # 卸载失败时配置单元会一直挂载在 HKEY_USERS 下，并锁住用户的 NTUSER.DAT
+        error = ctypes.WinError(result)
+        print(f"Error unloading registry hive {mount_name}: {error}")
+        telemetry.error('user_hives', error)
+
+
+class MultiUserScanner:
+    """管理员模式：扫描本机所有用户的配置文件
+
+    用有上限的线程池并发处理各个用户：Windows 读取每个用户注册表配置单元
+    （已加载的在 HKEY_USERS 下，未登录用户临时加载 NTUSER.DAT）中的卸载项，
+    macOS 读取 ~/Applications，所有平台都统计用户数据和缓存目录。
+    结果按用户归属（app['users']、app['leftover_by_user']、user_reports）。
+    和扫描器一样按 app_identity.identity_key 合并：同一个安装只保留一条记录，
+    不同用户各自安装的同名应用是不同的安装，各自保留。
+    """
+
+    def __init__(self, scanner, max_workers: int = MAX_USER_WORKERS):
+        self.scanner = scanner
+        self.max_workers = max_workers
+        self.leftover_scanner = LeftoverScanner(scanner.walker)
+        self.profiles: List[Dict] = []
+        # 用户名 -> {'home', 'app_count', 'leftover_size', 'orphan_size'}
+        self.user_reports: Dict[str, Dict] = {}
+        # 加载/卸载离线配置单元需要串行
+        self._hive_lock = threading.Lock()
+        # 是否已启用加载配置单元所需的特权；None 表示还没有尝试
+        self._hive_privileges: Optional[bool] = None
+
+    def _map(self, function, items: List) -> List:
+        """在有上限的线程池中对每个用户执行 function"""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(function, items))
+
+    def scan_user_apps(self, apps: List[Dict]) -> List[Dict]:
+        """扫描每个用户自己安装的应用，合并到 apps 中并统计大小"""
+        self.profiles = list_user_profiles()
+        self.user_reports = {profile['name']: {'home': profile['home'], 'app_count': 0,
+                                               'leftover_size': 0, 'orphan_size': 0}
+                             for profile in self.profiles}
+        print(f"管理员模式：找到 {len(self.profiles)} 个用户")
+
+        merged = {app.get('identity') or identity_key(app): app for app in apps}
+        result = list(apps)
+        for profile, user_apps in zip(self.profiles, self._map(self._user_apps, self.profiles)):
+            self.user_reports[profile['name']]['app_count'] = len(user_apps)
+            for app in user_apps:
+                key = identity_key(app)
+                existing = merged.get(key)
+                if existing is None:
+                    app['identity'] = key
+                    merged[key] = existing = app
+                    result.append(app)
+                add_source(existing, f"user:{profile['name']}")
+                users = existing.setdefault('users', [])
+                if profile['name'] not in users:
+                    users.append(profile['name'])
+
+        self.scanner._measure_pending_sizes(result)
+        # 用户级注册表项和机器级一样过滤掉系统组件、更新等无效条目
+        original = {id(app) for app in apps}
+        return [app for app in result
+                if id(app) in original or app.get('platform') != 'windows' or self.scanner._is_valid_app(app)]
+
+    def _user_apps(self, profile: Dict) -> List[Dict]:
+        """单个用户自己安装的应用"""
+        try:
+            if sys.platform == "win32":
+                return self._windows_user_apps(profile)
+            if sys.platform == "darwin":
+                user_applications = os.path.join(profile['home'], "Applications")
+                apps = []
+                if os.path.isdir(user_applications):
+                    for item in os.listdir(user_applications):
+                        if item.endswith(".app"):
+                            app_info = self.scanner._get_macos_app_info(os.path.join(user_applications, item))
+                            if app_info:
+                                apps.append(app_info)
+                return apps
+        except Exception as e:
+            print(f"Error scanning apps of user {profile['name']}: {e}")
+        # Linux 上的软件包是系统级的，用户目录只统计数据和缓存
+        return []
+
+    def _windows_user_apps(self, profile: Dict) -> List[Dict]:
+        """读取用户配置单元中的卸载项；用户未登录时临时加载 NTUSER.DAT"""
+        sid = profile['sid']
+        try:
+            # 已登录用户的配置单元已经加载在 HKEY_USERS 下
+            winreg.OpenKey(winreg.HKEY_USERS, sid).Close()
+            loaded = True
+        except FileNotFoundError:
+            loaded = False
+        if loaded:
+            key_path = f"{sid}\\{UNINSTALL_KEY}"
+            try:
+                with winreg.OpenKey(winreg.HKEY_USERS, key_path) as key:
+                    return self.scanner._scan_registry_key(key, f"HKEY_USERS\\{key_path}")
+            except FileNotFoundError:
+                return []
+
+        hive_path = os.path.join(profile['home'], "NTUSER.DAT")
+        if not os.path.exists(hive_path):
+            return []
+        mount_name = f"AppGraveyard_{sid}"
+        with self._hive_lock:
+            if self._hive_privileges is None:
+                try:
+                    self._hive_privileges = _enable_hive_privileges()
+                except OSError as e:
+                    print(f"Error enabling registry hive privileges: {e}")
+                    telemetry.error('user_hives', e)
+                    self._hive_privileges = False
+                if not self._hive_privileges:
+                    print("未能启用 SeRestorePrivilege/SeBackupPrivilege，跳过未登录用户的注册表配置单元")
+            if not self._hive_privileges:
+                return []
+            try:
+                winreg.LoadKey(winreg.HKEY_USERS, mount_name, hive_path)
+            except OSError as e:
+                print(f"Error loading registry hive of user {profile['name']}: {e}")
+                telemetry.error('user_hives', e)
+                return []
+            try:
+                with winreg.OpenKey(winreg.HKEY_USERS, f"{mount_name}\\{UNINSTALL_KEY}") as key:
+                    return self.scanner._scan_registry_key(key, f"HKEY_USERS\\{sid}\\{UNINSTALL_KEY}")
+            except FileNotFoundError:
+                return []
+            finally:
+                _unload_hive(mount_name)
+
+    def scan_leftovers(self, apps: List[Dict], path_trie: Optional[PathTrie] = None) -> List[Dict]:
+        """并发统计每个用户的数据和缓存目录，返回所有用户的残留目录"""
+
+        def user_candidates(profile: Dict) -> List[Dict]:
+            candidates = self.leftover_scanner.find_candidates(apps, profile['home'], path_trie)
+            self.leftover_scanner.measure(candidates)
+            for candidate in candidates:
+                candidate['user'] = profile['name']
+            return candidates
+
+        candidates = [candidate for user_result in self._map(user_candidates, self.profiles)
+                      for candidate in user_result]
+        orphans = self.leftover_scanner.assign(apps, candidates)
+
+        for app in apps:
+            leftover_by_user: Dict[str, int] = {}
+            for leftover in app['leftovers']:
+                leftover_by_user[leftover['user']] = leftover_by_user.get(leftover['user'], 0) + leftover.get('size', 0)
+            app['leftover_by_user'] = leftover_by_user
+            for user, size in leftover_by_user.items():
+                self.user_reports[user]['leftover_size'] += size
+        for orphan in orphans:
+            self.user_reports[orphan['user']]['orphan_size'] += orphan.get('size', 0)
+        return orphans
@@ -0,0 +1,249 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app_paths import app_data_dir
+
+PATH_TRIE_CACHE_NAME = "path_index.json"
+CACHE_VERSION = 2
+
+DPKG_INFO_DIR = "/var/lib/dpkg/info"
+
+# 这些目录下的文件视为可执行入口，用于 Linux 包的最后使用时间
+EXECUTABLE_DIRS = ('/bin/', '/sbin/', '/usr/bin/', '/usr/sbin/', '/usr/local/bin/', '/usr/games/')
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    """把路径规范化后拆成组件元组（Windows 下不区分大小写）"""
+    path = os.path.normcase(os.path.normpath(path))
+    return tuple(part for part in path.split(os.sep) if part)
+
+
+class _Node:
+    __slots__ = ('children', 'value', 'exact')
+
+    def __init__(self, value: Optional[str] = None, exact: Optional[str] = None):
+        # 边的第一个组件 -> (边上的组件元组, 子节点)
+        self.children: Dict[str, Tuple[Tuple[str, ...], '_Node']] = {}
+        # value 对整棵子树生效（安装目录），exact 只对该路径本身生效（包文件清单中的条目）
+        self.value = value
+        self.exact = exact
+
+
+class PathTrie:
+    """按路径组件压缩的前缀树，把任意路径映射到拥有它的应用
+
+    只有一个子节点的链被压缩成一条边，查询只需沿路径走一遍，
+    复杂度为 O(路径深度)，返回最深的有归属的前缀对应的应用键。
+    包管理器清单里的路径只精确匹配自身，因为清单同样列出 /usr、/root 这类
+    公共目录，不能把它们下面的所有文件都算作该包的。
+    被多个应用同时声明的路径（如 /usr/bin）标记为共享，查询时视为无主。
+    """
+
+    SHARED = ''
+
+    def __init__(self):
+        self._root = _Node()
+        self._count = 0
+
+    def add(self, path: str, key: str, subtree: bool = True):
+        """声明 path 属于 key；subtree 为 True 时其下的所有路径也属于 key"""
+        self._insert(split_path(path), key, subtree)
+
+    def _insert(self, components: Tuple[str, ...], key: str, subtree: bool):
+        node = self._root
+        i, n = 0, len(components)
+        while i < n:
+            first = components[i]
+            edge = node.children.get(first)
+            if edge is None:
+                leaf = _Node()
+                node.children[first] = (components[i:], leaf)
+                node = leaf
+                break
+
+            label, child = edge
+            limit = min(len(label), n - i)
+            j = 1
+            while j < limit and label[j] == components[i + j]:
+                j += 1
+            if j < len(label):
+                # 在公共前缀处拆开这条边
+                middle = _Node()
+                middle.children[label[j]] = (label[j:], child)
+                node.children[first] = (label[:j], middle)
+                child = middle
+            node = child
+            i += j
+
+        if node.value is None and node.exact is None:
+            self._count += 1
+        current = node.value if subtree else node.exact
+        if current is not None and current != key:
+            key = self.SHARED
+        if subtree:
+            node.value = key
+        else:
+            node.exact = key
+
+    def lookup(self, path: str) -> Optional[str]:
+        """返回拥有 path 的应用键；无主或共享时返回 None"""
+        components = split_path(path)
+        node = self._root
+        best = node.value
+        i, n = 0, len(components)
+        while i < n:
+            edge = node.children.get(components[i])
+            if edge is None:
+                break
+            label, child = edge
+            length = len(label)
+            if components[i:i + length] != label:
+                break
+            node = child
+            i += length
+            if node.value is not None:
+                best = node.value
+        else:
+            if node.exact is not None:
+                best = node.exact
+        return best or None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def to_json(self) -> Dict:
+        """序列化为可写入缓存的结构；应用键集中存放，节点中只存下标"""
+        keys: Dict[str, int] = {}
+
+        def index(key: Optional[str]) -> int:
+            return -1 if key is None else keys.setdefault(key, len(keys))
+
+        def encode(node: _Node) -> List:
+            return [index(node.value), index(node.exact),
+                    [[list(label), encode(child)] for label, child in node.children.values()]]
+
+        root = encode(self._root)
+        return {'version': CACHE_VERSION, 'keys': list(keys), 'count': self._count, 'root': root}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'PathTrie':
+        keys = data['keys']
+        trie = cls()
+
+        def decode(encoded: List) -> _Node:
+            value, exact, children = encoded
+            node = _Node(keys[value] if value >= 0 else None, keys[exact] if exact >= 0 else None)
+            for label, child in children:
+                node.children[label[0]] = (tuple(label), decode(child))
+            return node
+
+        trie._root = decode(data['root'])
+        trie._count = data['count']
+        return trie
+
+    def save(self, path: Optional[str] = None):
+        """原子地写入缓存文件"""
+        path = path or default_cache_path()
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_json(), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error saving path index {path}: {e}")
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['PathTrie']:
+        """从缓存读取；缓存不存在或版本不符时返回 None"""
+        path = path or default_cache_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != CACHE_VERSION:
+            return None
+        return cls.from_json(data)
+
+
+def default_cache_path() -> str:
+    return os.path.join(app_data_dir(), PATH_TRIE_CACHE_NAME)
+
+
+def dpkg_list_files() -> Dict[str, str]:
+    """包名 -> dpkg 文件清单路径（多架构包的清单名为 "包名:架构.list"）"""
+    lists = {}
+    try:
+        names = os.listdir(DPKG_INFO_DIR)
+    except OSError:
+        return lists
+    for name in names:
+        if name.endswith('.list'):
+            package = name[:-len('.list')].split(':', 1)[0]
+            lists[package] = os.path.join(DPKG_INFO_DIR, name)
+    return lists
+
+
+def read_dpkg_files(list_path: str) -> List[str]:
+    """读取一个 dpkg 文件清单"""
+    try:
+        with open(list_path, 'r', encoding='utf-8', errors='replace') as f:
+            return [line.rstrip('\n') for line in f if line.startswith('/')]
+    except OSError:
+        return []
+
+
+def read_rpm_files() -> Dict[str, List[str]]:
+    """一次 rpm 查询得到所有包的文件清单"""
+    files: Dict[str, List[str]] = {}
+    try:
+        result = subprocess.run(["rpm", "-qa", "--queryformat", "[%{NAME}\t%{FILENAMES}\n]"],
+                                capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return files
+    if result.returncode != 0:
+        return files
+    for line in result.stdout.splitlines():
+        name, _, path = line.partition('\t')
+        if path:
+            files.setdefault(name, []).append(path)
+    return files
+
+
+def build_app_path_trie(apps: Iterable[Dict], key_func: Callable[[Dict], str]) -> PathTrie:
+    """根据应用的安装目录和包管理器文件清单构建路径索引
+
+    Linux 包在 bin 目录下的文件同时记录到 app['executables']。
+    """
+    trie = PathTrie()
+    dpkg_lists: Optional[Dict[str, str]] = None
+    rpm_files: Optional[Dict[str, List[str]]] = None
+
+    for app in apps:
+        key = key_func(app)
+        if app.get('install_location'):
+            trie.add(app['install_location'], key)
+        icon_path = app.get('display_icon', '').split(',')[0].strip('"')
+        if icon_path.lower().endswith('.exe'):
+            # 安装在 install_location 之外的主程序（Windows 注册表 DisplayIcon）
+            trie.add(icon_path, key)
+
+        if app.get('platform') != 'linux' or sys.platform == "win32":
+            continue
+        if dpkg_lists is None:
+            dpkg_lists = dpkg_list_files()
+            rpm_files = {} if dpkg_lists else read_rpm_files()
+
+        list_path = dpkg_lists.get(app.get('name', ''))
+        files = read_dpkg_files(list_path) if list_path else rpm_files.get(app.get('name', ''), [])
+        executables = []
+        for path in files:
+            trie.add(path, key, subtree=False)
+            if path.startswith(EXECUTABLE_DIRS):
+                executables.append(path)
+        app['executables'] = executables
+
+    return trie
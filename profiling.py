@@ -0,0 +1,196 @@
+import argparse
+import cProfile
+import io
+import json
+import marshal
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Optional
+
+from instrumentation import telemetry
+
+# 采样间隔（秒）；5ms 时开销通常在几个百分点以内
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# tracemalloc 保留的调用栈深度和报告中的条目数
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 30
+
+# 每个阶段的 pstats 文本报告中列出的函数数
+TOP_FUNCTIONS = 40
+
+
+class StackSampler(threading.Thread):
+    """定时采样所有线程的调用栈，累计为 flamegraph.pl / speedscope 可读的折叠栈格式
+
+    只在采样时读取 sys._current_frames()，不挂钩每次函数调用，
+    因此也能看到 cProfile 覆盖不到的扫描工作线程。
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name="AppGraveyardSampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        """每行 "栈帧;栈帧;... 次数"，栈从线程名开始"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """诊断模式：按流水线阶段记录 cProfile 数据，可选栈采样和内存分配统计，
+    最后打包成一个 zip 诊断包
+
+    enabled 为 False 时 stage() 返回空上下文，入口代码不需要额外判断。
+    cProfile 只覆盖调用 stage() 的线程，且同一时间只能有一个阶段在记录（不能嵌套）；
+    工作线程中的耗时请看采样得到的折叠栈。
+    """
+
+    def __init__(self, enabled: bool = True, archive_path: Optional[str] = None,
+                 sample_interval: Optional[float] = None, trace_memory: bool = False):
+        self.enabled = enabled
+        self.archive_path = archive_path or \
+            f"appgraveyard-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self.stage_profiles: Dict[str, cProfile.Profile] = {}
+        self.stage_durations: Dict[str, float] = {}
+        self.sampler: Optional[StackSampler] = None
+        self.started = time.time()
+
+    def start(self):
+        """开始栈采样和内存跟踪（如已启用）"""
+        if not self.enabled:
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self.sample_interval:
+            self.sampler = StackSampler(self.sample_interval)
+            self.sampler.start()
+
+    def stage(self, name: str):
+        """with profiler.stage('scan'): ...  记录该阶段的 cProfile 数据和耗时"""
+        if not self.enabled:
+            return nullcontext()
+        return self._profile_stage(name)
+
+    @contextmanager
+    def _profile_stage(self, name: str):
+        profile = self.stage_profiles.setdefault(name, cProfile.Profile())
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.stage_durations[name] = self.stage_durations.get(name, 0) + time.perf_counter() - start
+
+    def _allocation_report(self) -> str:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"当前已分配: {current / 1024 ** 2:.1f}MB，峰值: {peak / 1024 ** 2:.1f}MB", ""]
+        for index, stat in enumerate(snapshot.statistics('traceback')[:TOP_ALLOCATIONS], 1):
+            lines.append(f"#{index}: {stat.size / 1024:.1f}KB in {stat.count} blocks")
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> Optional[str]:
+        """停止采集并写出诊断包，返回诊断包路径"""
+        if not self.enabled:
+            return None
+        if self.sampler is not None:
+            self.sampler.stop()
+        try:
+            with zipfile.ZipFile(self.archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for name, profile in self.stage_profiles.items():
+                    # .prof 可用 snakeviz、pstats 等工具打开
+                    archive.writestr(f"stages/{name}.prof", _marshal_stats(pstats.Stats(profile)))
+                    text = io.StringIO()
+                    pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                    archive.writestr(f"stages/{name}.txt", text.getvalue())
+                if self.sampler is not None:
+                    archive.writestr("stacks.collapsed", self.sampler.collapsed())
+                if tracemalloc.is_tracing():
+                    archive.writestr("allocations.txt", self._allocation_report())
+                    tracemalloc.stop()
+                archive.writestr("summary.json", json.dumps(self._summary(), ensure_ascii=False,
+                                                            indent=2, default=str))
+        except OSError as e:
+            print(f"Error writing profile archive {self.archive_path}: {e}")
+            return None
+        print(f"诊断包已写入: {os.path.abspath(self.archive_path)}")
+        return self.archive_path
+
+    def _summary(self) -> Dict:
+        summary = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'elapsed': time.time() - self.started,
+            'argv': sys.argv,
+            'python': sys.version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'stages': self.stage_durations,
+        }
+        if self.sampler is not None:
+            summary['sampling'] = {'interval': self.sampler.interval, 'samples': self.sampler.samples}
+        if telemetry.enabled:
+            summary['telemetry'] = telemetry.summary()
+        return summary
+
+
+def _marshal_stats(stats: pstats.Stats) -> bytes:
+    """pstats 的二进制格式（与 Stats.dump_stats 写出的文件相同）"""
+    return marshal.dumps(stats.stats)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """给入口程序加上诊断模式的命令行参数"""
+    parser.add_argument("--profile", nargs="?", const="", metavar="ZIP",
+                        help="诊断模式：按阶段记录 cProfile 数据并打包为 zip（默认写到当前目录）")
+    parser.add_argument("--profile-sample", type=float, nargs="?", const=DEFAULT_SAMPLE_INTERVAL * 1000,
+                        metavar="MS", help="诊断模式下同时按间隔（毫秒）采样所有线程的调用栈，输出折叠栈")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="诊断模式下同时用 tracemalloc 统计内存分配最多的位置")
+
+
+def profiler_from_args(args: argparse.Namespace) -> Profiler:
+    """根据 add_profile_arguments 添加的参数创建 Profiler 并开始采集"""
+    sample_interval = args.profile_sample / 1000 if args.profile_sample else None
+    profiler = Profiler(enabled=args.profile is not None, archive_path=args.profile or None,
+                        sample_interval=sample_interval, trace_memory=args.profile_memory)
+    profiler.start()
+    return profiler
@@ -0,0 +1,278 @@
+import os
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from duplicate_finder import DEFAULT_MIN_SIZE, DuplicateFinder
+from exclusion_rules import ExclusionRules
+from fs_walker import DirectoryWalker, InodeRegistry
+from instrumentation import telemetry
+from io_scheduler import StorageAwareScheduler
+from leftover_scanner import LeftoverScanner
+from multi_user import MultiUserScanner
+from path_trie import PathTrie, build_app_path_trie
+from throttle import ScanThrottle, lower_process_priority
+from usage_tracker import UsageLog, app_key
+
+
+class ScannerBase:
+    """两个扫描器（cross_platform_scanner / scanner_fixed）共用的部分
+
+    子类只负责枚举应用；安装目录的大小统计、独占可回收空间的结算、
+    后台补全、重复文件检测，以及枚举之后的用户应用、路径索引和残留扫描都在这里。
+    """
+
+    def __init__(self, parallel: bool = True, background: bool = False, all_users: bool = False,
+                 find_duplicates: bool = False):
+        self.installed_apps = []
+        self.parallel = parallel
+        self.background = background
+        # 后台模式：降低进程优先级，限制遍历速率，系统繁忙时暂停
+        self.throttle = None
+        if background:
+            lower_process_priority()
+            self.throttle = ScanThrottle()
+        # 查找重复文件时让大小遍历顺便记录文件的 stat 数据，避免再遍历一次
+        self.find_duplicates = find_duplicates
+        self.walker = DirectoryWalker(throttle=self.throttle,
+                                      collect_min_size=DEFAULT_MIN_SIZE if find_duplicates else None)
+        # 按存储设备分组、自适应并发地遍历安装目录；parallel=False 时串行，后台模式下每块盘只用一个线程
+        self.scheduler = StorageAwareScheduler(1 if background else None) if parallel else None
+        self._reset_reclaim_tracking()
+        # 使用记录守护进程（usage_tracker.py）写下的真实最后运行时间
+        self.usage_log = UsageLog()
+        # 路径 -> 应用 的索引，每次扫描后重建并写入缓存
+        self.path_trie = PathTrie()
+        # 用户数据/缓存目录：已安装应用的计入 leftover_size，找不到应用的作为残留
+        self.leftover_scanner = LeftoverScanner(self.walker, self.scheduler)
+        self.orphaned_leftovers: List[Dict] = []
+        # 管理员模式：同时扫描本机所有用户的配置文件
+        self.all_users = all_users
+        self.multi_user = MultiUserScanner(self) if all_users else None
+        # 排除系统组件、补丁等的规则（可用规则文件按机器集群配置）
+        self.exclusion_rules = ExclusionRules.load()
+        self.excluded_apps: List[Dict] = []
+        # 每个来源上一轮枚举的记录；子类创建 change_detector
+        self.change_detector = None
+        self._source_apps: Dict[str, List[Dict]] = {}
+
+    def refresh_installed_programs(self) -> Optional[List[Dict]]:
+        """先比较包数据库指纹：都没有变化时返回 None（只花几次 stat），否则只重新枚举变化的来源"""
+        changed = self.change_detector.changed_sources()
+        if not changed:
+            return None
+        print(f"应用来源有变化: {', '.join(changed)}")
+        return self.scan_installed_programs(changed)
+
+    def _finish_scan(self, apps: List[Dict]) -> List[Dict]:
+        """枚举之后的公共步骤：合并各用户的应用、结算可回收空间、重建路径索引、统计用户数据和残留"""
+        if self.multi_user is not None:
+            with telemetry.span('user_apps'):
+                apps = self.multi_user.scan_user_apps(apps)
+
+        self._finalize_reclaimable(apps)
+        with telemetry.span('path_index'):
+            self.path_trie = build_app_path_trie(apps, app_key)
+            self.path_trie.save()
+        with telemetry.span('leftover_scan') as span:
+            if self.multi_user is not None:
+                self.orphaned_leftovers = self.multi_user.scan_leftovers(apps, self.path_trie)
+            else:
+                self.orphaned_leftovers = self.leftover_scanner.scan(apps, path_trie=self.path_trie)
+            span.set(orphans=len(self.orphaned_leftovers))
+        return apps
+
+    def _is_valid_app(self, app: Dict) -> bool:
+        """检查应用是否有效（排除系统组件等）；被排除时 app['excluded_by'] 记录命中的规则"""
+        rule = self.exclusion_rules.match(app)
+        if rule is None:
+            app.pop('excluded_by', None)
+            return True
+        app['excluded_by'] = rule
+        telemetry.count(f"exclusion.{rule.split(':', 1)[0]}")
+        return False
+
+    def _filter_valid_apps(self, apps: List[Dict]) -> List[Dict]:
+        """按排除规则过滤，被排除的记录留在 excluded_apps 中，并打印各规则排除的数量"""
+        valid_apps = [app for app in apps if self._is_valid_app(app)]
+        self.excluded_apps = [app for app in apps if 'excluded_by' in app]
+        print(f"过滤后剩下 {len(valid_apps)} 个有效程序")
+        if self.excluded_apps:
+            by_rule = Counter(app['excluded_by'] for app in self.excluded_apps)
+            print("排除规则: " + ", ".join(f"{rule} {count}" for rule, count in by_rule.most_common()))
+        return valid_apps
+
+    def _estimate_size_from_install_location(self, install_location: str, app_info: Optional[Dict] = None) -> int:
+        """根据安装位置估算程序大小；传入 app_info 时同时记录子目录、最大文件和文件类型分布
+
+        遍历受单次预算限制，超出时 app_info['size_incomplete'] 为 True，
+        之后可以用 finish_incomplete_walks 在后台补全。
+        """
+        if not install_location or not os.path.exists(install_location):
+            return 0
+
+        owner = None
+        if app_info is not None:
+            # 因相邻应用被移除而重新遍历的应用沿用原来的编号，其他应用记下的重叠仍然有效
+            owner = self._rewalk_owners.pop(id(app_info), None)
+            if owner is None:
+                owner = self.inode_registry.new_owner()
+        label = app_info.get('name') if app_info else install_location
+        try:
+            with telemetry.span('size_walk', label=label) as span:
+                state = self.walker.start(install_location, self.inode_registry, owner)
+                walk_result = self.walker.resume(state)
+                span.set(files=walk_result['file_count'], bytes=walk_result['size'],
+                         incomplete=walk_result['incomplete'])
+        except Exception as e:
+            print(f"Error estimating size for {install_location}: {e}")
+            telemetry.error('size_walk', e)
+            return 0
+
+        if app_info is not None:
+            self._walk_states.append((app_info, state))
+            app_info.update(self._walk_changes(walk_result))
+        return walk_result['size']
+
+    def _walk_changes(self, walk_result: Dict) -> Dict:
+        """把遍历结果转换为应用记录中的字段（复制一份，后台继续遍历时不影响界面读取）"""
+        return {
+            'size': walk_result['size'],
+            'allocated_size': walk_result['allocated_size'],
+            'file_count': walk_result['file_count'],
+            'subdir_sizes': dict(walk_result['subdir_sizes']),
+            'largest_files': list(walk_result['largest_files']),
+            'size_by_type': dict(walk_result['size_by_type']),
+            'skipped_mounts': list(walk_result['skipped_mounts']),
+            'size_incomplete': walk_result['incomplete'],
+        }
+
+    def _reset_reclaim_tracking(self):
+        """开始新一轮扫描时重置 inode 登记表和遍历进度"""
+        self.inode_registry = InodeRegistry()
+        self._walk_states = []
+        self._pending_size_walks = []
+        # id(应用记录) -> 重新遍历时沿用的登记编号
+        self._rewalk_owners: Dict[int, int] = {}
+
+    def _start_reclaim_tracking(self, sources: Optional[List[str]]):
+        """完整扫描时重置；只重新枚举部分来源时保留登记表和沿用记录的遍历进度，
+        枚举完成后由 _retire_walks 去掉不再出现的应用"""
+        if sources is None:
+            self._reset_reclaim_tracking()
+        else:
+            self._pending_size_walks = []
+
+    def _retire_walks(self, apps: List[Dict]):
+        """去掉不在 apps 中的应用（重新枚举的来源中旧的记录）的遍历进度和登记内容
+
+        遍历到这些应用所登记目录的其他应用（嵌套安装）重新遍历，
+        原先记在对方名下的共享字节才能计入它们自己的独占空间。
+        """
+        kept = {id(app) for app in apps}
+        retired = {state.owner for app_info, state in self._walk_states if id(app_info) not in kept}
+        if not retired:
+            return
+        self._walk_states = [(app_info, state) for app_info, state in self._walk_states if id(app_info) in kept]
+        affected = self.inode_registry.release(retired)
+        for app_info, state in self._walk_states:
+            if state.owner in affected:
+                self.inode_registry.forget_walk(state.owner)
+                self._rewalk_owners[id(app_info)] = state.owner
+                self._pending_size_walks.append(app_info)
+        self._walk_states = [(app_info, state) for app_info, state in self._walk_states
+                             if state.owner not in affected]
+
+    def _measure_pending_sizes(self, apps: List[Dict]):
+        """遍历 apps 中等待统计大小的应用；不同磁盘并行，同一磁盘的并发度自适应"""
+        kept = {id(app) for app in apps}
+        pending = [app for app in self._pending_size_walks if id(app) in kept]
+        self._pending_size_walks = []
+
+        def measure(app_info: Dict) -> int:
+            size = self._estimate_size_from_install_location(app_info['install_location'], app_info)
+            if not size and app_info.get('estimated_size'):
+                # 遍历不到文件（无权限、网络盘等）时沿用注册表中的估计大小
+                size = app_info['estimated_size']
+            app_info['size'] = size
+            return app_info.get('file_count', 0)
+
+        if self.scheduler is None:
+            for app_info in pending:
+                measure(app_info)
+            return
+
+        for app_info in pending:
+            self.scheduler.submit(app_info['install_location'], lambda app_info=app_info: measure(app_info))
+        self.scheduler.join()
+
+    def _reclaimable_sizes(self, apps: List[Dict]) -> List[Tuple[Dict, int]]:
+        """结算硬链接和共享目录，得到 apps 中每个应用的独占可回收空间"""
+        kept = {id(app) for app in apps}
+        live_owners = {state.owner for app_info, state in self._walk_states if id(app_info) in kept}
+        adjustments = self.inode_registry.finalize(live_owners)
+        return [(app_info, max(0, state.result['exclusive_size'] + adjustments.get(state.owner, 0)))
+                for app_info, state in self._walk_states if state.owner in live_owners]
+
+    def _finalize_reclaimable(self, apps: List[Dict]):
+        """整轮扫描结束后写入每个应用的独占可回收空间"""
+        for app_info, reclaimable in self._reclaimable_sizes(apps):
+            app_info['reclaimable_size'] = reclaimable
+
+    def finish_incomplete_walks(self, apps: List[Dict], on_update: Optional[Callable[[Dict, Dict], None]] = None,
+                                max_entries: int = 200000, time_budget: float = 5.0,
+                                cancel_event: Optional[threading.Event] = None):
+        """在所有应用评分完成后，分段补全大小统计未完成的应用
+
+        不同磁盘上的应用并行补全。适合在后台线程中调用。每个应用补全后调用 on_update(app, changes)，
+        默认直接更新记录；界面可借此在主线程中刷新对应的行。
+        """
+        if on_update is None:
+            on_update = lambda app, changes: app.update(changes)
+
+        kept = {id(app) for app in apps}
+        pending = [(app_info, state) for app_info, state in self._walk_states
+                   if state.incomplete and id(app_info) in kept]
+        if not pending:
+            return
+
+        def complete(app_info: Dict, state) -> int:
+            """分段继续遍历直到完成，返回本次处理的文件数"""
+            start_count = state.result['file_count']
+            while state.incomplete:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                try:
+                    with telemetry.span('size_walk_resume', label=app_info.get('name')):
+                        walk_result = self.walker.resume(state, max_entries, time_budget)
+                except Exception as e:
+                    print(f"Error resuming size walk for {state.root}: {e}")
+                    telemetry.error('size_walk_resume', e)
+                    break
+                if not state.incomplete:
+                    on_update(app_info, self._walk_changes(walk_result))
+            return state.result['file_count'] - start_count
+
+        if self.scheduler is None:
+            for app_info, state in pending:
+                complete(app_info, state)
+        else:
+            for app_info, state in pending:
+                self.scheduler.submit(state.root, lambda app_info=app_info, state=state: complete(app_info, state))
+            self.scheduler.join()
+
+        if cancel_event is not None and cancel_event.is_set():
+            return
+
+        # 所有遍历完成后重新结算可回收空间
+        for app_info, reclaimable in self._reclaimable_sizes(apps):
+            on_update(app_info, {'reclaimable_size': reclaimable})
+
+    def find_duplicate_files(self, apps: List[Dict]) -> List[Dict]:
+        """在 apps 的安装目录之间查找重复文件（需以 find_duplicates=True 创建扫描器）
+
+        大小统计未完成的应用只包含已遍历部分的文件，可先调用 finish_incomplete_walks。
+        """
+        kept = {id(app) for app in apps}
+        sources = [(app_info, state.files) for app_info, state in self._walk_states if id(app_info) in kept]
+        return DuplicateFinder().find(sources)
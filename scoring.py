@@ -1,6 +1,20 @@
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
+from instrumentation import telemetry
+
+# 状态（以 emoji 开头）到英文标签的映射，用于指标和接口中的过滤
+STATUS_BANDS = {
+    '🟢': 'safe',
+    '🟡': 'consider',
+    '🔴': 'keep',
+}
+
+
+def status_band(status: str) -> str:
+    return STATUS_BANDS.get((status or '')[:1], 'unknown')
+
+
 class AppScorer:
     """为应用程序计算'坟墓分数'的类"""
     
@@ -10,14 +24,16 @@ class AppScorer:
     
     def calculate_score(self, app: Dict) -> Dict:
         """计算应用的坟墓分数并确定状态"""
-        size_gb = app.get('size', 0) / (1024 ** 3)  # 转换为GB
-        days_since_last_use = self._calculate_days_since_last_use(app)
-        
-        # 计算分数
-        score = self.weight_size * size_gb + self.weight_days * days_since_last_use
-        
-        # 确定状态
-        status = self._determine_status(score, size_gb, days_since_last_use)
+        with telemetry.span('scoring', label=app.get('name')):
+            # 用户数据和缓存目录同样可以回收，计入大小
+            size_gb = (app.get('size', 0) + app.get('leftover_size', 0)) / (1024 ** 3)  # 转换为GB
+            days_since_last_use = self._calculate_days_since_last_use(app)
+            
+            # 计算分数
+            score = self.weight_size * size_gb + self.weight_days * days_since_last_use
+            
+            # 确定状态
+            status = self._determine_status(score, size_gb, days_since_last_use)
         
         return {
             'score': score,
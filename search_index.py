@@ -0,0 +1,173 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 参与全文检索的字段
+SEARCH_FIELDS = ('name', 'publisher', 'version', 'install_location')
+
+# 支持范围过滤的数值字段
+RANGE_FIELDS = ('size', 'days_since_last_use')
+
+# 索引的 n-gram 长度：短查询直接命中 1/2-gram，长查询用 3-gram 求交集后再校验
+MAX_GRAM = 3
+
+
+class AppSearchIndex:
+    """应用列表的增量搜索与范围过滤索引
+
+    以 Treeview 行 ID 为键构建一次，之后每次按键只做集合运算，
+    不需要重新遍历或重新填充整个列表。
+    """
+
+    def __init__(self, items: Dict[str, Dict]):
+        self._texts: Dict[str, str] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._status: Dict[str, Set[str]] = {}
+        self._sorted: Dict[str, Tuple[List[float], List[str]]] = {}
+        self._item_status: Dict[str, str] = {}
+        self._item_numbers: Dict[str, Dict[str, float]] = {}
+        self._all: Set[str] = set(items)
+
+        # 上一次文本查询的结果，用于输入继续变长时直接在其上收窄
+        self._last_query = ''
+        self._last_hits: Set[str] = set(self._all)
+
+        for item_id, app in items.items():
+            self._add_text(item_id, app)
+
+        # 范围过滤用的预排序键
+        for field in RANGE_FIELDS:
+            pairs = sorted((self._numeric(app.get(field)), item_id) for item_id, app in items.items())
+            self._sorted[field] = ([key for key, _ in pairs], [item_id for _, item_id in pairs])
+
+    def _add_text(self, item_id: str, app: Dict):
+        """把一行的文本、状态和数值字段加入索引"""
+        text = "\n".join(str(app.get(field) or '') for field in SEARCH_FIELDS).lower()
+        self._texts[item_id] = text
+        for gram in self._iter_grams(text):
+            self._grams.setdefault(gram, set()).add(item_id)
+        status = app.get('status', '')
+        self._item_status[item_id] = status
+        self._status.setdefault(status, set()).add(item_id)
+        self._item_numbers[item_id] = {field: self._numeric(app.get(field)) for field in RANGE_FIELDS}
+
+    def update(self, item_id: str, app: Dict):
+        """某一行数据变化后增量更新索引"""
+        for gram in self._iter_grams(self._texts.get(item_id, '')):
+            self._grams[gram].discard(item_id)
+        self._status.get(self._item_status.get(item_id), set()).discard(item_id)
+        self._add_text(item_id, app)
+
+        for field, (keys, item_ids) in self._sorted.items():
+            index = item_ids.index(item_id)
+            del keys[index], item_ids[index]
+            key = self._numeric(app.get(field))
+            index = bisect_left(keys, key)
+            keys.insert(index, key)
+            item_ids.insert(index, item_id)
+
+        # 数据变了，上次的查询结果不能再用于收窄
+        self._last_query, self._last_hits = '', set(self._all)
+
+    @staticmethod
+    def _iter_grams(text: str) -> Set[str]:
+        """生成文本的所有 1~MAX_GRAM 长度子串"""
+        grams = set()
+        length = len(text)
+        for n in range(1, MAX_GRAM + 1):
+            for i in range(length - n + 1):
+                gram = text[i:i + n]
+                if "\n" not in gram:
+                    grams.add(gram)
+        return grams
+
+    @staticmethod
+    def _numeric(value) -> float:
+        """把可能缺失的数值字段转换为可排序的数字"""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float('inf')
+
+    def _match_term(self, term: str, candidates: Optional[Set[str]]) -> Set[str]:
+        """查找包含 term 的行"""
+        if len(term) <= MAX_GRAM:
+            hits = self._grams.get(term, set())
+            return hits & candidates if candidates is not None else set(hits)
+
+        # 长词：按 posting 从小到大求交集，再用原文校验排除假阳性
+        postings = sorted((self._grams.get(term[i:i + MAX_GRAM], set())
+                           for i in range(len(term) - MAX_GRAM + 1)), key=len)
+        hits = set(candidates) if candidates is not None else set(postings[0])
+        for posting in postings:
+            hits &= posting
+            if not hits:
+                return hits
+        return {item_id for item_id in hits if term in self._texts[item_id]}
+
+    def search(self, query: str) -> Set[str]:
+        """文本搜索；多个空格分隔的词之间为 AND 关系"""
+        query = query.strip().lower()
+        if not query:
+            self._last_query, self._last_hits = '', set(self._all)
+            return set(self._all)
+
+        # 新查询是上一次查询的延伸时，结果一定是上次结果的子集
+        candidates = None
+        if self._last_query and query.startswith(self._last_query):
+            candidates = self._last_hits
+
+        hits = candidates
+        for term in query.split():
+            hits = self._match_term(term, hits)
+            if not hits:
+                break
+
+        self._last_query, self._last_hits = query, hits
+        return set(hits)
+
+    def range(self, field: str, low: Optional[float] = None, high: Optional[float] = None) -> Set[str]:
+        """返回 field 落在 [low, high] 内的行（None 表示不限）"""
+        if low is None and high is None:
+            return set(self._all)
+        keys, item_ids = self._sorted[field]
+        start = bisect_left(keys, low) if low is not None else 0
+        end = bisect_right(keys, high) if high is not None else len(keys)
+        return set(item_ids[start:end])
+
+    def with_status(self, status: str) -> Set[str]:
+        """返回指定状态的行"""
+        return set(self._status.get(status, set()))
+
+    def statuses(self) -> Iterable[str]:
+        """索引中出现过的所有状态"""
+        return sorted(status for status in self._status if status)
+
+    def filter(self, query: str = '', status: str = '', min_size: Optional[float] = None,
+               max_size: Optional[float] = None, min_days: Optional[float] = None,
+               max_days: Optional[float] = None) -> Set[str]:
+        """组合文本搜索、状态和范围过滤"""
+        result = self.search(query)
+        if status:
+            result &= self._status.get(status, set())
+        if min_size is not None or max_size is not None:
+            result &= self.range('size', min_size, max_size)
+        if min_days is not None or max_days is not None:
+            result &= self.range('days_since_last_use', min_days, max_days)
+        return result
+
+    def matches(self, item_id: str, query: str = '', status: str = '', min_size: Optional[float] = None,
+                max_size: Optional[float] = None, min_days: Optional[float] = None,
+                max_days: Optional[float] = None) -> bool:
+        """只检查一行是否满足过滤条件，结果与 filter 一致（单行数据更新后使用）"""
+        text = self._texts.get(item_id)
+        if text is None:
+            return False
+        if any(term not in text for term in query.strip().lower().split()):
+            return False
+        if status and self._item_status.get(item_id) != status:
+            return False
+        numbers = self._item_numbers[item_id]
+        for field, low, high in (('size', min_size, max_size), ('days_since_last_use', min_days, max_days)):
+            if (low is not None and numbers[field] < low) or (high is not None and numbers[field] > high):
+                return False
+        return True
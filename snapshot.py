@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app_paths import app_data_dir
+from instrumentation import telemetry
+from scoring import AppScorer
+from usage_tracker import app_key
+
+SNAPSHOT_NAME = "snapshot.json"
+SNAPSHOT_VERSION = 1
+
+
+def default_snapshot_path() -> str:
+    return os.path.join(app_data_dir(), SNAPSHOT_NAME)
+
+
+def json_default(value):
+    """应用记录中 JSON 不能直接表示的值（安装日期、最后使用时间等）"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+class Snapshot:
+    """一次完整扫描（含评分）的结果缓存
+
+    导出器、HTTP 接口等只读取快照，不需要自己重新扫描。
+    写入是原子的（临时文件 + os.replace），读者不会看到写了一半的文件。
+    """
+
+    def __init__(self, data: Dict):
+        self.data = data
+
+    @property
+    def apps(self) -> List[Dict]:
+        return self.data['apps']
+
+    @property
+    def created(self) -> float:
+        return self.data['created']
+
+    @classmethod
+    def from_scan(cls, scanner, apps: List[Dict], duration: float) -> 'Snapshot':
+        """由扫描器和评分后的应用列表生成快照"""
+        for app in apps:
+            app['key'] = app_key(app)
+        return cls({
+            'version': SNAPSHOT_VERSION,
+            'created': time.time(),
+            'platform': sys.platform,
+            'scan_duration': duration,
+            'apps': apps,
+            'orphaned_leftovers': scanner.orphaned_leftovers,
+            'telemetry': telemetry.summary() if telemetry.enabled else None,
+        })
+
+    def save(self, path: Optional[str] = None):
+        """原子地写入快照文件"""
+        path = path or default_snapshot_path()
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, separators=(',', ':'), default=json_default)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error saving snapshot {path}: {e}")
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['Snapshot']:
+        """读取快照；文件不存在、损坏或版本不符时返回 None"""
+        path = path or default_snapshot_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        return cls(data)
+
+
+def score_apps(scanner, apps: List[Dict]):
+    """为所有应用读取最后使用时间并计算分数"""
+    scorer = AppScorer()
+    for app in apps:
+        app['last_access_time'] = scanner.get_last_access_time(app)
+        app.update(scorer.calculate_score(app))
+
+
+@contextmanager
+def _collecting_telemetry():
+    """扫描期间启用计数器（若尚未启用），结束后恢复"""
+    enabled_here = not telemetry.enabled
+    if enabled_here:
+        telemetry.reset()
+        telemetry.enable()
+    try:
+        yield
+    finally:
+        if enabled_here:
+            telemetry.disable()
+
+
+def take_snapshot(scanner=None, path: Optional[str] = None) -> Tuple[Snapshot, List[Dict]]:
+    """完整扫描并评分，写入快照文件，返回 (快照, 应用列表)
+
+    扫描期间启用计数器（若尚未启用），快照中记录各阶段耗时、遍历的文件数和错误数。
+    """
+    if scanner is None:
+        from cross_platform_scanner import AppScanner
+        scanner = AppScanner()
+    with _collecting_telemetry():
+        start = time.perf_counter()
+        apps = scanner.scan_installed_programs()
+        with telemetry.span('last_access_and_score'):
+            score_apps(scanner, apps)
+        snapshot = Snapshot.from_scan(scanner, apps, time.perf_counter() - start)
+    snapshot.save(path)
+    return snapshot, apps
+
+
+def refresh_snapshot(scanner, path: Optional[str] = None) -> Optional[Tuple[Snapshot, List[Dict]]]:
+    """按包数据库指纹增量更新：只重新枚举有变化的来源，只为新读到的应用评分，写入快照
+
+    scanner 需要已经完整扫描过一次；没有来源变化时返回 None，不写快照。
+    """
+    with _collecting_telemetry():
+        start = time.perf_counter()
+        apps = scanner.refresh_installed_programs()
+        if apps is None:
+            return None
+        with telemetry.span('last_access_and_score'):
+            # 沿用的记录保留上一轮的最后使用时间和分数
+            score_apps(scanner, [app for app in apps if 'score' not in app])
+        snapshot = Snapshot.from_scan(scanner, apps, time.perf_counter() - start)
+    snapshot.save(path)
+    return snapshot, apps
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# 后台模式下默认每秒最多处理的目录条目数
+BACKGROUND_ENTRIES_PER_SECOND = 2000
+
+# 每核平均负载超过该值时暂停遍历
+BACKGROUND_MAX_LOAD = 0.7
+
+# 负载检查间隔，以及单次等待负载下降的最长时间（超过后按最低速率继续，保证扫描最终能完成）
+LOAD_CHECK_INTERVAL = 2.0
+MAX_BACKOFF = 30.0
+
+# macOS setiopolicy_np 参数
+IOPOL_TYPE_DISK = 0
+IOPOL_SCOPE_PROCESS = 0
+IOPOL_THROTTLE = 3
+
+
+def lower_process_priority():
+    """把当前进程的 CPU 和 I/O 优先级降到最低，失败时只打印提示"""
+    if HAS_PSUTIL:
+        process = psutil.Process()
+        try:
+            if sys.platform == "win32":
+                process.nice(psutil.IDLE_PRIORITY_CLASS)
+            else:
+                process.nice(19)
+        except Exception as e:
+            print(f"Error lowering CPU priority: {e}")
+        try:
+            if sys.platform == "win32":
+                process.ionice(0)  # IOPRIO_VERYLOW
+            elif hasattr(psutil, 'IOPRIO_CLASS_IDLE'):
+                process.ionice(psutil.IOPRIO_CLASS_IDLE)
+        except Exception as e:
+            print(f"Error lowering I/O priority: {e}")
+    elif hasattr(os, 'nice'):
+        try:
+            os.nice(19 - os.nice(0))
+        except OSError as e:
+            print(f"Error lowering CPU priority: {e}")
+
+    if sys.platform == "darwin":
+        # psutil 在 macOS 上不支持 ionice，直接调用 setiopolicy_np
+        try:
+            import ctypes
+            libc = ctypes.CDLL("libc.dylib", use_errno=True)
+            libc.setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_PROCESS, IOPOL_THROTTLE)
+        except Exception as e:
+            print(f"Error lowering I/O priority: {e}")
+
+
+def system_load() -> Optional[float]:
+    """返回每个 CPU 核心的 1 分钟平均负载；无法获取时返回 None"""
+    try:
+        if HAS_PSUTIL:
+            load = psutil.getloadavg()[0]
+            cpus = psutil.cpu_count() or 1
+        else:
+            load = os.getloadavg()[0]
+            cpus = os.cpu_count() or 1
+        return load / cpus
+    except (AttributeError, OSError):
+        return None
+
+
+class ScanThrottle:
+    """后台扫描的节流器
+
+    用令牌桶限制每秒处理的目录条目数（所有遍历线程共享），
+    并定期检查系统负载，负载过高时暂停，直到负载回落或等待超过 MAX_BACKOFF。
+    """
+
+    def __init__(self, entries_per_second: int = BACKGROUND_ENTRIES_PER_SECOND,
+                 max_load: float = BACKGROUND_MAX_LOAD):
+        self.entries_per_second = entries_per_second
+        self.max_load = max_load
+        self._lock = threading.Lock()
+        # 桶容量为半秒的配额，避免空闲后一次性爆发
+        self._capacity = max(1.0, entries_per_second / 2)
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+        self._last_load_check = 0.0
+
+    def consume(self, entries: int):
+        """处理 entries 个条目前调用；必要时阻塞当前线程"""
+        self._wait_for_load()
+        if not self.entries_per_second:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity,
+                               self._tokens + (now - self._last_refill) * self.entries_per_second)
+            self._last_refill = now
+            self._tokens -= entries
+            # 令牌不足时先记账再在锁外等待，其他线程会排在这次等待之后
+            delay = -self._tokens / self.entries_per_second if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+    def _wait_for_load(self):
+        """系统负载过高时等待，最多等 MAX_BACKOFF 秒"""
+        if not self.max_load:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_load_check < LOAD_CHECK_INTERVAL:
+                return
+            self._last_load_check = now
+
+        waited = 0.0
+        while waited < MAX_BACKOFF:
+            load = system_load()
+            if load is None or load <= self.max_load:
+                return
+            time.sleep(LOAD_CHECK_INTERVAL)
+            waited += LOAD_CHECK_INTERVAL
@@ -0,0 +1,351 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, List, Optional, Tuple
+
+# 与 AppScorer._determine_status 返回的状态对应的颜色
+STATUS_COLORS = {
+    "🟢 安全卸载": "#5cb85c",
+    "🟡 可考虑": "#f0ad4e",
+    "🔴 可能仍需要": "#d9534f",
+}
+DEFAULT_COLOR = "#9e9e9e"
+
+# 子目录使用的浅色
+CHILD_COLORS = {
+    "🟢 安全卸载": "#a5d6a7",
+    "🟡 可考虑": "#ffe0b2",
+    "🔴 可能仍需要": "#ef9a9a",
+}
+DEFAULT_CHILD_COLOR = "#e0e0e0"
+
+# 矩形足够大时才绘制文字标签
+LABEL_MIN_WIDTH = 60
+LABEL_MIN_HEIGHT = 16
+
+# 子目录矩形相对父矩形的内边距
+CHILD_PADDING = 2
+
+Rect = Tuple[float, float, float, float]
+
+
+def _worst_ratio(row_sum: float, row_min: float, row_max: float, side: float) -> float:
+    """一行矩形中最差的长宽比"""
+    sum_sq = row_sum * row_sum
+    side_sq = side * side
+    return max(side_sq * row_max / sum_sq, sum_sq / (side_sq * row_min))
+
+
+def squarify(values: List[Tuple[str, float]], x: float, y: float, w: float, h: float) -> Dict[str, Rect]:
+    """Squarified 树状图布局
+
+    values 为 (键, 大小) 列表，必须按大小降序排列且大小为正；
+    返回 键 -> (x, y, w, h)。
+    """
+    rects: Dict[str, Rect] = {}
+    total = sum(size for _, size in values)
+    if total <= 0 or w <= 0 or h <= 0:
+        return rects
+
+    scale = w * h / total
+    areas = [size * scale for _, size in values]
+    count = len(values)
+    i = 0
+    while i < count:
+        side = min(w, h)
+        if side <= 0:
+            break
+
+        # 贪心地往当前行里加矩形，直到最差长宽比变差为止
+        row_sum = row_min = row_max = areas[i]
+        worst = _worst_ratio(row_sum, row_min, row_max, side)
+        j = i + 1
+        while j < count:
+            area = areas[j]
+            new_sum = row_sum + area
+            new_min = min(row_min, area)
+            new_max = max(row_max, area)
+            new_worst = _worst_ratio(new_sum, new_min, new_max, side)
+            if new_worst > worst:
+                break
+            row_sum, row_min, row_max, worst = new_sum, new_min, new_max, new_worst
+            j += 1
+
+        if w >= h:
+            # 沿左侧竖向排一列
+            column_width = row_sum / h
+            offset = y
+            for k in range(i, j):
+                height = areas[k] / column_width
+                rects[values[k][0]] = (x, offset, column_width, height)
+                offset += height
+            x += column_width
+            w -= column_width
+        else:
+            # 沿顶部横向排一行
+            row_height = row_sum / w
+            offset = x
+            for k in range(i, j):
+                width = areas[k] / row_height
+                rects[values[k][0]] = (offset, y, width, row_height)
+                offset += width
+            y += row_height
+            h -= row_height
+        i = j
+    return rects
+
+
+class TreemapLayout:
+    """计算树状图布局，并缓存子目录布局以便单个应用变化时增量重排"""
+
+    def __init__(self):
+        # 应用键 -> ((子目录大小签名, 宽, 高), 相对父矩形的子矩形)
+        self._child_cache: Dict[str, Tuple[tuple, Dict[str, Rect]]] = {}
+
+    def compute(self, nodes: List[Dict], width: float, height: float, show_children: bool) -> List[Dict]:
+        """计算所有矩形
+
+        nodes 为 {'key', 'label', 'size', 'status', 'children'} 列表，
+        children 为 {子目录名: 字节数}。返回待绘制的矩形列表。
+        """
+        values = sorted(((node['key'], node['size']) for node in nodes if node['size'] > 0),
+                        key=lambda item: item[1], reverse=True)
+        top_rects = squarify(values, 0, 0, width, height)
+        by_key = {node['key']: node for node in nodes}
+
+        shapes = []
+        live_keys = set()
+        for key, (x, y, w, h) in top_rects.items():
+            node = by_key[key]
+            shapes.append({
+                'key': key,
+                'item': key,
+                'label': node['label'],
+                'size': node['size'],
+                'rect': (x, y, x + w, y + h),
+                'fill': STATUS_COLORS.get(node['status'], DEFAULT_COLOR),
+            })
+            if not show_children or not node['children']:
+                continue
+
+            live_keys.add(key)
+            inner_w = w - 2 * CHILD_PADDING
+            inner_h = h - 2 * CHILD_PADDING
+            if inner_w < 4 or inner_h < 4:
+                continue
+            for child_key, (cx, cy, cw, ch) in self._child_rects(node, inner_w, inner_h).items():
+                name = child_key.split("/", 1)[1]
+                shapes.append({
+                    'key': child_key,
+                    'item': key,
+                    'label': name,
+                    'size': node['children'][name],
+                    'rect': (x + CHILD_PADDING + cx, y + CHILD_PADDING + cy,
+                             x + CHILD_PADDING + cx + cw, y + CHILD_PADDING + cy + ch),
+                    'fill': CHILD_COLORS.get(node['status'], DEFAULT_CHILD_COLOR),
+                })
+
+        # 清理已经不存在的应用的缓存
+        for key in list(self._child_cache):
+            if key not in live_keys:
+                del self._child_cache[key]
+        return shapes
+
+    def _child_rects(self, node: Dict, width: float, height: float) -> Dict[str, Rect]:
+        """计算（或复用缓存的）子目录布局，坐标相对父矩形内侧左上角"""
+        key = node['key']
+        children = sorted(((f"{key}/{name}", size) for name, size in node['children'].items() if size > 0),
+                          key=lambda item: item[1], reverse=True)
+        signature = (tuple(children), node['size'], round(width), round(height))
+        cached = self._child_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        # 子目录之外的字节（根目录下的文件等）作为不绘制的占位块
+        remainder = node['size'] - sum(size for _, size in children)
+        values = list(children)
+        if remainder > 0:
+            values.append((f"{key}/", remainder))
+            values.sort(key=lambda item: item[1], reverse=True)
+        rects = squarify(values, 0, 0, width, height)
+        rects.pop(f"{key}/", None)
+
+        self._child_cache[key] = (signature, rects)
+        return rects
+
+
+class TreemapPanel(ttk.Frame):
+    """在 Canvas 上绘制的磁盘占用树状图
+
+    布局在后台线程计算，结果通过队列交回 UI 线程；
+    绘制时只对位置或颜色有变化的矩形调用 coords/itemconfig。
+    """
+
+    def __init__(self, parent, format_size, on_select=None):
+        super().__init__(parent)
+        self.format_size = format_size
+        self.on_select = on_select
+
+        self.show_children_var = tk.BooleanVar(value=False)
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Checkbutton(toolbar, text="显示顶层子目录", variable=self.show_children_var,
+                        command=self.request_layout).pack(side=tk.LEFT)
+        self.hover_label = ttk.Label(toolbar, text="")
+        self.hover_label.pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self, background="white", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.request_layout())
+        self.canvas.bind("<Motion>", self._on_motion)
+        self.canvas.bind("<Button-1>", self._on_click)
+
+        self._nodes: Dict[str, Dict] = {}
+        self._layout = TreemapLayout()
+        self._results: "queue.Queue" = queue.Queue()
+        self._generation = 0
+        self._worker_busy = False
+        self._pending = False
+
+        # 形状键 -> (矩形 canvas ID, 文字 canvas ID 或 None, 当前形状)
+        self._drawn: Dict[str, Tuple[int, Optional[int], Dict]] = {}
+        self._canvas_to_shape: Dict[int, Dict] = {}
+
+    def _node_for(self, key: str, app: Dict) -> Dict:
+        """提取布局所需的字段（在 UI 线程中做，后台线程不接触应用记录）"""
+        return {
+            'key': key,
+            'label': app.get('name', 'Unknown'),
+            'size': app.get('size', 0) or 0,
+            'status': app.get('status', ''),
+            'children': dict(app.get('subdir_sizes') or {}),
+        }
+
+    def set_items(self, items: Dict[str, Dict]):
+        """用 行 ID -> 应用记录 的映射替换全部数据"""
+        self._nodes = {key: self._node_for(key, app) for key, app in items.items()}
+        self.request_layout()
+
+    def update_item(self, key: str, app: Dict):
+        """单个应用大小或状态变化后增量重排"""
+        self._nodes[key] = self._node_for(key, app)
+        self.request_layout()
+
+    def request_layout(self):
+        """在后台线程中重新计算布局；计算中再次请求时只保留最新一次"""
+        if self._worker_busy:
+            self._pending = True
+            return
+
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width < 2 or height < 2:
+            return
+
+        self._generation += 1
+        self._worker_busy = True
+        self._pending = False
+        generation = self._generation
+        nodes = list(self._nodes.values())
+        show_children = self.show_children_var.get()
+
+        def do_layout():
+            try:
+                shapes = self._layout.compute(nodes, width, height, show_children)
+            except Exception as e:
+                print(f"Error computing treemap layout: {e}")
+                shapes = []
+            self._results.put((generation, shapes))
+
+        threading.Thread(target=do_layout, daemon=True).start()
+        self.after(15, self._poll_results)
+
+    def _poll_results(self):
+        """等待后台布局结果"""
+        try:
+            generation, shapes = self._results.get_nowait()
+        except queue.Empty:
+            self.after(15, self._poll_results)
+            return
+
+        self._worker_busy = False
+        if generation == self._generation:
+            self._draw(shapes)
+        if self._pending:
+            self.request_layout()
+
+    def _draw(self, shapes: List[Dict]):
+        """把新布局应用到 Canvas 上，只改动有变化的图元"""
+        canvas = self.canvas
+        new_keys = set()
+        for shape in shapes:
+            key = shape['key']
+            new_keys.add(key)
+            x0, y0, x1, y1 = (round(value) for value in shape['rect'])
+            wants_label = (x1 - x0) >= LABEL_MIN_WIDTH and (y1 - y0) >= LABEL_MIN_HEIGHT
+
+            tags = ("child",) if key != shape['item'] else ()
+
+            drawn = self._drawn.get(key)
+            if drawn is None:
+                rect_id = canvas.create_rectangle(x0, y0, x1, y1, fill=shape['fill'], outline="white", tags=tags)
+                text_id = None
+            else:
+                rect_id, text_id, old_shape = drawn
+                old_rect = tuple(round(value) for value in old_shape['rect'])
+                if old_rect != (x0, y0, x1, y1):
+                    canvas.coords(rect_id, x0, y0, x1, y1)
+                if old_shape['fill'] != shape['fill']:
+                    canvas.itemconfig(rect_id, fill=shape['fill'])
+
+            if wants_label:
+                if text_id is None:
+                    text_id = canvas.create_text(x0 + 3, y0 + 2, anchor="nw", text=shape['label'],
+                                                 width=x1 - x0 - 6, font=("Arial", 8), tags=tags)
+                else:
+                    canvas.coords(text_id, x0 + 3, y0 + 2)
+                    canvas.itemconfig(text_id, text=shape['label'], width=x1 - x0 - 6)
+            elif text_id is not None:
+                canvas.delete(text_id)
+                text_id = None
+
+            self._drawn[key] = (rect_id, text_id, shape)
+            self._canvas_to_shape[rect_id] = shape
+            if text_id is not None:
+                self._canvas_to_shape[text_id] = shape
+
+        for key in [key for key in self._drawn if key not in new_keys]:
+            rect_id, text_id, _ = self._drawn.pop(key)
+            canvas.delete(rect_id)
+            self._canvas_to_shape.pop(rect_id, None)
+            if text_id is not None:
+                canvas.delete(text_id)
+                self._canvas_to_shape.pop(text_id, None)
+
+        # 子目录要画在父矩形之上
+        canvas.tag_raise("child")
+
+    def _shape_at(self, event) -> Optional[Dict]:
+        """返回鼠标下方最上层的形状"""
+        found = self.canvas.find_overlapping(event.x, event.y, event.x, event.y)
+        for canvas_id in reversed(found):
+            shape = self._canvas_to_shape.get(canvas_id)
+            if shape is not None:
+                return shape
+        return None
+
+    def _on_motion(self, event):
+        """鼠标悬停时显示名称和大小"""
+        shape = self._shape_at(event)
+        if shape is None:
+            self.hover_label.config(text="")
+            return
+        self.hover_label.config(text=f"{shape['label']}: {self.format_size(shape['size'])}")
+
+    def _on_click(self, event):
+        """点击矩形时通知外部选中对应的行"""
+        shape = self._shape_at(event)
+        if shape is not None and self.on_select:
+            self.on_select(shape['item'])
+
@@ -4,15 +4,51 @@ import webbrowser
 import os
 import subprocess
 import threading
-from typing import List, Dict
+from bisect import bisect_left
+from typing import List, Dict, Optional, Tuple
+from instrumentation import telemetry
+from search_index import AppSearchIndex
+from treemap import TreemapPanel
+
+# 列标题文字
+COLUMN_TITLES = {
+    "name": "程序名",
+    "size": "大小",
+    "days": "上次使用",
+    "status": "状态",
+    "score": "分数",
+}
+
+# 按状态排序时的先后顺序（越适合卸载越靠前）
+STATUS_ORDER = {
+    "🟢 安全卸载": 0,
+    "🟡 可考虑": 1,
+    "🔴 可能仍需要": 2,
+}
 
 class AppGraveyardUI:
     """AppGraveyard的用户界面"""
     
-    def __init__(self, apps_data: List[Dict]):
+    def __init__(self, apps_data: List[Dict], scanner=None):
         self.apps_data = apps_data
+        # 产生这批数据的扫描器，用于在后台补全大小统计未完成的应用
+        self.scanner = scanner
+        self._completion_cancel: Optional[threading.Event] = None
+        # id(应用记录) -> 行 ID，后台更新时据此找到对应的行
+        self.app_to_item: Dict[int, str] = {}
+        # Treeview 行 ID -> 应用记录，双击、卸载和批量操作都通过它查找
+        self.item_to_app: Dict[str, Dict] = {}
+        # 当前排序下的全部行 ID，以及通过过滤条件、正在显示的行
+        self.item_order: List[str] = []
+        self.visible_items: List[str] = []
+        self.search_index: Optional[AppSearchIndex] = None
+        # 每列预排序的 (排序键, 行 ID) 升序索引；切换/反转排序时只需 tree.move
+        self.sort_indices: Dict[str, Tuple[List[tuple], List[str]]] = {}
+        self.sort_column = "score"
+        self.sort_reverse = True
         self.root = tk.Tk()
         self.setup_ui()
+        self.start_background_completion()
     
     def setup_ui(self):
         """设置用户界面"""
@@ -44,16 +80,26 @@ class AppGraveyardUI:
         stats_label = ttk.Label(stats_frame, text=stats_text, font=("Arial", 10))
         stats_label.pack()
         
+        # 创建搜索和过滤栏
+        self.setup_filter_bar(main_frame)
+        
+        # 列表和空间分布树状图放在两个标签页中
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        list_frame = ttk.Frame(self.notebook)
+        self.notebook.add(list_frame, text="应用列表")
+        self.treemap = TreemapPanel(self.notebook, self._format_size, on_select=self.select_item)
+        self.notebook.add(self.treemap, text="空间分布")
+        
         # 创建树形视图
         columns = ("name", "size", "days", "status", "score")
-        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=20)
+        self.tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=20,
+                                 selectmode="extended")
         
-        # 设置列标题
-        self.tree.heading("name", text="程序名")
-        self.tree.heading("size", text="大小")
-        self.tree.heading("days", text="上次使用")
-        self.tree.heading("status", text="状态")
-        self.tree.heading("score", text="分数")
+        # 设置列标题（点击标题排序，再次点击反转）
+        for column in columns:
+            self.tree.heading(column, text=COLUMN_TITLES[column],
+                              command=lambda c=column: self.sort_by_column(c))
         
         # 设置列宽
         self.tree.column("name", width=300, minwidth=200)
@@ -63,7 +109,7 @@ class AppGraveyardUI:
         self.tree.column("score", width=80, minwidth=60, anchor="center")
         
         # 添加滚动条
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.tree.yview)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
         
         # 布局
@@ -90,6 +136,9 @@ class AppGraveyardUI:
         export_btn = ttk.Button(left_frame, text="导出报告", command=self.export_report)
         export_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        uninstall_selected_btn = ttk.Button(left_frame, text="卸载所选", command=self.uninstall_selected)
+        uninstall_selected_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
         # 右侧按钮
         right_frame = ttk.Frame(button_frame)
         right_frame.pack(side=tk.RIGHT)
@@ -100,31 +149,264 @@ class AppGraveyardUI:
         exit_btn = ttk.Button(right_frame, text="退出", command=self.root.quit)
         exit_btn.pack(side=tk.LEFT)
     
+    def setup_filter_bar(self, parent):
+        """创建搜索框和范围过滤条件"""
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.search_var = tk.StringVar()
+        self.status_var = tk.StringVar(value="全部")
+        self.min_size_var = tk.StringVar()
+        self.min_days_var = tk.StringVar()
+        
+        ttk.Label(filter_frame, text="搜索:").pack(side=tk.LEFT)
+        search_entry = ttk.Entry(filter_frame, textvariable=self.search_var, width=30)
+        search_entry.pack(side=tk.LEFT, padx=(2, 10))
+        
+        ttk.Label(filter_frame, text="状态:").pack(side=tk.LEFT)
+        self.status_combo = ttk.Combobox(filter_frame, textvariable=self.status_var,
+                                         state="readonly", width=12, values=["全部"])
+        self.status_combo.pack(side=tk.LEFT, padx=(2, 10))
+        
+        ttk.Label(filter_frame, text="最小大小(MB):").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.min_size_var, width=8).pack(side=tk.LEFT, padx=(2, 10))
+        
+        ttk.Label(filter_frame, text="未用天数≥:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.min_days_var, width=6).pack(side=tk.LEFT, padx=(2, 10))
+        
+        self.filter_count_label = ttk.Label(filter_frame, text="")
+        self.filter_count_label.pack(side=tk.RIGHT)
+        
+        for var in (self.search_var, self.status_var, self.min_size_var, self.min_days_var):
+            var.trace_add("write", lambda *args: self.apply_filter())
+    
+    def _parse_number(self, text: str) -> Optional[float]:
+        """解析过滤框里的数字，空或非法输入视为不限"""
+        try:
+            return float(text.strip())
+        except ValueError:
+            return None
+    
+    def rebuild_search_index(self):
+        """根据当前行重新构建搜索索引（每次扫描后调用一次）"""
+        self.search_index = AppSearchIndex(self.item_to_app)
+        self.status_combo.config(values=["全部"] + list(self.search_index.statuses()))
+        self.apply_filter()
+    
+    def apply_filter(self):
+        """把过滤结果应用到已有的行上，只 detach/move，不重新填充"""
+        if self.search_index is None:
+            return
+        
+        matched = self.search_index.filter(**self._filter_params())
+        self._show_items([item for item in self.item_order if item in matched])
+    
+    def _filter_params(self) -> Dict:
+        """过滤栏当前的条件，作为 AppSearchIndex.filter/matches 的参数"""
+        status = self.status_var.get()
+        min_size_mb = self._parse_number(self.min_size_var.get())
+        return {
+            'query': self.search_var.get(),
+            'status': '' if status == "全部" else status,
+            'min_size': min_size_mb * 1024 ** 2 if min_size_mb is not None else None,
+            'min_days': self._parse_number(self.min_days_var.get()),
+        }
+    
+    def _show_items(self, new_visible: List[str]):
+        """让 Treeview 按顺序只显示 new_visible 中的行"""
+        if new_visible != self.visible_items:
+            new_set = set(new_visible)
+            hidden = [item for item in self.visible_items if item not in new_set]
+            if hidden:
+                self.tree.detach(*hidden)
+            
+            # 剩下的行相对顺序不变，只需把新出现的行插到正确位置
+            old_set = set(self.visible_items)
+            for index, item in enumerate(new_visible):
+                if item not in old_set:
+                    self.tree.move(item, "", index)
+            self.visible_items = new_visible
+        
+        self.filter_count_label.config(text=f"显示 {len(new_visible)} / {len(self.item_order)}")
+    
     def populate_tree(self):
         """填充树形视图数据"""
+        with telemetry.span('ui_populate') as span:
+            self._populate_tree()
+            span.set(rows=len(self.item_order))
+    
+    def _populate_tree(self):
         # 清空现有数据
         for item in self.tree.get_children():
             self.tree.delete(item)
+        # 被过滤隐藏（detach）的行不在 get_children 中，需要单独删除
+        hidden = [item for item in self.item_order if self.tree.exists(item)]
+        if hidden:
+            self.tree.delete(*hidden)
+        self.item_to_app = {}
         
-        # 按分数排序（高分在前）
+        # 按分数排序（高分在前）插入，之后由预排序索引决定显示顺序
         sorted_apps = sorted(self.apps_data, key=lambda x: x.get('score', 0), reverse=True)
         
         for app in sorted_apps:
-            name = app.get('name', 'Unknown')
-            size_bytes = app.get('size', 0)
-            size_str = self._format_size(size_bytes)
-            days = app.get('days_since_last_use', 'N/A')
-            status = app.get('status', '未知')
-            score = app.get('score', 0)
-            
-            if days != 'N/A':
-                days_str = f"{days}天前"
-            else:
-                days_str = "未知"
-            
-            score_str = f"{score:.1f}"
+            item_id = self.tree.insert("", "end", values=self._row_values(app))
+            self.item_to_app[item_id] = app
+        
+        self.app_to_item = {id(app): item_id for item_id, app in self.item_to_app.items()}
+        self.item_order = list(self.item_to_app)
+        self.visible_items = list(self.item_order)
+        self.build_sort_indices()
+        self.rebuild_search_index()
+        self.treemap.set_items(self.item_to_app)
+    
+    def _row_values(self, app: Dict) -> tuple:
+        """把应用记录格式化为一行显示值"""
+        name = app.get('name', 'Unknown')
+        size_bytes = app.get('size', 0)
+        size_str = self._format_size(size_bytes)
+        if app.get('size_incomplete'):
+            # 大小统计尚未完成，显示的是下限
+            size_str = f"≥{size_str}"
+        days = app.get('days_since_last_use', 'N/A')
+        status = app.get('status', '未知')
+        score = app.get('score', 0)
+        
+        if days != 'N/A':
+            days_str = f"{days}天前"
+        else:
+            days_str = "未知"
+        
+        score_str = f"{score:.1f}"
+        
+        return (name, size_str, days_str, status, score_str)
+    
+    def _sort_key(self, column: str, app: Dict) -> tuple:
+        """列的排序键；名称作为次要键保证顺序稳定"""
+        name = str(app.get('name', '')).casefold()
+        if column == "name":
+            return (name,)
+        if column == "size":
+            return (app.get('size', 0) or 0, name)
+        if column == "days":
+            days = app.get('days_since_last_use')
+            return (days if isinstance(days, (int, float)) else float('inf'), name)
+        if column == "status":
+            return (STATUS_ORDER.get(app.get('status'), len(STATUS_ORDER)), name)
+        return (app.get('score', 0) or 0, name)
+    
+    def build_sort_indices(self):
+        """为每一列计算一次预排序索引，并按当前排序列排列"""
+        self.sort_indices = {}
+        for column in COLUMN_TITLES:
+            # 键中带上行 ID，排序键相同的行也有确定的位置，可以直接二分查找
+            keys = sorted((self._sort_key(column, app), item_id) for item_id, app in self.item_to_app.items())
+            self.sort_indices[column] = (keys, [item_id for _, item_id in keys])
+        self.apply_sort()
+    
+    def _update_sort_indices(self, item_id: str, old_keys: Dict[str, tuple]):
+        """某一行数据变化后增量更新各列的预排序索引"""
+        app = self.item_to_app[item_id]
+        for column, (keys, item_ids) in self.sort_indices.items():
+            index = bisect_left(keys, (old_keys[column], item_id))
+            del keys[index], item_ids[index]
             
-            self.tree.insert("", "end", values=(name, size_str, days_str, status, score_str))
+            new_key = (self._sort_key(column, app), item_id)
+            index = bisect_left(keys, new_key)
+            keys.insert(index, new_key)
+            item_ids.insert(index, item_id)
+    
+    def _reposition_item(self, item_id: str):
+        """把更新过的一行移到当前排序下的位置，并只对这一行重新检查过滤条件"""
+        if self.sort_column not in self.sort_indices:
+            return
+        column = self.sort_column
+        keys, item_ids = self.sort_indices[column]
+        target = (self._sort_key(column, self.item_to_app[item_id]), item_id)
+        index = bisect_left(keys, target)
+        if self.sort_reverse:
+            index = len(item_ids) - 1 - index
+        self.item_order.remove(item_id)
+        self.item_order.insert(index, item_id)
+        
+        was_visible = item_id in self.visible_items
+        if was_visible:
+            self.visible_items.remove(item_id)
+        visible = was_visible
+        if self.search_index is not None:
+            visible = self.search_index.matches(item_id, **self._filter_params())
+        if not visible:
+            if was_visible:
+                self.tree.detach(item_id)
+        else:
+            # 在显示的行中二分查找位置；显示顺序与 item_order 一致
+            low, high = 0, len(self.visible_items)
+            while low < high:
+                middle = (low + high) // 2
+                other = self.visible_items[middle]
+                other_key = (self._sort_key(column, self.item_to_app[other]), other)
+                if (other_key > target) if self.sort_reverse else (other_key < target):
+                    low = middle + 1
+                else:
+                    high = middle
+            self.visible_items.insert(low, item_id)
+            self.tree.move(item_id, "", low)
+        self.filter_count_label.config(text=f"显示 {len(self.visible_items)} / {len(self.item_order)}")
+    
+    def update_app_row(self, item_id: str, changes: Dict):
+        """更新单个应用的数据并刷新这一行及其排序位置"""
+        app = self.item_to_app.get(item_id)
+        if app is None:
+            return
+        
+        old_keys = {column: self._sort_key(column, app) for column in self.sort_indices}
+        app.update(changes)
+        self.tree.item(item_id, values=self._row_values(app))
+        self._update_sort_indices(item_id, old_keys)
+        if self.search_index is not None:
+            self.search_index.update(item_id, app)
+        self._reposition_item(item_id)
+        self.treemap.update_item(item_id, app)
+    
+    def select_item(self, item_id: str):
+        """在列表中选中指定行（树状图点击时调用）"""
+        app = self.item_to_app.get(item_id)
+        if app is None:
+            return
+        if item_id not in self.visible_items:
+            # 当前被过滤隐藏，直接显示详情
+            self.show_app_details(app)
+            return
+        self.notebook.select(0)
+        self.tree.selection_set(item_id)
+        self.tree.see(item_id)
+    
+    def sort_by_column(self, column: str):
+        """点击列标题：切换排序列或反转当前排序"""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            # 数值列默认从大到小，文本列从小到大
+            self.sort_reverse = column in ("size", "days", "score")
+        self.apply_sort()
+    
+    def apply_sort(self):
+        """按预排序索引重新排列已有的行（只调用 tree.move，不重建行）"""
+        if self.sort_column not in self.sort_indices:
+            return
+        
+        item_ids = self.sort_indices[self.sort_column][1]
+        self.item_order = item_ids[::-1] if self.sort_reverse else list(item_ids)
+        
+        visible_set = set(self.visible_items)
+        self.visible_items = [item for item in self.item_order if item in visible_set]
+        for index, item in enumerate(self.visible_items):
+            self.tree.move(item, "", index)
+        
+        for column, title in COLUMN_TITLES.items():
+            if column == self.sort_column:
+                title += " ▼" if self.sort_reverse else " ▲"
+            self.tree.heading(column, text=title)
     
     def _format_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
@@ -139,33 +421,29 @@ class AppGraveyardUI:
         else:
             return f"{size_bytes // (1024 ** 3)} GB"
     
+    def _get_selected_apps(self) -> List[Dict]:
+        """返回当前选中行对应的应用记录（保持选择顺序）"""
+        return [self.item_to_app[item] for item in self.tree.selection()
+                if item in self.item_to_app]
+    
     def on_double_click(self, event):
         """处理双击事件"""
-        item = self.tree.selection()
+        item = self.tree.identify_row(event.y) or self.tree.focus()
         if not item:
             return
         
-        item = item[0]
-        values = self.tree.item(item, "values")
-        app_name = values[0]
-        
-        # 找到对应的app数据
-        target_app = None
-        for app in self.apps_data:
-            if app.get('name') == app_name:
-                target_app = app
-                break
-        
+        target_app = self.item_to_app.get(item)
         if target_app:
             self.show_app_details(target_app)
         else:
+            app_name = self.tree.item(item, "values")[0]
             messagebox.showinfo("信息", f"无法找到 {app_name} 的详细信息")
     
     def show_app_details(self, app: Dict):
         """显示应用详细信息"""
         details_window = tk.Toplevel(self.root)
         details_window.title(f"应用详情: {app.get('name', 'Unknown')}")
-        details_window.geometry("500x400")
+        details_window.geometry("600x500")
         details_window.minsize(400, 300)
         
         # 创建文本框显示详细信息
@@ -176,7 +454,18 @@ class AppGraveyardUI:
         info_lines = []
         info_lines.append(f"应用名称: {app.get('name', 'N/A')}")
         info_lines.append(f"安装位置: {app.get('install_location', 'N/A')}")
-        info_lines.append(f"大小: {self._format_size(app.get('size', 0))}")
+        size_line = f"大小: {self._format_size(app.get('size', 0))}"
+        if app.get('size_incomplete'):
+            size_line += "（统计尚未完成，正在后台继续）"
+        info_lines.append(size_line)
+        if 'estimated_size' in app:
+            info_lines.append(f"注册表估计大小: {self._format_size(app['estimated_size'])}"
+                              "（仅在无法遍历安装目录时作为大小）")
+        if 'allocated_size' in app:
+            info_lines.append(f"实际占用磁盘: {self._format_size(app['allocated_size'])}")
+        if 'reclaimable_size' in app:
+            info_lines.append(f"卸载后可回收: {self._format_size(app['reclaimable_size'])}"
+                              "（已排除硬链接、稀疏文件和与其他应用共享的文件）")
         info_lines.append(f"安装日期: {app.get('install_date', 'N/A')}")
         info_lines.append(f"上次使用: {app.get('last_access_time', 'N/A')}")
         info_lines.append(f"距离上次使用: {app.get('days_since_last_use', 'N/A')} 天")
@@ -185,6 +474,43 @@ class AppGraveyardUI:
         info_lines.append(f"卸载命令: {app.get('uninstall_string', 'N/A')}")
         info_lines.append(f"注册表路径: {app.get('registry_path', 'N/A')}")
         
+        if app.get('users'):
+            info_lines.append(f"安装用户: {', '.join(app['users'])}")
+        
+        leftovers = app.get('leftovers')
+        if leftovers:
+            info_lines.append("")
+            info_lines.append(f"用户数据和缓存（卸载后通常会残留）: {self._format_size(app.get('leftover_size', 0))}")
+            for user, user_bytes in sorted(app.get('leftover_by_user', {}).items(), key=lambda x: x[1], reverse=True):
+                info_lines.append(f"  用户 {user}: {self._format_size(user_bytes)}")
+            for leftover in leftovers:
+                size_text = self._format_size(leftover.get('size', 0))
+                if leftover.get('incomplete'):
+                    size_text = f"≥{size_text}"
+                info_lines.append(f"  {size_text:>8}  {leftover['path']}  [{leftover['kind']}]")
+        
+        skipped_mounts = app.get('skipped_mounts')
+        if skipped_mounts:
+            info_lines.append("")
+            info_lines.append("未统计的挂载点（大小不含这些目录）:")
+            for mount_info in skipped_mounts:
+                info_lines.append(f"  {mount_info['path']}  [{mount_info['reason']}]")
+        
+        # 扫描时顺带收集的最大文件和文件类型分布，无需再次遍历
+        largest_files = app.get('largest_files')
+        if largest_files:
+            info_lines.append("")
+            info_lines.append("最大的文件:")
+            for file_info in largest_files:
+                info_lines.append(f"  {self._format_size(file_info['size']):>8}  {file_info['path']}")
+        
+        size_by_type = app.get('size_by_type')
+        if size_by_type:
+            info_lines.append("")
+            info_lines.append("按文件类型:")
+            for extension, type_bytes in sorted(size_by_type.items(), key=lambda x: x[1], reverse=True)[:10]:
+                info_lines.append(f"  {extension:<12} {self._format_size(type_bytes)}")
+        
         text_widget.insert(tk.END, "\n".join(info_lines))
         text_widget.config(state=tk.DISABLED)
         
@@ -221,8 +547,76 @@ class AppGraveyardUI:
         except Exception as e:
             messagebox.showerror("错误", f"无法启动卸载程序: {e}")
     
+    def uninstall_selected(self):
+        """批量卸载选中的应用"""
+        selected_apps = self._get_selected_apps()
+        if not selected_apps:
+            messagebox.showinfo("信息", "请先在列表中选择要卸载的应用（可按住 Ctrl/Shift 多选）")
+            return
+        
+        uninstallable = [app for app in selected_apps if app.get('uninstall_string')]
+        skipped = len(selected_apps) - len(uninstallable)
+        if not uninstallable:
+            messagebox.showinfo("信息", "所选应用都没有可用的卸载命令")
+            return
+        
+        names = "\n".join(f"• {app.get('name', 'Unknown')}" for app in uninstallable[:15])
+        if len(uninstallable) > 15:
+            names += f"\n... 以及另外 {len(uninstallable) - 15} 个"
+        if skipped:
+            names += f"\n\n（{skipped} 个应用没有卸载命令，将被跳过）"
+        
+        if not messagebox.askyesno("确认", f"确定要启动以下 {len(uninstallable)} 个应用的卸载程序吗?\n\n{names}"):
+            return
+        
+        for app in uninstallable:
+            self.open_uninstall(app)
+    
+    def start_background_completion(self):
+        """在后台补全大小统计未完成的应用，完成一个就刷新对应的行"""
+        if self.scanner is None or not hasattr(self.scanner, 'finish_incomplete_walks'):
+            return
+        if not any(app.get('size_incomplete') for app in self.apps_data):
+            return
+        
+        if self._completion_cancel is not None:
+            self._completion_cancel.set()
+        cancel_event = threading.Event()
+        self._completion_cancel = cancel_event
+        scanner, apps = self.scanner, self.apps_data
+        
+        def on_update(app, changes):
+            if not cancel_event.is_set():
+                self.root.after(0, lambda: self._apply_background_update(app, changes))
+        
+        def do_complete():
+            try:
+                scanner.finish_incomplete_walks(apps, on_update=on_update, cancel_event=cancel_event)
+            except Exception as e:
+                print(f"Error completing size walks: {e}")
+        
+        threading.Thread(target=do_complete, daemon=True).start()
+    
+    def _apply_background_update(self, app: Dict, changes: Dict):
+        """在主线程中应用后台补全的结果并重新评分"""
+        item_id = self.app_to_item.get(id(app))
+        if item_id is None:
+            app.update(changes)
+            return
+        
+        if 'size' in changes:
+            from scoring import AppScorer
+            updated = dict(app)
+            updated.update(changes)
+            changes = dict(changes)
+            changes.update(AppScorer().calculate_score(updated))
+        self.update_app_row(item_id, changes)
+    
     def refresh_scan(self):
         """重新扫描（在后台线程中执行）"""
+        if self._completion_cancel is not None:
+            self._completion_cancel.set()
+        
         def do_scan():
             try:
                 progress_window = tk.Toplevel(self.root)
@@ -236,11 +630,15 @@ class AppGraveyardUI:
                 
                 self.root.update()
                 
-                # 重新扫描已安装的程序
-                from scanner_fixed import AppScanner
+                # 重新扫描已安装的程序（沿用启动时的扫描器类型）
                 from scoring import AppScorer
-                
-                scanner = AppScanner()
+                if self.scanner is not None:
+                    scanner = type(self.scanner)(parallel=self.scanner.parallel,
+                                                 background=self.scanner.background,
+                                                 all_users=self.scanner.all_users)
+                else:
+                    from scanner_fixed import AppScanner
+                    scanner = AppScanner()
                 apps = scanner.scan_installed_programs()
                 
                 scorer = AppScorer()
@@ -259,6 +657,7 @@ class AppGraveyardUI:
                 
                 # 更新数据
                 self.apps_data = enhanced_apps
+                self.scanner = scanner
                 
                 # 在主线程中更新UI
                 self.root.after(0, lambda: self.update_after_scan(enhanced_apps, progress_window))
@@ -276,6 +675,7 @@ class AppGraveyardUI:
         
         # 清空并重新填充树形视图
         self.populate_tree()
+        self.start_background_completion()
         
         # 更新统计信息
         total_apps = len(enhanced_apps)
@@ -348,7 +748,10 @@ AppGraveyard 帮助
 
 🖱️ 操作说明:
 • 双击应用行查看详细信息
+• 在"空间分布"标签页查看按大小绘制的树状图，点击矩形定位到对应应用
+• 在搜索框输入名称、发布者、版本或路径即时过滤，可叠加状态/大小/天数条件
 • 在详情窗口中点击"卸载此应用"启动卸载程序
+• 按住 Ctrl/Shift 多选后点击"卸载所选"批量卸载
 • 点击"重新扫描"刷新应用列表
 • 点击"导出报告"保存分析结果
 
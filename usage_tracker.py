@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 使用记录守护进程
+
+定期采样正在运行的进程，把可执行文件映射到已安装的应用，
+并把"最后一次看到它在运行"的时间写入本地日志，供扫描时读取。
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from app_paths import app_data_dir
+from path_trie import PathTrie
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+USAGE_LOG_NAME = "usage.log"
+
+# 默认采样间隔（秒）
+DEFAULT_INTERVAL = 60
+
+# 同一应用两次写入日志的最小间隔（秒），持续运行的程序不会每次采样都写一行
+RECORD_GRANULARITY = 600
+
+# 日志行数超过唯一应用数的这么多倍（且超过 COMPACT_MIN_LINES）时压缩
+COMPACT_RATIO = 4
+COMPACT_MIN_LINES = 1000
+
+# 守护进程重新扫描已安装应用、重建路径索引的间隔（秒）
+INDEX_REFRESH_INTERVAL = 6 * 3600
+
+
+def app_key(app: Dict) -> str:
+    """应用在使用日志中的键：优先用注册表路径/bundle id，否则用名称"""
+    platform = app.get('platform', 'windows')
+    identity = app.get('registry_path') or app.get('bundle_id') or app.get('name', '')
+    return f"{platform}:{identity}"
+
+
+class UsageLog:
+    """只追加的使用记录日志
+
+    每行一条 "应用键<TAB>时间戳"。加载后在内存中保存每个应用的最新时间，
+    查询为 O(1)。重复行过多时整体重写为每个应用一行。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(app_data_dir(), USAGE_LOG_NAME)
+        self._last_used: Dict[str, float] = {}
+        self._line_count = 0
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取日志（文件未变化时跳过）"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        last_used: Dict[str, float] = {}
+        line_count = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    key, _, timestamp = line.rstrip('\n').rpartition('\t')
+                    try:
+                        value = float(timestamp)
+                    except ValueError:
+                        # 写入中断留下的残行
+                        continue
+                    line_count += 1
+                    if value > last_used.get(key, 0):
+                        last_used[key] = value
+        except OSError as e:
+            print(f"Error reading usage log {self.path}: {e}")
+            return
+
+        with self._lock:
+            self._last_used = last_used
+            self._line_count = line_count
+            self._loaded_mtime = mtime
+
+    def last_used(self, key: str) -> Optional[float]:
+        """应用最后一次被看到运行的时间戳"""
+        return self._last_used.get(key)
+
+    def record(self, keys: Iterable[str], timestamp: Optional[float] = None) -> int:
+        """记录这些应用在 timestamp 时正在运行，返回实际写入的行数"""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            fresh = [key for key in keys
+                     if timestamp - self._last_used.get(key, 0) >= RECORD_GRANULARITY]
+            if not fresh:
+                return 0
+            lines = ''.join(f"{key}\t{timestamp:.0f}\n" for key in fresh)
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+            except OSError as e:
+                print(f"Error writing usage log {self.path}: {e}")
+                return 0
+            for key in fresh:
+                self._last_used[key] = timestamp
+            self._line_count += len(fresh)
+
+            if self._line_count > COMPACT_MIN_LINES and \
+                    self._line_count > COMPACT_RATIO * len(self._last_used):
+                self._compact()
+        return len(fresh)
+
+    def compact(self):
+        """把日志重写为每个应用一行"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        """写入临时文件后原子替换（调用时持有锁）"""
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for key, timestamp in self._last_used.items():
+                    f.write(f"{key}\t{timestamp:.0f}\n")
+            os.replace(temp_path, self.path)
+            self._line_count = len(self._last_used)
+        except OSError as e:
+            print(f"Error compacting usage log {self.path}: {e}")
+
+
+def running_executables() -> Set[str]:
+    """返回当前所有进程的可执行文件路径"""
+    executables = set()
+    if HAS_PSUTIL:
+        for process in psutil.process_iter(['exe']):
+            exe_path = process.info.get('exe')
+            if exe_path:
+                executables.add(exe_path)
+        return executables
+
+    # 没有 psutil 时在 Linux 上直接读取 /proc
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return executables
+    for pid in pids:
+        try:
+            executables.add(os.readlink(f'/proc/{pid}/exe'))
+        except OSError:
+            continue
+    return executables
+
+
+class UsageTracker:
+    """按固定间隔采样运行中的进程并写入 UsageLog"""
+
+    def __init__(self, index: PathTrie, log: Optional[UsageLog] = None,
+                 interval: float = DEFAULT_INTERVAL):
+        self.index = index
+        self.log = log or UsageLog()
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 可执行文件 -> 应用键 的缓存；同一程序反复出现时不需要再查索引
+        self._exe_cache: Dict[str, Optional[str]] = {}
+
+    def set_index(self, index: PathTrie):
+        """更换路径索引（重新扫描已安装应用之后）"""
+        self.index = index
+        self._exe_cache = {}
+
+    def sample(self) -> List[str]:
+        """采样一次，返回本次看到正在运行的应用键"""
+        keys = set()
+        for exe_path in running_executables():
+            if exe_path not in self._exe_cache:
+                self._exe_cache[exe_path] = self.index.lookup(exe_path)
+            key = self._exe_cache[exe_path]
+            if key:
+                keys.add(key)
+        self.log.record(keys)
+        return sorted(keys)
+
+    def run(self):
+        """持续采样直到 stop() 被调用"""
+        self.log.load()
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling processes: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """在后台线程中运行"""
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def build_index() -> PathTrie:
+    """扫描已安装的应用；扫描器会构建路径索引并写入缓存"""
+    from cross_platform_scanner import AppScanner
+
+    scanner = AppScanner(background=True)
+    scanner.scan_installed_programs()
+    return scanner.path_trie
+
+
+def main():
+    """守护进程入口"""
+    parser = argparse.ArgumentParser(description="AppGraveyard 使用记录守护进程")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"采样间隔（秒），默认 {DEFAULT_INTERVAL}")
+    parser.add_argument("--log", help="使用日志路径，默认位于应用数据目录")
+    args = parser.parse_args()
+
+    # 优先使用最近一次扫描缓存的路径索引，避免启动时完整扫描
+    index = PathTrie.load() or build_index()
+    tracker = UsageTracker(index, UsageLog(args.log), args.interval)
+    print(f"正在跟踪 {len(index)} 个路径，日志: {tracker.log.path}")
+    tracker.start()
+    try:
+        while True:
+            time.sleep(INDEX_REFRESH_INTERVAL)
+            tracker.set_index(build_index())
+    except KeyboardInterrupt:
+        tracker.stop()
+        tracker.log.compact()
+
+
+if __name__ == "__main__":
+    main()
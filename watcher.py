@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+AppGraveyard 监视模式
+
+监视安装目录、包管理器数据库和应用程序文件夹的文件系统事件，
+事件经过防抖和合并后批量处理：只重新计算受影响应用的大小、可执行文件和分数，
+包数据库变化时才重新枚举应用列表。每批处理后更新快照，导出器和 HTTP 接口会随之刷新。
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from change_detector import application_dirs
+from mounts import MountTable
+from scoring import AppScorer
+from snapshot import Snapshot, score_apps, take_snapshot
+from usage_tracker import app_key
+
+# 最后一个事件之后静默这么久才处理一批；持续有事件时最多等待 MAX_DELAY
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MAX_DELAY = 30.0
+
+# 轮询模式下两次检查的间隔
+DEFAULT_POLL_INTERVAL = 10.0
+
+# inotify 监视数上限（每个目录一个），超出后剩余目录改为轮询
+DEFAULT_MAX_WATCHES = 8192
+
+# 表示 "事件队列溢出，无法知道哪些路径变化了"
+OVERFLOW = '<overflow>'
+
+# inotify 事件位（linux/inotify.h）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def package_database_paths() -> List[str]:
+    """包管理器数据库；其中任何变化都说明应用列表可能变了"""
+    if sys.platform in ("darwin", "win32"):
+        # 注册表和应用程序文件夹由 application_folders 和来源指纹覆盖
+        return []
+    return ["/var/lib/dpkg/status", "/var/lib/rpm"]
+
+
+def application_folders() -> List[str]:
+    """每个直接子项就是一个应用的文件夹
+
+    只有直接子项的增删和改名说明应用列表可能变了；更深的路径属于各应用的安装目录，
+    通过路径索引交给所属应用处理。
+    """
+    home = os.path.expanduser("~")
+    if sys.platform == "darwin":
+        return list(application_dirs().values())
+    if sys.platform == "win32":
+        return [os.environ.get("ProgramFiles", r"C:\Program Files"),
+                os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)")]
+    return [
+        "/var/lib/snapd/snaps",
+        "/var/lib/flatpak/app",
+        os.path.join(home, ".local", "share", "flatpak", "app"),
+    ]
+
+
+class InotifyWatcher:
+    """通过 ctypes 调用 Linux inotify
+
+    inotify 不递归，recursive=True 时为每个子目录单独添加监视（新建的子目录自动加入），
+    和大小遍历一样不进入挂载在其中的其他文件系统；
+    监视的是文件时实际监视其所在目录，只报告该文件的事件。
+    """
+
+    def __init__(self, max_watches: int = DEFAULT_MAX_WATCHES):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.max_watches = max_watches
+        # wd -> (目录, 是否递归, 只关心的文件名或 None)
+        self.watches: Dict[int, Tuple[str, bool, Optional[str]]] = {}
+        # 超出监视数上限、需要交给轮询处理的路径
+        self.unwatched: List[str] = []
+        self.mounts = MountTable()
+
+    @staticmethod
+    def available() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None)
+        return hasattr(libc, 'inotify_init1')
+
+    def _add_watch(self, directory: str, recursive: bool, name: Optional[str] = None) -> bool:
+        if len(self.watches) >= self.max_watches:
+            self.unwatched.append(directory)
+            return False
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                # 达到系统的 max_user_watches
+                self.max_watches = len(self.watches)
+                self.unwatched.append(directory)
+            return False
+        self.watches[wd] = (directory, recursive, name)
+        return True
+
+    def add(self, path: str, recursive: bool = False):
+        if os.path.isfile(path):
+            self._add_watch(os.path.dirname(path), False, os.path.basename(path))
+            return
+        if not os.path.isdir(path):
+            return
+        if not self._add_watch(path, recursive) or not recursive:
+            return
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [name for name in dirs if not self.mounts.is_mount_point(os.path.join(root, name))]
+            for name in dirs:
+                self._add_watch(os.path.join(root, name), True)
+                if len(self.watches) >= self.max_watches:
+                    return
+
+    def remove(self, path: str):
+        """移除 add(path, recursive=True) 建立的监视（包括各子目录）"""
+        for wd, (directory, recursive, _) in list(self.watches.items()):
+            if recursive and _is_within(directory, path):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+        self.unwatched = [directory for directory in self.unwatched if not _is_within(directory, path)]
+
+    def read(self, timeout: float) -> List[str]:
+        """等待最多 timeout 秒，返回发生变化的路径"""
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changed = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.append(OVERFLOW)
+                continue
+            watch = self.watches.get(wd)
+            if watch is None:
+                continue
+            directory, recursive, only_name = watch
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            name = os.fsdecode(name)
+            if only_name is not None and name != only_name:
+                continue
+            path = os.path.join(directory, name) if name else directory
+            changed.append(path)
+            if recursive and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add(path, recursive=True)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """没有 inotify 时的后备方案：定期 stat 各路径
+
+    目录只能发现直接子项的增删（目录 mtime 变化），深层文件的修改要等下次完整扫描。
+    """
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        self.fingerprints: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._next_poll = time.monotonic() + interval
+
+    @staticmethod
+    def _fingerprint(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def add(self, path: str, recursive: bool = False):
+        self.fingerprints[path] = self._fingerprint(path)
+
+    def remove(self, path: str):
+        for watched in [watched for watched in self.fingerprints if _is_within(watched, path)]:
+            del self.fingerprints[watched]
+
+    def read(self, timeout: float) -> List[str]:
+        wait = min(timeout, self._next_poll - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        if time.monotonic() < self._next_poll:
+            return []
+        self._next_poll = time.monotonic() + self.interval
+        changed = []
+        for path, old in self.fingerprints.items():
+            new = self._fingerprint(path)
+            if new != old:
+                self.fingerprints[path] = new
+                changed.append(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class EventCoalescer:
+    """防抖并合并事件：同一路径的多次事件只保留一次，
+    静默 debounce 秒或第一个事件之后已过 max_delay 秒时交出一批"""
+
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending: Set[str] = set()
+        self._first = 0.0
+        self._last = 0.0
+
+    def add(self, paths: Iterable[str], now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            if not self.pending:
+                self._first = now
+            self.pending.add(path)
+            self._last = now
+
+    def time_until_ready(self, now: Optional[float] = None) -> Optional[float]:
+        """距离可以交出当前这一批还有多久；没有待处理事件时返回 None"""
+        if not self.pending:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._last + self.debounce, self._first + self.max_delay) - now)
+
+    def pop_ready(self, now: Optional[float] = None) -> Optional[Set[str]]:
+        if self.time_until_ready(now) != 0.0:
+            return None
+        batch, self.pending = self.pending, set()
+        return batch
+
+
+class WatchMode:
+    """把文件系统事件映射到应用并增量更新
+
+    安装目录中的变化通过路径索引找到所属应用，只重新统计该应用；
+    包数据库的变化、应用程序文件夹中应用的增删（以及事件队列溢出）触发重新枚举。
+    """
+
+    def __init__(self, scanner, apps: List[Dict], snapshot_path: Optional[str] = None,
+                 debounce: float = DEFAULT_DEBOUNCE, max_delay: float = DEFAULT_MAX_DELAY,
+                 force_polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.scanner = scanner
+        self.apps = apps
+        self.snapshot_path = snapshot_path
+        self.coalescer = EventCoalescer(debounce, max_delay)
+        self.scorer = AppScorer()
+        self.package_paths = [path for path in package_database_paths() if os.path.exists(path)]
+        self.application_folders = [path.rstrip(os.sep) for path in application_folders() if os.path.isdir(path)]
+        self.polling = force_polling or not InotifyWatcher.available()
+        self.poll_interval = poll_interval
+        self.watcher = None
+        self.poller: Optional[PollingWatcher] = None
+        # 当前已监视的安装目录
+        self.watched_roots: Set[str] = set()
+        self._index_apps()
+
+    def _index_apps(self):
+        self.apps_by_key = {app_key(app): app for app in self.apps}
+
+    def _install_roots(self) -> List[str]:
+        roots = {app['install_location'] for app in self.apps
+                 if app.get('install_location') and os.path.isdir(app['install_location'])}
+        # 嵌套的安装目录由外层目录的递归监视覆盖
+        result = []
+        for root in sorted(roots):
+            if not result or not root.startswith(result[-1].rstrip(os.sep) + os.sep):
+                result.append(root)
+        return result
+
+    def start_watching(self):
+        """（重新）建立所有监视"""
+        if self.watcher is not None:
+            self.watcher.close()
+        self.poller = None
+        self.watched_roots = set()
+        if self.polling:
+            self.watcher = PollingWatcher(self.poll_interval)
+        else:
+            self.watcher = InotifyWatcher()
+        for path in self.package_paths + self.application_folders:
+            self.watcher.add(path)
+        self.sync_watches()
+        kind = "轮询" if self.polling else "inotify"
+        print(f"监视模式（{kind}）：{len(self.package_paths)} 个包数据库，"
+              f"{len(self.application_folders)} 个应用文件夹，{len(self.watched_roots)} 个安装目录")
+
+    def sync_watches(self) -> Tuple[int, int]:
+        """只为新增的安装目录添加监视、移除已消失的，其余监视保持不变，不会丢失期间的事件；
+        返回 (新增数, 移除数)"""
+        roots = set(self._install_roots())
+        removed = self.watched_roots - roots
+        added = roots - self.watched_roots
+        # 先移除：外层目录变成了新的安装目录时，内层目录的监视会由外层的递归监视重新建立
+        for root in removed:
+            self.watcher.remove(root)
+            if self.poller is not None:
+                self.poller.remove(root)
+        for root in sorted(added):
+            self.watcher.add(root, recursive=True)
+        self.watched_roots = roots
+        if isinstance(self.watcher, InotifyWatcher) and self.watcher.unwatched:
+            if self.poller is None:
+                self.poller = PollingWatcher(self.poll_interval)
+            new_paths = [path for path in self.watcher.unwatched if path not in self.poller.fingerprints]
+            if new_paths:
+                print(f"inotify 监视数已达上限，{len(new_paths)} 个目录改为轮询")
+                for path in new_paths:
+                    self.poller.add(path)
+        return len(added), len(removed)
+
+    def _is_package_change(self, path: str) -> bool:
+        for package_path in self.package_paths:
+            if path == package_path or path.startswith(package_path.rstrip(os.sep) + os.sep):
+                return True
+        # 应用程序文件夹本身（轮询时）或其直接子项
+        path = path.rstrip(os.sep)
+        return path in self.application_folders or os.path.dirname(path) in self.application_folders
+
+    def apply(self, paths: Set[str]):
+        """处理一批合并后的变化"""
+        start = time.perf_counter()
+        if OVERFLOW in paths:
+            print("事件队列溢出，重新扫描全部应用")
+            self.rescan()
+        else:
+            package_changes = {path for path in paths if self._is_package_change(path)}
+            # 没有来源的指纹变化时（例如 Program Files 中只是普通文件变化）不重新枚举；
+            # 无论是否重新枚举，其余路径都按路径索引更新所属应用
+            rescanned = bool(package_changes) and self.rescan(only_changed=True)
+            changed_paths = paths - package_changes
+            affected: Dict[int, Dict] = {}
+            for path in changed_paths:
+                app = self.apps_by_key.get(self.scanner.path_trie.lookup(path))
+                if app is not None:
+                    affected[id(app)] = app
+            if not rescanned and not affected:
+                return
+            for app in affected.values():
+                self.update_app(app)
+            if affected:
+                print(f"{len(changed_paths)} 个路径变化，已更新 {len(affected)} 个应用: "
+                      f"{', '.join(app.get('name', '') for app in affected.values())}")
+        Snapshot.from_scan(self.scanner, self.apps, time.perf_counter() - start).save(self.snapshot_path)
+
+    def update_app(self, app: Dict):
+        """重新统计单个应用的大小、可执行文件和分数"""
+        location = app.get('install_location')
+        if location:
+            old_size = app.get('size', 0)
+            walker = self.scanner.walker
+            state = walker.start(location)
+            result = walker.resume(state, max_entries=0, time_budget=0)
+            app.update(self.scanner._walk_changes(result))
+            if 'reclaimable_size' in app:
+                # 独占空间需要整轮扫描才能结算，这里按大小变化近似调整
+                app['reclaimable_size'] = max(0, app['reclaimable_size'] + result['size'] - old_size)
+        app['last_access_time'] = self.scanner.get_last_access_time(app)
+        app.update(self.scorer.calculate_score(app))
+
+    def rescan(self, only_changed: bool = False) -> bool:
+        """重新枚举应用并评分；only_changed 时只重新枚举指纹有变化的来源，都没有变化时返回 False
+
+        沿用上一轮的记录已经有分数，只为新枚举出的记录评分；监视只按安装目录的增减调整。
+        """
+        if only_changed:
+            apps = self.scanner.refresh_installed_programs()
+            if apps is None:
+                return False
+        else:
+            apps = self.scanner.scan_installed_programs()
+        self.apps = apps
+        score_apps(self.scanner, [app for app in self.apps if 'score' not in app])
+        self._index_apps()
+        added, removed = self.sync_watches()
+        if added or removed:
+            print(f"安装目录变化：新增监视 {added} 个，移除 {removed} 个")
+        return True
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        self.start_watching()
+        while stop_event is None or not stop_event.is_set():
+            wait = self.coalescer.time_until_ready()
+            timeout = 1.0 if wait is None else min(wait, 1.0)
+            changed = self.watcher.read(timeout)
+            if self.poller is not None:
+                changed.extend(self.poller.read(0))
+            self.coalescer.add(changed)
+            batch = self.coalescer.pop_ready()
+            if batch:
+                try:
+                    self.apply(batch)
+                except Exception as e:
+                    print(f"Error applying file system changes: {e}")
+        self.watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AppGraveyard 监视模式：根据文件系统事件增量更新扫描结果")
+    parser.add_argument("--snapshot", help="快照文件路径（默认在 AppGraveyard 数据目录中）")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, help="事件静默多少秒后处理一批")
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY, help="一批事件最多等待多少秒")
+    parser.add_argument("--poll", action="store_true", help="不使用 inotify，改为定期轮询")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="轮询间隔（秒）")
+    parser.add_argument("--background", action="store_true", help="扫描时使用低影响后台模式")
+    args = parser.parse_args()
+
+    from cross_platform_scanner import AppScanner
+    scanner = AppScanner(background=args.background)
+    _, apps = take_snapshot(scanner, args.snapshot)
+    watch = WatchMode(scanner, apps, args.snapshot, args.debounce, args.max_delay,
+                      args.poll, args.poll_interval)
+    try:
+        watch.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()